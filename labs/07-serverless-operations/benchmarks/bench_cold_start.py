@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold-start import and first-invoke latency for every handler.
+
+Each run starts a fresh interpreter, imports the handler module, then
+invokes it twice (first/cold and second/warm). AWS calls go to a local
+HTTP stub via AWS_ENDPOINT_URL, so boto3 import, client construction and
+request signing are all measured without touching AWS.
+
+Usage:
+    python benchmarks/bench_cold_start.py --runs 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+LAB_DIR = Path(__file__).resolve().parent.parent
+LAMBDA_DIR = LAB_DIR / "lambda"
+SHARED_DIR = LAMBDA_DIR / "shared"
+
+HANDLERS = {
+    "hello-world": {"name": "Developer", "message": "Hello"},
+    "api-handler": {"httpMethod": "GET", "path": "/test"},
+    "event-processor": {
+        "id": "bench-event",
+        "source": "benchmark",
+        "detail-type": "Benchmark Event",
+        "detail": {"message": "Hello"},
+    },
+}
+
+# Runs inside the fresh interpreter; prints timings as JSON
+PROBE = """
+import json, sys, time
+event = json.loads(sys.argv[1])
+
+class Context:
+    function_name = 'benchmark'
+    aws_request_id = 'benchmark-request-id'
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+t0 = time.perf_counter()
+import lambda_function
+t1 = time.perf_counter()
+first = lambda_function.lambda_handler(event, Context())
+t2 = time.perf_counter()
+lambda_function.lambda_handler(event, Context())
+t3 = time.perf_counter()
+
+status = first.get('statusCode') if isinstance(first, dict) else None
+print(json.dumps({'import': t1 - t0, 'first': t2 - t1, 'warm': t3 - t2, 'status': status}))
+"""
+
+
+class StubAWSHandler(BaseHTTPRequestHandler):
+    """Answers every AWS API call with an empty success response."""
+
+    def _respond(self, body=b"{}"):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-amz-json-1.0")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAWSHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def probe(handler_name, event, endpoint):
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": os.pathsep.join([str(LAMBDA_DIR / handler_name), str(SHARED_DIR)]),
+        "AWS_ENDPOINT_URL": endpoint,
+        "AWS_ACCESS_KEY_ID": "benchmark",
+        "AWS_SECRET_ACCESS_KEY": "benchmark",
+        "AWS_DEFAULT_REGION": "us-west-2",
+        "AWS_EC2_METADATA_DISABLED": "true",
+    })
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, json.dumps(event)],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lambda cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    server = start_stub_server()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"Median of {args.runs} fresh interpreters (milliseconds)")
+    print(f"{'handler':<18} {'import':>8} {'first':>8} {'warm':>8}  status")
+
+    for handler_name, event in HANDLERS.items():
+        samples = [probe(handler_name, event, endpoint) for _ in range(args.runs)]
+        median = {
+            key: statistics.median(sample[key] for sample in samples) * 1000
+            for key in ("import", "first", "warm")
+        }
+        print(f"{handler_name:<18} {median['import']:>8.1f} {median['first']:>8.1f} "
+              f"{median['warm']:>8.1f}  {samples[-1]['status']}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: event-processor DynamoDB write path, items/second.
+
+Compares the original write path (a resource Table built per record,
+serialized by the resource layer) with store_event (cached low-level
+client, serialize_item fast path). Both use real boto3 objects; only the
+HTTP send is replaced by a canned response, so the numbers include
+parameter validation, serialization and request signing.
+
+Usage:
+    python benchmarks/bench_dynamodb_writes.py --records 10000
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+LAB_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(LAB_DIR / "lambda" / "event-processor"))
+sys.path.insert(0, str(LAB_DIR / "lambda" / "shared"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-west-2")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+import boto3  # noqa: E402
+from botocore.awsrequest import AWSResponse  # noqa: E402
+
+import aws_clients  # noqa: E402
+import lambda_function  # noqa: E402
+
+
+class _RawBody:
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+def fake_send(request, **kwargs):
+    """Short-circuit the HTTP call with an empty PutItem response."""
+    return AWSResponse(request.url, 200, {}, _RawBody(b"{}"))
+
+
+def make_stream(count):
+    return [
+        {
+            "event_id": f"s3-REQ{i:08d}",
+            "event_type": "s3",
+            "source": "benchmark-bucket",
+            "key": f"uploads/file-{i}.txt",
+            "event_name": "ObjectCreated:Put",
+            "size": 1024 + i,
+            "content_type": "text/plain",
+            "timestamp": "2024-01-01T00:00:00.000Z",
+            "processed_at": "2024-01-01T00:00:01.000000",
+        }
+        for i in range(count)
+    ]
+
+
+def old_path(items):
+    """Original store_event: resource Table per record, resource-layer serialization."""
+    resource = boto3.resource("dynamodb")
+    resource.meta.client.meta.events.register("before-send.dynamodb", fake_send)
+    for item in items:
+        table = resource.Table(lambda_function.TABLE_NAME)
+        table.put_item(Item=item)
+
+
+def new_path(items):
+    """Current store_event: cached client, serialize_item fast path."""
+    client = boto3.client("dynamodb")
+    client.meta.events.register("before-send.dynamodb", fake_send)
+    aws_clients.set_client("dynamodb", client)
+    lambda_function.dynamodb = aws_clients.lazy_client("dynamodb")
+    for item in items:
+        lambda_function.store_event(item)
+
+
+def serialize_only(items):
+    """serialize_item alone, to show how little of the write it now costs."""
+    for item in items:
+        lambda_function.serialize_item(item)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DynamoDB write path benchmark")
+    parser.add_argument("--records", type=int, default=10000)
+    args = parser.parse_args()
+
+    lambda_function.logger.setLevel("WARNING")
+    items = make_stream(args.records)
+
+    print(f"{args.records} synthetic S3 event items")
+    print(f"{'path':<16} {'seconds':>9} {'items/s':>11}")
+
+    for name, fn in (("old (resource)", old_path), ("new (client)", new_path), ("serialize only", serialize_only)):
+        start = time.perf_counter()
+        fn(items)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<16} {elapsed:>9.3f} {args.records / elapsed:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
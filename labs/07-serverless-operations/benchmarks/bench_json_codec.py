@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: API response encoding, bytes sent and encode time.
+
+Encodes an api-handler style response carrying N records:
+- before:        json.dumps(body, indent=2), the original api-handler
+- stdlib:        json_codec with the stdlib backend (compact)
+- orjson:        json_codec with orjson (compact), if installed
+- orjson+gzip:   the orjson body through finish_response() for a client
+                 sending Accept-Encoding: gzip (stdlib+gzip without orjson)
+
+Also times decoding the same document as a request body.
+
+Usage:
+    python benchmarks/bench_json_codec.py --records 5000 --iterations 20
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+LAB_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(LAB_DIR / "lambda" / "shared"))
+
+import json_codec  # noqa: E402
+
+GZIP_EVENT = {"headers": {"Accept-Encoding": "gzip, deflate, br"}}
+# gzip is off unless RESPONSE_GZIP_MIN_BYTES is set; measure it at 1 KB
+json_codec.GZIP_MIN_BYTES = json_codec.GZIP_MIN_BYTES or 1024
+
+
+def make_body(records):
+    return {
+        "message": "GET request successful",
+        "path": "/api/v1/events",
+        "items": [
+            {
+                "event_id": f"s3-REQ{i:08d}",
+                "event_type": "s3",
+                "source": "benchmark-bucket",
+                "key": f"uploads/2024/01/01/file-{i}.json",
+                "size": 1024 + i,
+                "tags": ["uploads", "json", f"batch-{i % 10}"],
+                "metrics": {"latency_ms": 12.5 + i % 100, "retries": i % 3, "ok": i % 7 != 0},
+            }
+            for i in range(records)
+        ],
+    }
+
+
+def measure(encode, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        body = encode()
+    return (time.perf_counter() - start) / iterations, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON codec benchmark")
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    body = make_body(args.records)
+    orjson = json_codec.orjson
+
+    def finish():
+        response = {"statusCode": 200, "headers": {"Content-Type": "application/json"}, "body": json_codec.dumps(body)}
+        return json_codec.finish_response(response, GZIP_EVENT)["body"]
+
+    encoders = [("before", lambda: json.dumps(body, indent=2))]
+    json_codec.orjson = None
+    encoders.append(("stdlib", lambda: json_codec.dumps(body)))
+
+    results = [(name,) + measure(encode, args.iterations) for name, encode in encoders]
+    if orjson is not None:
+        json_codec.orjson = orjson
+        results.append(("orjson",) + measure(lambda: json_codec.dumps(body), args.iterations))
+        results.append(("orjson+gzip",) + measure(finish, args.iterations))
+    else:
+        print("orjson not installed; measuring the stdlib backend only")
+        results.append(("stdlib+gzip",) + measure(finish, args.iterations))
+
+    document = results[0][2]
+    decoders = [("json.loads", json.loads)]
+    if orjson is not None:
+        decoders.append(("orjson.loads", orjson.loads))
+
+    print(f"{args.records} records, {args.iterations} iterations")
+    print(f"{'encoding':<12} {'ms':>9} {'bytes':>11} {'vs before':>10}")
+    for name, elapsed, encoded in results:
+        print(f"{name:<12} {elapsed * 1000:>9.2f} {len(encoded):>11} {len(encoded) / len(document):>9.1%}")
+
+    print(f"\n{'decoding':<12} {'ms':>9}")
+    for name, decode in decoders:
+        elapsed, _ = measure(lambda: decode(document), args.iterations)
+        print(f"{name:<12} {elapsed * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-invocation logging overhead, before and after structured_logging.
+
+"before" is the original handler preamble:
+    logger.info(f"Received event: {json.dumps(event)}")
+
+"after" is the structured_logging equivalent: an INFO summary line plus a
+DEBUG payload line that is only serialized on sampled invocations (1% by
+default), truncated to LOG_PAYLOAD_LIMIT characters.
+
+Output goes to a counting stream, so the table also shows how many bytes
+each invocation would send to CloudWatch Logs.
+
+Usage:
+    python benchmarks/bench_logging.py --records 2000 --invocations 200
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+LAB_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(LAB_DIR / "lambda" / "shared"))
+
+
+class CountingStream:
+    """Discards output but counts the characters written."""
+
+    def __init__(self):
+        self.chars = 0
+
+    def write(self, text):
+        self.chars += len(text)
+
+    def flush(self):
+        pass
+
+
+class Context:
+    aws_request_id = "benchmark-request-id"
+
+
+def make_event(count):
+    return {
+        "Records": [
+            {
+                "eventVersion": "2.1",
+                "eventSource": "aws:s3",
+                "awsRegion": "us-west-2",
+                "eventName": "ObjectCreated:Put",
+                "eventTime": "2024-01-01T00:00:00.000Z",
+                "userIdentity": {"principalId": "AWS:AIDAEXAMPLE"},
+                "requestParameters": {"sourceIPAddress": "203.0.113.10"},
+                "responseElements": {
+                    "x-amz-request-id": f"REQ{i:08d}",
+                    "x-amz-id-2": "EXAMPLE" * 8,
+                },
+                "s3": {
+                    "s3SchemaVersion": "1.0",
+                    "configurationId": "uploads",
+                    "bucket": {"name": "benchmark-bucket", "arn": "arn:aws:s3:::benchmark-bucket"},
+                    "object": {"key": f"uploads/2024/01/01/file-{i}.json", "size": 1024, "eTag": "d41d8cd98f00b204e9800998ecf8427e"},
+                },
+            }
+            for i in range(count)
+        ]
+    }
+
+
+def run_before(event, invocations):
+    stream = CountingStream()
+    logger = logging.getLogger("before")
+    logger.propagate = False
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("[%(levelname)s]\t%(asctime)s\t%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+    start = time.perf_counter()
+    for _ in range(invocations):
+        logger.info(f"Received event: {json.dumps(event)}")
+    return time.perf_counter() - start, stream.chars
+
+
+def run_after(event, invocations, sample_rate):
+    stream = CountingStream()
+    root = logging.getLogger()
+    root.addHandler(logging.StreamHandler(stream))
+
+    import structured_logging
+    logger = structured_logging.get_logger()
+
+    start = time.perf_counter()
+    for _ in range(invocations):
+        structured_logging.start_invocation(Context(), sample_rate=sample_rate)
+        logger.info("Received event", extra={"fields": {"records": len(event["Records"])}})
+        logger.debug("Event payload", extra={"payload": event})
+    return time.perf_counter() - start, stream.chars
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging overhead benchmark")
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--invocations", type=int, default=200)
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    event = make_event(args.records)
+    event_size = len(json.dumps(event))
+
+    print(f"{args.invocations} invocations, {args.records} records/event "
+          f"({event_size / 1_000_000:.1f} MB serialized), sample rate {args.sample_rate}")
+    print(f"{'logging':<8} {'ms/invocation':>14} {'bytes/invocation':>17}")
+
+    for name, (elapsed, chars) in (
+        ("before", run_before(event, args.invocations)),
+        ("after", run_after(event, args.invocations, args.sample_rate)),
+    ):
+        print(f"{name:<8} {elapsed / args.invocations * 1000:>14.3f} {chars / args.invocations:>17.0f}")
+
+
+if __name__ == "__main__":
+    main()
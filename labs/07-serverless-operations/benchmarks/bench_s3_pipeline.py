@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sequential vs pipeline S3 record processing in event-processor.
+
+Runs process_s3_event against local S3/DynamoDB stubs that sleep to
+simulate network latency, and reports records/second for both modes.
+
+Usage:
+    python benchmarks/bench_s3_pipeline.py --records 200
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+LAB_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(LAB_DIR / "lambda" / "event-processor"))
+sys.path.insert(0, str(LAB_DIR / "lambda" / "shared"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-west-2")
+
+import lambda_function  # noqa: E402
+
+
+class StubS3:
+    """S3 client stub with a fixed HEAD latency."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def head_object(self, Bucket, Key):
+        time.sleep(self.latency)
+        return {"ContentLength": 1024, "ContentType": "text/plain"}
+
+
+class StubDynamoDB:
+    """DynamoDB client stub with fixed PutItem/BatchWriteItem/BatchGetItem latencies (empty table)."""
+
+    def __init__(self, put_latency, batch_latency):
+        self.put_latency = put_latency
+        self.batch_latency = batch_latency
+        self.counter = {"put_item": 0, "batch_write_item": 0, "batch_get_item": 0}
+        self.lock = threading.Lock()
+
+    def put_item(self, TableName, Item, **kwargs):
+        time.sleep(self.put_latency)
+        with self.lock:
+            self.counter["put_item"] += 1
+
+    def batch_write_item(self, RequestItems):
+        time.sleep(self.batch_latency)
+        with self.lock:
+            self.counter["batch_write_item"] += 1
+        return {"UnprocessedItems": {}}
+
+    def batch_get_item(self, RequestItems):
+        time.sleep(self.batch_latency)
+        with self.lock:
+            self.counter["batch_get_item"] += 1
+        return {"Responses": {table: [] for table in RequestItems}, "UnprocessedKeys": {}}
+
+
+def make_event(count):
+    return {
+        "Records": [
+            {
+                "eventName": "ObjectCreated:Put",
+                "eventTime": "2024-01-01T00:00:00.000Z",
+                "s3": {
+                    "bucket": {"name": "benchmark-bucket"},
+                    "object": {"key": f"uploads/file-{i}.txt"},
+                },
+                "responseElements": {"x-amz-request-id": f"REQ{i:08d}"},
+            }
+            for i in range(count)
+        ]
+    }
+
+
+def run(mode, event, args):
+    lambda_function.s3 = StubS3(args.head_latency_ms / 1000)
+    lambda_function.dynamodb = StubDynamoDB(args.put_latency_ms / 1000, args.batch_latency_ms / 1000)
+    # Start each mode cold so the idempotency cache doesn't skip every record
+    lambda_function.processed_event_ids = lambda_function.IdempotencyCache(lambda_function.IDEMPOTENCY_CACHE_SIZE)
+
+    start = time.perf_counter()
+    lambda_function.process_s3_event(event, mode=mode)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, dict(lambda_function.dynamodb.counter)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="S3 pipeline benchmark")
+    parser.add_argument("--records", type=int, default=200)
+    parser.add_argument("--head-latency-ms", type=float, default=20.0)
+    parser.add_argument("--put-latency-ms", type=float, default=8.0)
+    parser.add_argument("--batch-latency-ms", type=float, default=15.0)
+    args = parser.parse_args()
+
+    # Keep per-record log lines out of the measurement
+    lambda_function.logger.setLevel("WARNING")
+    event = make_event(args.records)
+
+    print(f"{args.records} records, HEAD {args.head_latency_ms}ms, "
+          f"PutItem {args.put_latency_ms}ms, BatchWriteItem {args.batch_latency_ms}ms")
+    print(f"{'mode':<12} {'seconds':>9} {'records/s':>11}  calls")
+
+    for mode in ("sequential", "pipeline"):
+        elapsed, calls = run(mode, event, args)
+        print(f"{mode:<12} {elapsed:>9.3f} {args.records / elapsed:>11.1f}  {calls}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,12 +10,25 @@ This function demonstrates:
 - CORS support
 """
 
-import json
-import logging
 import os
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+import json_codec
+import structured_logging
+from router import Router
+
+logger = structured_logging.get_logger()
+
+# Handlers are called as handler(path, query_params, body, path_params);
+# every path is accepted, as behind an API Gateway {proxy+} resource
+router = Router()
+
+def _any_path(method):
+    """Register a handler for method on the root and every path below it."""
+    def decorator(handler):
+        router.add(method, '/', handler)
+        router.add(method, '/{proxy:path}', handler)
+        return handler
+    return decorator
 
 def lambda_handler(event, context):
     """
@@ -32,11 +45,14 @@ def lambda_handler(event, context):
     }
     """
     try:
+        structured_logging.start_invocation(context)
+        
         # Extract HTTP method
         http_method = event.get('httpMethod', 'GET')
         path = event.get('path', '/')
         
-        logger.info(f"Received {http_method} request to {path}")
+        logger.info("Received request", extra={'fields': {'method': http_method, 'path': path}})
+        logger.debug("Request event", extra={'payload': event})
         
         # Parse query parameters
         query_params = event.get('queryStringParameters') or {}
@@ -48,27 +64,28 @@ def lambda_handler(event, context):
         body = {}
         if event.get('body'):
             try:
-                body = json.loads(event['body'])
-            except json.JSONDecodeError:
+                body = json_codec.loads(event['body'])
+            except ValueError:
                 body = {'raw': event['body']}
         
         # Route based on HTTP method and path
-        if http_method == 'GET':
-            response_data = handle_get(path, query_params, path_params)
-        elif http_method == 'POST':
-            response_data = handle_post(path, body, path_params)
-        elif http_method == 'PUT':
-            response_data = handle_put(path, body, path_params)
-        elif http_method == 'DELETE':
-            response_data = handle_delete(path, path_params)
-        else:
+        match = router.match(http_method, path)
+        if match is None:
+            response_data = {
+                'statusCode': 404,
+                'body': {'error': 'Not found', 'path': path}
+            }
+        elif match.handler is None:
             response_data = {
-                'error': 'Method not allowed',
-                'method': http_method
+                'statusCode': 405,
+                'body': {'error': 'Method not allowed', 'method': http_method}
             }
+        else:
+            path_params = {**path_params, **match.params}
+            response_data = match.handler(path, query_params, body, path_params)
         
-        # Build response
-        return {
+        # Build response: compact JSON, indented with ?pretty, gzipped if enabled and large
+        response = {
             'statusCode': response_data.get('statusCode', 200),
             'headers': {
                 'Content-Type': 'application/json',
@@ -76,8 +93,9 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Headers': 'Content-Type',
                 'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
             },
-            'body': json.dumps(response_data.get('body', response_data), indent=2)
+            'body': json_codec.dumps(response_data.get('body', response_data))
         }
+        return json_codec.finish_response(response, event)
         
     except Exception as e:
         logger.error(f"Error handling request: {str(e)}", exc_info=True)
@@ -87,13 +105,14 @@ def lambda_handler(event, context):
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps({
+            'body': json_codec.dumps({
                 'error': 'Internal server error',
                 'message': str(e)
             })
         }
 
-def handle_get(path, query_params, path_params):
+@_any_path('GET')
+def handle_get(path, query_params, body, path_params):
     """Handle GET requests."""
     from datetime import datetime
     return {
@@ -107,7 +126,8 @@ def handle_get(path, query_params, path_params):
         }
     }
 
-def handle_post(path, body, path_params):
+@_any_path('POST')
+def handle_post(path, query_params, body, path_params):
     """Handle POST requests."""
     return {
         'statusCode': 201,
@@ -119,7 +139,8 @@ def handle_post(path, body, path_params):
         }
     }
 
-def handle_put(path, body, path_params):
+@_any_path('PUT')
+def handle_put(path, query_params, body, path_params):
     """Handle PUT requests."""
     return {
         'statusCode': 200,
@@ -131,7 +152,8 @@ def handle_put(path, body, path_params):
         }
     }
 
-def handle_delete(path, path_params):
+@_any_path('DELETE')
+def handle_delete(path, query_params, body, path_params):
     """Handle DELETE requests."""
     return {
         'statusCode': 200,
@@ -142,3 +164,10 @@ def handle_delete(path, path_params):
         }
     }
 
+@_any_path('OPTIONS')
+def handle_options(path, query_params, body, path_params):
+    """Handle CORS preflight requests; the CORS headers are added to every response."""
+    return {
+        'statusCode': 200,
+        'body': {}
+    }
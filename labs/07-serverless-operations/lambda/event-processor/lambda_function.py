@@ -8,24 +8,133 @@ This function demonstrates:
 - EventBridge event handling
 - Error handling and retries
 - DynamoDB integration
+- Concurrent S3 lookups with batched DynamoDB writes
+- Partial batch failure reporting (SQS/Kinesis)
+- Idempotent processing keyed on event_id
+- Low-level DynamoDB writes with a fast item serializer
 """
 
+import base64
 import json
-import logging
 import os
-import boto3
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+import json_codec
+import structured_logging
+from aws_clients import lazy_client
 
-# Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
-s3 = boto3.client('s3')
+logger = structured_logging.get_logger()
+
+# AWS clients are built on first use and reused across warm invocations
+# DynamoDB is used through the low-level client: items are serialized once
+# by serialize_item() instead of by the resource layer on every call
+dynamodb = lazy_client('dynamodb')
+s3 = lazy_client('s3')
 
 # Get table name from environment
 TABLE_NAME = os.environ.get('EVENTS_TABLE_NAME', 'events')
 
+# S3 processing mode:
+# - 'sequential': one HEAD + one PutItem per record
+# - 'pipeline': concurrent HEAD lookups + BatchWriteItem in chunks of 25
+S3_PROCESSING_MODE = os.environ.get('S3_PROCESSING_MODE', 'pipeline')
+S3_HEAD_CONCURRENCY = int(os.environ.get('S3_HEAD_CONCURRENCY', '16'))
+
+# BatchWriteItem accepts at most 25 put requests per call, BatchGetItem 100 keys
+BATCH_WRITE_SIZE = 25
+BATCH_GET_SIZE = 100
+BATCH_WRITE_MAX_RETRIES = int(os.environ.get('BATCH_WRITE_MAX_RETRIES', '5'))
+BATCH_WRITE_BASE_DELAY = 0.05  # seconds
+
+# Number of recently stored event IDs remembered per warm container
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '10000'))
+
+# Batch sources that understand the batchItemFailures response
+STREAM_EVENT_SOURCES = ('aws:sqs', 'aws:kinesis')
+
+class IdempotencyCache:
+    """
+    Bounded LRU of event IDs already stored by this container.
+    
+    Lets a redelivered record be skipped before any S3 or DynamoDB call.
+    A cold container starts empty; store_event's conditional write, and
+    in pipeline mode a BatchGetItem lookup, cover that case.
+    """
+    
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def seen(self, event_id):
+        """Return True if event_id was already stored, refreshing its position."""
+        if event_id is None:
+            return False
+        with self._lock:
+            if event_id in self._ids:
+                self._ids.move_to_end(event_id)
+                return True
+            return False
+    
+    def add(self, event_id):
+        """Remember a stored event ID, evicting the least recently used."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._ids[event_id] = True
+            self._ids.move_to_end(event_id)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+processed_event_ids = IdempotencyCache(IDEMPOTENCY_CACHE_SIZE)
+
+# DynamoDB item serialization
+#
+# Event items only hold strings, numbers, booleans, None, and the nested
+# dicts/lists of an EventBridge detail. These are converted to the
+# low-level attribute format with a type-dispatch table; anything else
+# (Decimal, bytes, sets) goes through one cached boto3 TypeSerializer.
+
+_type_serializer = None
+
+def _serialize_fallback(value):
+    global _type_serializer
+    if _type_serializer is None:
+        from boto3.dynamodb.types import TypeSerializer
+        _type_serializer = TypeSerializer()
+    return _type_serializer.serialize(value)
+
+def _serialize_map(value):
+    return {'M': {k: serialize_value(v) for k, v in value.items()}}
+
+def _serialize_list(value):
+    return {'L': [serialize_value(v) for v in value]}
+
+_SERIALIZERS = {
+    str: lambda value: {'S': value},
+    bool: lambda value: {'BOOL': value},
+    int: lambda value: {'N': str(value)},
+    float: lambda value: {'N': repr(value)},
+    type(None): lambda value: {'NULL': True},
+    dict: _serialize_map,
+    list: _serialize_list,
+    tuple: _serialize_list,
+}
+
+def serialize_value(value):
+    """Convert a Python value to a DynamoDB attribute value."""
+    serializer = _SERIALIZERS.get(type(value), _serialize_fallback)
+    return serializer(value)
+
+def serialize_item(item):
+    """Convert an event item to the DynamoDB low-level item format."""
+    return {k: serialize_value(v) for k, v in item.items()}
+
 def lambda_handler(event, context):
     """
     Process events from various sources.
@@ -34,23 +143,29 @@ def lambda_handler(event, context):
     - S3 events (file uploads)
     - EventBridge events (custom events)
     - Scheduled events (CloudWatch Events)
+    - SQS/Kinesis batches wrapping S3 or EventBridge events
     """
     try:
-        logger.info(f"Received event: {json.dumps(event)}")
+        structured_logging.start_invocation(context)
+        logger.info("Received event", extra={'fields': {'records': len(event.get('Records') or [])}})
+        logger.debug("Event payload", extra={'payload': event})
         
         # Determine event source
-        if 'Records' in event:
+        if 'Records' in event and is_stream_batch(event):
+            # SQS/Kinesis batch: report failed records individually
+            return process_record_batch(event, context)
+        elif 'Records' in event:
             # S3 event
             return process_s3_event(event)
         elif 'source' in event:
             # EventBridge event
-            return process_eventbridge_event(event)
+            return process_eventbridge_event(event, context)
         elif 'detail-type' in event:
             # CloudWatch Events
-            return process_cloudwatch_event(event)
+            return process_cloudwatch_event(event, context)
         else:
             # Unknown event type
-            logger.warning(f"Unknown event type: {json.dumps(event)}")
+            logger.warning("Unknown event type", extra={'payload': event})
             return {
                 'statusCode': 400,
                 'body': json.dumps({
@@ -64,75 +179,211 @@ def lambda_handler(event, context):
         # Re-raise to trigger retry (if configured)
         raise
 
-def process_s3_event(event):
+def is_stream_batch(event):
+    """Return True if the Records come from SQS or Kinesis."""
+    records = event.get('Records') or []
+    return bool(records) and records[0].get('eventSource') in STREAM_EVENT_SOURCES
+
+def process_record_batch(event, context):
+    """
+    Process an SQS or Kinesis batch.
+    
+    Each record wraps an S3 notification or an EventBridge event. Failed
+    records are returned as batchItemFailures so only they are redelivered,
+    instead of re-raising and retrying the whole batch.
+    """
+    failures = []
+    
+    for record in event['Records']:
+        item_identifier = record.get('messageId') or record.get('kinesis', {}).get('sequenceNumber')
+        try:
+            if not _process_batch_record(record, context):
+                failures.append({'itemIdentifier': item_identifier})
+        except Exception as e:
+            logger.error(f"Error processing batch record {item_identifier}: {str(e)}", exc_info=True)
+            failures.append({'itemIdentifier': item_identifier})
+    
+    logger.info("Processed batch", extra={'fields': {'records': len(event['Records']), 'failed': len(failures)}})
+    return {'batchItemFailures': failures}
+
+def _process_batch_record(record, context):
+    """Process one SQS/Kinesis record. Returns True if it fully succeeded."""
+    if record.get('eventSource') == 'aws:kinesis':
+        payload = json_codec.loads(base64.b64decode(record['kinesis']['data']))
+    else:
+        payload = json_codec.loads(record['body'])
+    
+    if 'Records' in payload:
+        result = process_s3_event(payload)
+        return not result['batchItemFailures']
+    elif 'source' in payload:
+        process_eventbridge_event(payload, context)
+        return True
+    
+    logger.warning("Unknown payload in batch record", extra={'payload': payload})
+    return False
+
+def process_s3_event(event, mode=None):
     """Process S3 events (file uploads)."""
-    processed_records = []
+    mode = mode or S3_PROCESSING_MODE
     
+    # Skip redelivered records before any S3 or DynamoDB call
+    records = []
+    duplicates = 0
     for record in event['Records']:
+        if processed_event_ids.seen(s3_event_id(record)):
+            duplicates += 1
+        else:
+            records.append(record)
+    
+    if mode == 'pipeline':
+        # BatchWriteItem can't be conditional: look up what the cache missed
+        stored_ids = find_stored_event_ids([s3_event_id(record) for record in records])
+        if stored_ids:
+            duplicates += sum(1 for record in records if s3_event_id(record) in stored_ids)
+            records = [record for record in records if s3_event_id(record) not in stored_ids]
+        processed_records, failed_ids = process_s3_records_pipeline(records)
+    else:
+        processed_records, failed_ids = process_s3_records_sequential(records)
+    
+    logger.info("Processed S3 records", extra={'fields': {
+        'mode': mode,
+        'stored': len(processed_records),
+        'failed': len(failed_ids),
+        'duplicates': duplicates
+    }})
+    
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': f'Processed {len(processed_records)} S3 events',
+            'records': processed_records,
+            'duplicates_skipped': duplicates
+        }),
+        'batchItemFailures': [{'itemIdentifier': failed_id} for failed_id in failed_ids]
+    }
+
+def process_s3_records_sequential(records):
+    """
+    Process S3 records one at a time: HEAD, then PutItem.
+    
+    Returns (processed_records, failed_ids).
+    """
+    processed_records = []
+    failed_ids = []
+    
+    for record in records:
         try:
-            # Extract S3 event details
-            bucket = record['s3']['bucket']['name']
-            key = record['s3']['object']['key']
-            event_name = record['eventName']
-            event_time = record['eventTime']
-            
-            logger.info(f"Processing S3 event: {event_name} for {bucket}/{key}")
-            
-            # Get object metadata
-            response = s3.head_object(Bucket=bucket, Key=key)
-            size = response['ContentLength']
-            content_type = response.get('ContentType', 'unknown')
-            
-            # Store event in DynamoDB
-            event_data = {
-                'event_id': f"s3-{record['responseElements']['x-amz-request-id']}",
-                'event_type': 's3',
-                'source': bucket,
-                'key': key,
-                'event_name': event_name,
-                'size': size,
-                'content_type': content_type,
-                'timestamp': event_time,
-                'processed_at': datetime.utcnow().isoformat()
-            }
-            
+            event_data = build_s3_event_data(record)
             store_event(event_data)
             processed_records.append(event_data)
             
         except Exception as e:
             logger.error(f"Error processing S3 record: {str(e)}", exc_info=True)
+            failed_ids.append(_s3_record_identifier(record))
             # Continue processing other records
     
+    return processed_records, failed_ids
+
+def process_s3_records_pipeline(records):
+    """
+    Process S3 records as a pipeline.
+    
+    HEAD lookups run concurrently on a bounded thread pool, then the
+    results are written with BatchWriteItem. A failing record is logged
+    and skipped without affecting the rest of the batch.
+    
+    Returns (processed_records, failed_ids).
+    """
+    if not records:
+        return [], []
+    
+    max_workers = max(1, min(S3_HEAD_CONCURRENCY, len(records)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_try_build_s3_event_data, records))
+    
+    event_items = [event_data for event_data in results if event_data is not None]
+    failed_ids = [
+        _s3_record_identifier(record)
+        for record, event_data in zip(records, results)
+        if event_data is None
+    ]
+    
+    stored, unprocessed_ids = store_events_batch(event_items)
+    return stored, failed_ids + unprocessed_ids
+
+def s3_event_id(record):
+    """Return the event ID for an S3 record, or None if it cannot be derived."""
+    request_id = (record.get('responseElements') or {}).get('x-amz-request-id')
+    return f"s3-{request_id}" if request_id else None
+
+def _s3_record_identifier(record):
+    """Identifier reported in batchItemFailures for an S3 record."""
+    return s3_event_id(record) or record.get('s3', {}).get('object', {}).get('key')
+
+def build_s3_event_data(record):
+    """Look up S3 object metadata and build the event item for a record."""
+    # Extract S3 event details
+    bucket = record['s3']['bucket']['name']
+    key = record['s3']['object']['key']
+    event_name = record['eventName']
+    event_time = record['eventTime']
+    
+    logger.debug("Processing S3 event: %s for %s/%s", event_name, bucket, key)
+    
+    # Get object metadata
+    response = s3.head_object(Bucket=bucket, Key=key)
+    size = response['ContentLength']
+    content_type = response.get('ContentType', 'unknown')
+    
     return {
-        'statusCode': 200,
-        'body': json.dumps({
-            'message': f'Processed {len(processed_records)} S3 events',
-            'records': processed_records
-        })
+        'event_id': f"s3-{record['responseElements']['x-amz-request-id']}",
+        'event_type': 's3',
+        'source': bucket,
+        'key': key,
+        'event_name': event_name,
+        'size': size,
+        'content_type': content_type,
+        'timestamp': event_time,
+        'processed_at': datetime.utcnow().isoformat()
     }
 
-def process_eventbridge_event(event):
+def _try_build_s3_event_data(record):
+    """Build the event item for a record, returning None on failure."""
+    try:
+        return build_s3_event_data(record)
+    except Exception as e:
+        logger.error(f"Error processing S3 record: {str(e)}", exc_info=True)
+        return None
+
+def process_eventbridge_event(event, context=None):
     """Process EventBridge custom events."""
     try:
         source = event.get('source', 'unknown')
         detail_type = event.get('detail-type', 'unknown')
         detail = event.get('detail', {})
-        time = event.get('time', datetime.utcnow().isoformat())
+        event_time = event.get('time', datetime.utcnow().isoformat())
+        event_id = event.get('id') or f"eb-{_request_id(context)}"
         
-        logger.info(f"Processing EventBridge event: {detail_type} from {source}")
+        if processed_event_ids.seen(event_id):
+            logger.info("Skipping duplicate EventBridge event: %s", event_id)
+            return _duplicate_response(event_id)
+        
+        logger.info("Processing EventBridge event: %s from %s", detail_type, source)
         
         # Store event in DynamoDB
         event_data = {
-            'event_id': event.get('id', f"eb-{context.aws_request_id}"),
+            'event_id': event_id,
             'event_type': 'eventbridge',
             'source': source,
             'detail_type': detail_type,
             'detail': detail,
-            'timestamp': time,
+            'timestamp': event_time,
             'processed_at': datetime.utcnow().isoformat()
         }
         
-        store_event(event_data)
+        if not store_event(event_data):
+            return _duplicate_response(event_id)
         
         return {
             'statusCode': 200,
@@ -146,26 +397,32 @@ def process_eventbridge_event(event):
         logger.error(f"Error processing EventBridge event: {str(e)}", exc_info=True)
         raise
 
-def process_cloudwatch_event(event):
+def process_cloudwatch_event(event, context=None):
     """Process CloudWatch Events (scheduled events)."""
     try:
         source = event.get('source', 'aws.events')
         detail_type = event.get('detail-type', 'Scheduled Event')
-        time = event.get('time', datetime.utcnow().isoformat())
+        event_time = event.get('time', datetime.utcnow().isoformat())
+        event_id = f"cw-{event.get('id') or _request_id(context)}"
+        
+        if processed_event_ids.seen(event_id):
+            logger.info("Skipping duplicate CloudWatch event: %s", event_id)
+            return _duplicate_response(event_id)
         
-        logger.info(f"Processing CloudWatch event: {detail_type}")
+        logger.info("Processing CloudWatch event: %s", detail_type)
         
         # Store event in DynamoDB
         event_data = {
-            'event_id': f"cw-{context.aws_request_id}",
+            'event_id': event_id,
             'event_type': 'cloudwatch',
             'source': source,
             'detail_type': detail_type,
-            'timestamp': time,
+            'timestamp': event_time,
             'processed_at': datetime.utcnow().isoformat()
         }
         
-        store_event(event_data)
+        if not store_event(event_data):
+            return _duplicate_response(event_id)
         
         return {
             'statusCode': 200,
@@ -179,13 +436,150 @@ def process_cloudwatch_event(event):
         logger.error(f"Error processing CloudWatch event: {str(e)}", exc_info=True)
         raise
 
+def _request_id(context):
+    """Return the Lambda request ID, or a timestamp when invoked without a context."""
+    return getattr(context, 'aws_request_id', None) or datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
+
+def _duplicate_response(event_id):
+    """Response for an event that was already stored."""
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': 'Duplicate event skipped',
+            'event_id': event_id
+        })
+    }
+
 def store_event(event_data):
-    """Store event in DynamoDB."""
+    """
+    Store event in DynamoDB.
+    
+    The write is conditional on event_id not existing yet, so a redelivered
+    event costs no extra write. Returns True if the event was written and
+    False if it was already stored.
+    """
+    event_id = event_data['event_id']
     try:
-        table = dynamodb.Table(TABLE_NAME)
-        table.put_item(Item=event_data)
-        logger.info(f"Stored event: {event_data['event_id']}")
+        dynamodb.put_item(
+            TableName=TABLE_NAME,
+            Item=serialize_item(event_data),
+            ConditionExpression='attribute_not_exists(event_id)'
+        )
+        logger.debug("Stored event: %s", event_id)
     except Exception as e:
-        logger.error(f"Error storing event in DynamoDB: {str(e)}", exc_info=True)
-        raise
+        # Imported here so the handler loads no AWS SDK until first use
+        from botocore.exceptions import ClientError
+        if not isinstance(e, ClientError) or \
+                e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            logger.error(f"Error storing event in DynamoDB: {str(e)}", exc_info=True)
+            raise
+        logger.info("Event already stored, skipping: %s", event_id)
+        processed_event_ids.add(event_id)
+        return False
+    
+    processed_event_ids.add(event_id)
+    return True
+
+def store_events_batch(event_items):
+    """
+    Store events in DynamoDB with BatchWriteItem.
+    
+    Items are written in chunks of 25. Unprocessed items are retried with
+    exponential backoff; if a chunk is rejected outright (e.g. one invalid
+    item), its items are written one at a time so only the bad record fails.
+    
+    BatchWriteItem cannot be conditional, so redeliveries on this path are
+    caught before it: by the in-process cache, then by
+    find_stored_event_ids(). Two deliveries racing through both checks
+    write the same item twice, with identical data.
+    
+    Returns (stored_items, failed_ids).
+    """
+    stored = []
+    failed = []
+    
+    for start in range(0, len(event_items), BATCH_WRITE_SIZE):
+        chunk = event_items[start:start + BATCH_WRITE_SIZE]
+        try:
+            failed_ids = _batch_write_with_retry(chunk)
+        except Exception as e:
+            logger.warning(f"Batch write rejected, falling back to single writes: {str(e)}")
+            chunk_stored, chunk_failed = _store_events_individually(chunk)
+            stored.extend(chunk_stored)
+            failed.extend(chunk_failed)
+            continue
+        
+        for item in chunk:
+            if item['event_id'] in failed_ids:
+                failed.append(item['event_id'])
+            else:
+                processed_event_ids.add(item['event_id'])
+                stored.append(item)
+    
+    return stored, failed
+
+def find_stored_event_ids(event_ids):
+    """
+    Return the event IDs among event_ids already in the table, using
+    BatchGetItem (100 keys per call, unprocessed keys retried with
+    backoff). Found IDs are added to the idempotency cache. If a lookup
+    fails, it is logged and its IDs are treated as not stored, so the
+    events are written again rather than lost.
+    """
+    event_ids = list(dict.fromkeys(event_id for event_id in event_ids if event_id))
+    found = set()
+    for start in range(0, len(event_ids), BATCH_GET_SIZE):
+        keys = [{'event_id': {'S': event_id}} for event_id in event_ids[start:start + BATCH_GET_SIZE]]
+        try:
+            for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+                response = dynamodb.batch_get_item(RequestItems={
+                    TABLE_NAME: {'Keys': keys, 'ProjectionExpression': 'event_id'}
+                })
+                found.update(item['event_id']['S'] for item in response.get('Responses', {}).get(TABLE_NAME, []))
+                keys = response.get('UnprocessedKeys', {}).get(TABLE_NAME, {}).get('Keys', [])
+                if not keys:
+                    break
+                if attempt < BATCH_WRITE_MAX_RETRIES:
+                    delay = min(BATCH_WRITE_BASE_DELAY * (2 ** attempt), 1.0)
+                    time.sleep(random.uniform(0, delay))
+            if keys:
+                logger.warning(f"Could not check {len(keys)} events for duplicates")
+        except Exception as e:
+            logger.warning(f"Duplicate lookup failed, writing events unchecked: {str(e)}")
+    
+    for event_id in found:
+        processed_event_ids.add(event_id)
+    return found
 
+def _batch_write_with_retry(chunk):
+    """Write one chunk, retrying only unprocessed items. Returns failed event IDs."""
+    requests = [{'PutRequest': {'Item': serialize_item(item)}} for item in chunk]
+    
+    for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+        response = dynamodb.batch_write_item(RequestItems={TABLE_NAME: requests})
+        requests = response.get('UnprocessedItems', {}).get(TABLE_NAME, [])
+        if not requests:
+            logger.debug("Stored %d events in batch", len(chunk))
+            return set()
+        
+        if attempt < BATCH_WRITE_MAX_RETRIES:
+            # Exponential backoff with full jitter
+            delay = min(BATCH_WRITE_BASE_DELAY * (2 ** attempt), 1.0)
+            time.sleep(random.uniform(0, delay))
+    
+    failed_ids = {request['PutRequest']['Item']['event_id']['S'] for request in requests}
+    logger.error(f"Giving up on {len(failed_ids)} unprocessed events: {sorted(failed_ids)}")
+    return failed_ids
+
+def _store_events_individually(chunk):
+    """Store each event with PutItem. Returns (stored_items, failed_ids)."""
+    stored = []
+    failed = []
+    for event_data in chunk:
+        try:
+            store_event(event_data)
+            stored.append(event_data)
+        except Exception:
+            # store_event already logged the error
+            failed.append(event_data['event_id'])
+    return stored, failed
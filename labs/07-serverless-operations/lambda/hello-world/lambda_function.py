@@ -8,13 +8,13 @@ This function:
 - Demonstrates basic error handling
 """
 
-import json
 import os
-import logging
 
-# Configure logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+import json_codec
+import structured_logging
+
+# Configure logging (JSON lines, level from LOG_LEVEL)
+logger = structured_logging.get_logger()
 
 def lambda_handler(event, context):
     """
@@ -28,8 +28,9 @@ def lambda_handler(event, context):
         dict: Response with status code and body
     """
     try:
-        # Log the incoming event
-        logger.info(f"Received event: {json.dumps(event)}")
+        # Log the incoming event (only serialized for sampled/DEBUG invocations)
+        structured_logging.start_invocation(context)
+        logger.debug("Received event", extra={'payload': event})
         
         # Get environment variables (if any)
         environment = os.environ.get('ENVIRONMENT', 'development')
@@ -48,16 +49,17 @@ def lambda_handler(event, context):
             'event_received': event
         }
         
-        logger.info(f"Returning response: {json.dumps(response_body)}")
+        logger.debug("Returning response", extra={'payload': response_body})
         
-        return {
+        response = {
             'statusCode': 200,
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps(response_body, indent=2)
+            'body': json_codec.dumps(response_body)
         }
+        return json_codec.finish_response(response, event)
         
     except Exception as e:
         # Log the error
@@ -69,7 +71,7 @@ def lambda_handler(event, context):
             'headers': {
                 'Content-Type': 'application/json'
             },
-            'body': json.dumps({
+            'body': json_codec.dumps({
                 'error': 'Internal server error',
                 'message': str(e)
             })
@@ -0,0 +1,131 @@
+"""
+JSON Codec
+JSON encoding and decoding for the handlers, plus API Gateway response
+finishing.
+
+- Fast: uses orjson when it is installed (e.g. from a Lambda layer) and
+  falls back to the stdlib json module otherwise. JSON_CODEC=json forces
+  the stdlib.
+- Compact: responses are encoded without indentation or spaces. Clients
+  can ask for indented output with the `pretty` query parameter.
+- Compressed: when RESPONSE_GZIP_MIN_BYTES is set, finish_response()
+  gzips bodies of at least that size if the request's Accept-Encoding
+  allows it, returning them base64-encoded as API Gateway expects for
+  binary bodies. Off by default: a REST API without binaryMediaTypes
+  would pass the base64 text to the client as is.
+
+Usage:
+    body = json_codec.loads(event['body'])
+    response = {'statusCode': 200, 'body': json_codec.dumps(data)}
+    return json_codec.finish_response(response, event)
+"""
+
+import base64
+import gzip
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if os.environ.get('JSON_CODEC', 'auto').lower() == 'json':
+    orjson = None
+
+# Bodies smaller than this are not worth compressing; unset: never gzip
+GZIP_MIN_BYTES = os.environ.get('RESPONSE_GZIP_MIN_BYTES')
+GZIP_MIN_BYTES = int(GZIP_MIN_BYTES) if GZIP_MIN_BYTES else None
+GZIP_LEVEL = int(os.environ.get('RESPONSE_GZIP_LEVEL', '5'))
+
+def _default(value):
+    """Encode types that json/orjson don't handle natively."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+def loads(data):
+    """Decode a JSON document from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(value, pretty=False):
+    """Encode value as a compact (or, if pretty, indented) JSON string."""
+    if orjson is not None:
+        try:
+            option = orjson.OPT_INDENT_2 if pretty else 0
+            return orjson.dumps(value, default=_default, option=option).decode()
+        except TypeError:
+            # Non-string keys or integers beyond 64 bits; the stdlib copes
+            pass
+    if pretty:
+        return json.dumps(value, default=_default, indent=2)
+    return json.dumps(value, default=_default, separators=(',', ':'))
+
+def _header(event, name):
+    headers = (event or {}).get('headers') or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value or ''
+    return ''
+
+def wants_pretty(event):
+    """True when the request asks for indented JSON (`?pretty`, `?pretty=true`)."""
+    params = (event or {}).get('queryStringParameters') or {}
+    if 'pretty' not in params:
+        return False
+    return (params['pretty'] or '').lower() not in ('0', 'false', 'no')
+
+def accepts_gzip(event):
+    """True when the request's Accept-Encoding allows gzip."""
+    for coding in _header(event, 'Accept-Encoding').split(','):
+        name, _, params = coding.partition(';')
+        if name.strip().lower() not in ('gzip', '*'):
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        return quality > 0
+    return False
+
+def finish_response(response, event):
+    """
+    Apply the request's output preferences to a handler response.
+    
+    Re-indents JSON bodies when `pretty` is requested, then gzips bodies
+    of at least GZIP_MIN_BYTES (if set) when the client accepts gzip.
+    Returns the response (modified in place).
+    """
+    body = response.get('body')
+    if not isinstance(body, str) or response.get('isBase64Encoded'):
+        return response
+    
+    headers = response.setdefault('headers', {})
+    content_type = headers.get('Content-Type', 'application/json')
+    
+    if wants_pretty(event) and content_type.startswith('application/json'):
+        body = dumps(loads(body), pretty=True)
+    
+    response['body'] = body
+    encoded = body.encode('utf-8')
+    if GZIP_MIN_BYTES is not None and len(encoded) >= GZIP_MIN_BYTES:
+        headers['Vary'] = 'Accept-Encoding'
+        if accepts_gzip(event):
+            response['body'] = base64.b64encode(gzip.compress(encoded, GZIP_LEVEL)).decode('ascii')
+            response['isBase64Encoded'] = True
+            headers['Content-Encoding'] = 'gzip'
+    
+    return response
@@ -0,0 +1,118 @@
+"""
+Structured Logging
+JSON-lines logging for the Lambda handlers.
+
+- Lazy: payloads are passed as `extra={'payload': obj}` and only serialized
+  when the record is actually emitted. At the default INFO level a
+  `logger.debug(..., extra={'payload': event})` call costs almost nothing.
+- Sampled: `start_invocation()` raises a configurable fraction of
+  invocations to DEBUG, so full payloads are captured for a sample of
+  traffic instead of all of it. The AWS SDK's loggers stay at LOG_LEVEL:
+  botocore's DEBUG output includes signed requests and session tokens.
+- Truncated: serialized payloads above LOG_PAYLOAD_LIMIT characters are
+  replaced by a preview plus their full size.
+- JSON lines: one JSON object per log record, with the request ID bound.
+
+Usage:
+    logger = structured_logging.get_logger()
+
+    def lambda_handler(event, context):
+        structured_logging.start_invocation(context)
+        logger.debug("Received event", extra={'payload': event})
+        logger.info("Processed batch", extra={'fields': {'records': 42}})
+"""
+
+import json
+import logging
+import os
+import random
+from datetime import datetime, timezone
+
+LOG_LEVEL = logging.getLevelName(os.environ.get('LOG_LEVEL', 'INFO').upper())
+# Fraction of invocations (0.0-1.0) logged at DEBUG, including payloads
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '0.01'))
+# Serialized payloads longer than this many characters are truncated
+LOG_PAYLOAD_LIMIT = int(os.environ.get('LOG_PAYLOAD_LIMIT', '2048'))
+
+# Never raised to DEBUG by sampling; botocore.auth logs credentials there
+SDK_LOGGERS = ('boto3', 'botocore', 's3transfer', 'urllib3')
+
+_invocation = {'request_id': None, 'sampled': False}
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as a single JSON line."""
+
+    def __init__(self, payload_limit=LOG_PAYLOAD_LIMIT):
+        super().__init__()
+        self.payload_limit = payload_limit
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'logger': record.name,
+        }
+        if _invocation['request_id']:
+            entry['request_id'] = _invocation['request_id']
+        if _invocation['sampled']:
+            entry['sampled'] = True
+
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+
+        line = json.dumps(entry, default=str)
+
+        if hasattr(record, 'payload'):
+            # Serialize the payload once and splice it in, rather than
+            # nesting it in `entry` and encoding it a second time
+            payload = json.dumps(record.payload, default=str, separators=(',', ':'))
+            if len(payload) > self.payload_limit:
+                payload = json.dumps({
+                    'truncated': True,
+                    'size': len(payload),
+                    'preview': payload[:self.payload_limit]
+                })
+            line = f'{line[:-1]}, "payload": {payload}}}'
+
+        return line
+
+def get_logger(name=None):
+    """
+    Return a logger whose output goes through JsonFormatter.
+
+    Configures the root logger once: the Lambda runtime's handler (or a
+    stderr handler when running locally) gets the JSON formatter and the
+    LOG_LEVEL level. The SDK_LOGGERS are pinned at LOG_LEVEL, so sampled
+    invocations don't turn on their DEBUG output.
+    """
+    root = logging.getLogger()
+    if not getattr(root, '_structured_logging', False):
+        if not root.handlers:
+            root.addHandler(logging.StreamHandler())
+        for handler in root.handlers:
+            handler.setFormatter(JsonFormatter())
+        root.setLevel(LOG_LEVEL)
+        for sdk_logger in SDK_LOGGERS:
+            logging.getLogger(sdk_logger).setLevel(LOG_LEVEL)
+        root._structured_logging = True
+    return logging.getLogger(name)
+
+def start_invocation(context=None, sample_rate=None):
+    """
+    Bind the request ID and decide whether this invocation is sampled.
+
+    Sampled invocations log at DEBUG (except the SDK_LOGGERS); the rest
+    use LOG_LEVEL. Returns True if the invocation is sampled.
+    """
+    rate = LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+    sampled = rate > 0 and random.random() < rate
+
+    _invocation['request_id'] = getattr(context, 'aws_request_id', None)
+    _invocation['sampled'] = sampled
+    logging.getLogger().setLevel(logging.DEBUG if sampled else LOG_LEVEL)
+    return sampled
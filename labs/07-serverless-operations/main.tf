@@ -101,7 +101,9 @@ resource "aws_iam_role_policy" "lambda_additional" {
         Effect = "Allow"
         Action = [
           "dynamodb:PutItem",
+          "dynamodb:BatchWriteItem",
           "dynamodb:GetItem",
+          "dynamodb:BatchGetItem",
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
           "dynamodb:Query",
@@ -137,22 +139,63 @@ resource "aws_iam_role_policy" "lambda_additional" {
 }
 
 # Archive Lambda function code
+# Each package holds the handler plus the shared modules from lambda/shared/
+locals {
+  lambda_shared_modules = ["aws_clients.py", "json_codec.py", "router.py", "structured_logging.py"]
+}
+
 data "archive_file" "hello_world" {
   type        = "zip"
-  source_file = "${path.module}/lambda/hello-world/lambda_function.py"
   output_path = "${path.module}/lambda/hello-world/function.zip"
+
+  source {
+    content  = file("${path.module}/lambda/hello-world/lambda_function.py")
+    filename = "lambda_function.py"
+  }
+
+  dynamic "source" {
+    for_each = local.lambda_shared_modules
+    content {
+      content  = file("${path.module}/lambda/shared/${source.value}")
+      filename = source.value
+    }
+  }
 }
 
 data "archive_file" "api_handler" {
   type        = "zip"
-  source_file = "${path.module}/lambda/api-handler/lambda_function.py"
   output_path = "${path.module}/lambda/api-handler/function.zip"
+
+  source {
+    content  = file("${path.module}/lambda/api-handler/lambda_function.py")
+    filename = "lambda_function.py"
+  }
+
+  dynamic "source" {
+    for_each = local.lambda_shared_modules
+    content {
+      content  = file("${path.module}/lambda/shared/${source.value}")
+      filename = source.value
+    }
+  }
 }
 
 data "archive_file" "event_processor" {
   type        = "zip"
-  source_file = "${path.module}/lambda/event-processor/lambda_function.py"
   output_path = "${path.module}/lambda/event-processor/function.zip"
+
+  source {
+    content  = file("${path.module}/lambda/event-processor/lambda_function.py")
+    filename = "lambda_function.py"
+  }
+
+  dynamic "source" {
+    for_each = local.lambda_shared_modules
+    content {
+      content  = file("${path.module}/lambda/shared/${source.value}")
+      filename = source.value
+    }
+  }
 }
 
 # Lambda: Hello World
@@ -14,9 +14,13 @@ fi
 
 echo "Deploying $FUNCTION_NAME from $FUNCTION_DIR..."
 
-# Create deployment package
+SHARED_DIR="$(cd "$(dirname "$0")/../lambda/shared" && pwd)"
+
+# Create deployment package (handler + shared modules at the zip root)
 cd "$FUNCTION_DIR"
+rm -f function.zip
 zip -r function.zip lambda_function.py
+zip -j function.zip "$SHARED_DIR"/*.py
 
 # Update Lambda function code
 aws lambda update-function-code \
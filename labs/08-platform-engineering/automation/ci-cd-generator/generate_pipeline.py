@@ -2,12 +2,28 @@
 """
 CI/CD Pipeline Generator
 Generates GitHub Actions workflows from templates.
+
+One service per run, or many at once from a manifest (--manifest): each
+template is parsed once, services are rendered on a thread pool, and only
+files whose content changed are written, so unchanged workflows keep
+their mtime.
+
+Manifest file (JSON): a list of services, or {"defaults": {...},
+"services": [...]}. Each service has "service", "repository" and
+"template" (unless in defaults); optional "environments", "aws_region"
+and "output" (default .github/workflows/deploy-<service>.yml, relative
+to --output-dir).
 """
 
 import os
+import sys
 import json
+import string
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 PIPELINE_TEMPLATES = {
     "standard-web-app": """name: Deploy {service_name}
@@ -131,6 +147,66 @@ jobs:
 """
 }
 
+# Threads for bulk generation; the work is mostly file I/O
+GENERATE_JOBS = int(os.environ.get("PIPELINE_GENERATE_JOBS", "8"))
+
+class CompiledTemplate:
+    """A pipeline template parsed once, rendered many times."""
+    
+    def __init__(self, name: str, source: str):
+        self.name = name
+        self._literals = []
+        self._fields = []
+        for literal, field, spec, conversion in string.Formatter().parse(source):
+            if spec or conversion:
+                raise ValueError(f"Template {name}: only plain {{field}} placeholders are supported")
+            self._literals.append(literal)
+            self._fields.append(field)
+        self.fields = {field for field in self._fields if field is not None}
+    
+    def render(self, **values: Any) -> str:
+        """Same result as str.format(**values) on the template source."""
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Template {self.name} needs {', '.join(sorted(missing))}")
+        parts = []
+        for literal, field in zip(self._literals, self._fields):
+            parts.append(literal)
+            if field is not None:
+                parts.append(str(values[field]))
+        return "".join(parts)
+
+_compiled: Dict[str, CompiledTemplate] = {}
+_compile_lock = threading.Lock()
+
+def compiled_template(name: str) -> CompiledTemplate:
+    """The compiled form of PIPELINE_TEMPLATES[name], built on first use."""
+    template = _compiled.get(name)
+    if template is None:
+        if name not in PIPELINE_TEMPLATES:
+            raise ValueError(f"Unknown template: {name}")
+        with _compile_lock:
+            template = _compiled.setdefault(name, CompiledTemplate(name, PIPELINE_TEMPLATES[name]))
+    return template
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """
+    Replace path with content unless it already holds exactly that.
+    Written to a temporary file and renamed, so readers never see a
+    partial workflow.
+    """
+    data = content.encode()
+    try:
+        if path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+    partial.write_bytes(data)
+    os.replace(partial, path)
+    return True
+
 class PipelineGenerator:
     def __init__(self, service_name: str, repository: str, template: str, environments: list, aws_region: str = "us-west-2"):
         self.service_name = service_name
@@ -139,45 +215,117 @@ class PipelineGenerator:
         self.environments = environments
         self.aws_region = aws_region
         
-    def generate(self, output_path: str = ".github/workflows/deploy.yml"):
-        """Generate pipeline file."""
-        if self.template not in PIPELINE_TEMPLATES:
-            raise ValueError(f"Unknown template: {self.template}")
-            
-        template_content = PIPELINE_TEMPLATES[self.template]
-        
-        # Replace placeholders
-        content = template_content.format(
+    def render(self) -> str:
+        """Pipeline file content."""
+        return compiled_template(self.template).render(
             service_name=self.service_name,
             aws_region=self.aws_region,
             repository=self.repository
         )
         
+    def generate(self, output_path: str = ".github/workflows/deploy.yml"):
+        """Generate pipeline file; left untouched if it is already current."""
+        content = self.render()
+        
         # Write to file
         output_file = Path(output_path)
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        output_file.write_text(content)
+        changed = write_if_changed(output_file, content)
         
         return {
             "status": "generated",
             "file": str(output_file),
-            "template": self.template
+            "template": self.template,
+            "changed": changed
         }
 
+def service_output(spec: Dict[str, Any]) -> str:
+    return spec.get("output") or f".github/workflows/deploy-{spec['service']}.yml"
+
+def load_manifest(path: str) -> List[Dict[str, Any]]:
+    manifest = json.loads(Path(path).read_text())
+    defaults = {}
+    if isinstance(manifest, dict):
+        defaults = manifest.get("defaults", {})
+        manifest = manifest["services"]
+    services = [{**defaults, **entry} for entry in manifest]
+    for spec in services:
+        missing = [key for key in ("service", "repository", "template") if not spec.get(key)]
+        if missing:
+            raise ValueError(f"{spec.get('service', spec)}: missing {', '.join(missing)}")
+        if spec["template"] not in PIPELINE_TEMPLATES:
+            raise ValueError(f"{spec['service']}: unknown template {spec['template']}")
+    for problem, key in (("listed twice", lambda spec: spec["service"]), ("written twice", service_output)):
+        counts = Counter(key(spec) for spec in services)
+        duplicates = [value for value, count in counts.items() if count > 1]
+        if duplicates:
+            raise ValueError(f"{problem}: {', '.join(sorted(duplicates))}")
+    return services
+
+def generate_all(services: List[Dict[str, Any]], output_dir: str = ".", jobs: int = GENERATE_JOBS) -> Dict[str, Any]:
+    """
+    Generate the pipeline of every service in a manifest concurrently.
+    Returns the files written and unchanged, and errors by service.
+    """
+    base = Path(output_dir)
+    
+    def generate_one(spec: Dict[str, Any]) -> Dict[str, Any]:
+        generator = PipelineGenerator(
+            service_name=spec["service"],
+            repository=spec["repository"],
+            template=spec["template"],
+            environments=spec.get("environments", ["dev", "staging", "prod"]),
+            aws_region=spec.get("aws_region", "us-west-2")
+        )
+        return generator.generate(base / service_output(spec))
+    
+    written, unchanged, failed = [], [], {}
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        futures = {spec["service"]: pool.submit(generate_one, spec) for spec in services}
+        for service, future in futures.items():
+            try:
+                result = future.result()
+            except Exception as e:
+                failed[service] = str(e)
+                continue
+            (written if result["changed"] else unchanged).append(result["file"])
+    return {"written": written, "unchanged": unchanged, "failed": failed}
+
 def main():
     """CLI entry point."""
     import argparse
     
     parser = argparse.ArgumentParser(description="CI/CD Pipeline Generator")
-    parser.add_argument("--service", required=True)
-    parser.add_argument("--repository", required=True)
-    parser.add_argument("--template", required=True, choices=list(PIPELINE_TEMPLATES.keys()))
+    parser.add_argument("--service")
+    parser.add_argument("--repository")
+    parser.add_argument("--template", choices=list(PIPELINE_TEMPLATES.keys()))
     parser.add_argument("--environments", nargs="+", default=["dev", "staging", "prod"])
     parser.add_argument("--aws-region", default="us-west-2")
     parser.add_argument("--output", default=".github/workflows/deploy.yml")
+    bulk = parser.add_argument_group("bulk", "Generate every service in a manifest")
+    bulk.add_argument("--manifest", help="Manifest file (JSON) listing services")
+    bulk.add_argument("--output-dir", default=".", help="Root that manifest outputs are relative to")
+    bulk.add_argument("--jobs", type=int, default=GENERATE_JOBS, help="Services generated at once")
     
     args = parser.parse_args()
     
+    if args.manifest:
+        try:
+            services = load_manifest(args.manifest)
+        except (OSError, ValueError, KeyError) as e:
+            parser.error(f"bad manifest: {e}")
+        result = generate_all(services, args.output_dir, args.jobs)
+        print(json.dumps({
+            "services": len(services),
+            "written": len(result["written"]),
+            "unchanged": len(result["unchanged"]),
+            "files": result["written"],
+            "failed": result["failed"]
+        }, indent=2))
+        sys.exit(1 if result["failed"] else 0)
+    missing = [f"--{name}" for name in ("service", "repository", "template") if not getattr(args, name)]
+    if missing:
+        parser.error(f"{', '.join(missing)} required (or --manifest)")
+    
     generator = PipelineGenerator(
         service_name=args.service,
         repository=args.repository,
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Terraform Orchestrator
+Runs plan or apply across many TerraformRunner workspaces at once.
+
+Each workspace runs in its own process from a bounded pool. Scheduling:
+- Dependencies: a workspace starts only after everything in its
+  depends_on succeeded; if one fails, its dependents are skipped.
+- Backend concurrency: at most --per-backend runs hold locks in the same
+  state backend (bucket + lock table) at a time.
+- Cost: among ready workspaces, the one with the longest remaining chain
+  of estimated run time starts first. Estimates come from the durations
+  of earlier runs, so long applies no longer start last and stretch the
+  rollout.
+
+Usage:
+    python orchestrator.py apply --fleet fleet.json --jobs 16
+    python orchestrator.py plan --template ../../service-catalog/web-app \\
+        --workspace 'app-*-dev' --state-bucket my-state --state-table my-locks
+
+Fleet file (JSON): a list of workspaces, or {"defaults": {...},
+"workspaces": [...]}. Each workspace has "workspace" and, unless given in
+defaults or on the command line, "template", "state_bucket" and
+"state_table"; optional "variables" and "depends_on".
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Any, List
+
+from terraform_runner import LEASES_DIR, WORKSPACES_DIR, TerraformRunner
+
+# Run times of earlier runs, by command and workspace
+HISTORY_FILE = WORKSPACES_DIR / ".orchestrator-history.json"
+# Weight of the newest run in a workspace's estimate
+HISTORY_WEIGHT = 0.5
+PER_BACKEND = int(os.environ.get("TF_ORCHESTRATOR_PER_BACKEND", "10"))
+
+SUCCEEDED, FAILED, SKIPPED = "succeeded", "failed", "skipped"
+
+def run_workspace(spec: Dict[str, Any], command: str) -> Dict[str, Any]:
+    """Set up, init and plan one workspace, and apply the plan for "apply"."""
+    with TerraformRunner(spec["workspace"], spec["template"], spec["state_bucket"], spec["state_table"]) as runner:
+        runner.setup_workspace()
+        runner.init()
+        if command == "apply":
+            applied = runner.plan_and_apply(spec.get("variables", {}))
+            return {"changes": applied["plan"]["changes"], "cached": applied["plan_cached"],
+                    "applied": applied["summary"]["applied"]}
+        plan = runner.plan(spec.get("variables", {}))
+        return {"changes": plan["summary"]["changes"], "cached": plan["cached"]}
+
+def load_fleet(path: str, defaults: Dict[str, Any]) -> List[Dict[str, Any]]:
+    fleet = json.loads(Path(path).read_text())
+    if isinstance(fleet, dict):
+        defaults = {**fleet.get("defaults", {}), **defaults}
+        fleet = fleet["workspaces"]
+    base = Path(path).resolve().parent
+    specs = []
+    for entry in fleet:
+        spec = {**defaults, **entry}
+        # Templates in the fleet file are relative to it
+        if spec.get("template"):
+            spec["template"] = str(base / spec["template"])
+        specs.append(spec)
+    return specs
+
+def known_workspaces() -> Dict[str, bool]:
+    """
+    Workspaces set up on this host: name -> whether its directory still
+    exists. Lease files outlive gc, so evicted workspaces are still known.
+    """
+    existing = {
+        p.name for p in WORKSPACES_DIR.iterdir() if p.is_dir() and not p.name.startswith(".")
+    } if WORKSPACES_DIR.exists() else set()
+    leased = {p.stem for p in LEASES_DIR.glob("*.lock")} if LEASES_DIR.exists() else set()
+    return {name: name in existing for name in sorted(existing | leased)}
+
+def expand_workspaces(patterns: List[str]) -> List[str]:
+    """
+    Names as given; globs match the workspaces known on this host,
+    including ones gc evicted (they are rebuilt from the template).
+    Raises ValueError for a glob that matches nothing.
+    """
+    known = known_workspaces()
+    names = []
+    for pattern in patterns:
+        if any(c in pattern for c in "*?["):
+            matched = fnmatch.filter(known, pattern)
+            if not matched:
+                raise ValueError(f"No workspaces match {pattern}")
+            names.extend(matched)
+        else:
+            names.append(pattern)
+    names = list(dict.fromkeys(names))
+    evicted = [name for name in names if known.get(name) is False]
+    if evicted:
+        print(f"Rebuilding {len(evicted)} evicted workspaces: {', '.join(evicted)}", file=sys.stderr)
+    return names
+
+def validate(specs: List[Dict[str, Any]]):
+    names = [spec["workspace"] for spec in specs]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"Workspaces listed twice: {', '.join(sorted(duplicates))}")
+    for spec in specs:
+        missing = [key for key in ("template", "state_bucket", "state_table") if not spec.get(key)]
+        if missing:
+            raise ValueError(f"{spec['workspace']}: missing {', '.join(missing)}")
+        unknown = set(spec.get("depends_on", [])) - set(names)
+        if unknown:
+            raise ValueError(f"{spec['workspace']}: depends on unknown workspaces {', '.join(sorted(unknown))}")
+    
+    # Depth-first search for cycles
+    visiting, done = set(), set()
+    dependencies = {spec["workspace"]: spec.get("depends_on", []) for spec in specs}
+    
+    def visit(name, path):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+        visiting.add(name)
+        for dependency in dependencies[name]:
+            visit(dependency, path + [name])
+        visiting.discard(name)
+        done.add(name)
+    
+    for name in dependencies:
+        visit(name, [])
+
+def load_history() -> Dict[str, Dict[str, float]]:
+    try:
+        return json.loads(HISTORY_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+def save_history(history: Dict[str, Dict[str, float]], command: str, durations: Dict[str, float]):
+    estimates = history.setdefault(command, {})
+    for name, seconds in durations.items():
+        previous = estimates.get(name)
+        estimates[name] = seconds if previous is None else HISTORY_WEIGHT * seconds + (1 - HISTORY_WEIGHT) * previous
+    HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
+    HISTORY_FILE.write_text(json.dumps(history, indent=1, sort_keys=True))
+
+def priorities(specs: List[Dict[str, Any]], estimates: Dict[str, float]) -> Dict[str, float]:
+    """
+    Estimated run time of each workspace plus its longest chain of
+    dependents: the critical path that starts there.
+    """
+    known = sorted(estimates[spec["workspace"]] for spec in specs if spec["workspace"] in estimates)
+    default = known[len(known) // 2] if known else 1.0
+    dependents = {spec["workspace"]: [] for spec in specs}
+    for spec in specs:
+        for dependency in spec.get("depends_on", []):
+            dependents[dependency].append(spec["workspace"])
+    
+    memo = {}
+    
+    def chain(name):
+        if name not in memo:
+            memo[name] = estimates.get(name, default) + max((chain(d) for d in dependents[name]), default=0.0)
+        return memo[name]
+    
+    return {name: chain(name) for name in dependents}
+
+def orchestrate(specs: List[Dict[str, Any]], command: str, jobs: int, per_backend: int = PER_BACKEND,
+                history: Dict[str, Dict[str, float]] = None) -> Dict[str, Dict[str, Any]]:
+    """Run command across specs; returns {workspace: result} with status and seconds."""
+    validate(specs)
+    per_backend = max(per_backend, 1)
+    history = load_history() if history is None else history
+    priority = priorities(specs, history.get(command, {}))
+    by_name = {spec["workspace"]: spec for spec in specs}
+    backend = {name: (spec["state_bucket"], spec["state_table"]) for name, spec in by_name.items()}
+    
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = sorted(by_name, key=lambda name: -priority[name])
+    running = {}
+    backend_load: Dict[tuple, int] = {}
+    
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            waiting = []
+            for name in pending:
+                dependencies = by_name[name].get("depends_on", [])
+                states = [results.get(d, {}).get("status") for d in dependencies]
+                blocked = [d for d, state in zip(dependencies, states) if state in (FAILED, SKIPPED)]
+                if blocked:
+                    results[name] = {
+                        "status": SKIPPED,
+                        "seconds": 0.0,
+                        "error": f"dependency {blocked[0]} {results[blocked[0]]['status']}"
+                    }
+                elif all(state == SUCCEEDED for state in states) and len(running) < jobs \
+                        and backend_load.get(backend[name], 0) < per_backend:
+                    future = pool.submit(run_workspace, by_name[name], command)
+                    running[future] = (name, time.monotonic())
+                    backend_load[backend[name]] = backend_load.get(backend[name], 0) + 1
+                else:
+                    waiting.append(name)
+            pending = waiting
+            
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, started = running.pop(future)
+                backend_load[backend[name]] -= 1
+                seconds = time.monotonic() - started
+                try:
+                    results[name] = {"status": SUCCEEDED, "seconds": seconds, **future.result()}
+                except Exception as e:
+                    results[name] = {"status": FAILED, "seconds": seconds, "error": str(e)}
+    
+    save_history(history, command, {
+        name: result["seconds"] for name, result in results.items() if result["status"] == SUCCEEDED
+    })
+    return results
+
+def print_report(results: Dict[str, Dict[str, Any]], command: str, elapsed: float):
+    print(f"{'workspace':<32} {'status':<10} {'seconds':>8} {'add':>5} {'change':>6} {'remove':>6}  error")
+    for name in sorted(results):
+        result = results[name]
+        changes = result.get("changes", {})
+        error = result.get("error", "").splitlines()[0] if result.get("error") else ""
+        print(f"{name:<32} {result['status']:<10} {result['seconds']:>8.1f} "
+              f"{changes.get('add', '-'):>5} {changes.get('change', '-'):>6} {changes.get('remove', '-'):>6}  {error}")
+    
+    counts = {status: sum(r["status"] == status for r in results.values()) for status in (SUCCEEDED, FAILED, SKIPPED)}
+    totals = {key: sum(r.get("changes", {}).get(key, 0) for r in results.values()) for key in ("add", "change", "remove")}
+    busy = sum(r["seconds"] for r in results.values())
+    cached = sum(bool(r.get("cached")) for r in results.values())
+    print(f"\n{command}: {counts[SUCCEEDED]} succeeded, {counts[FAILED]} failed, {counts[SKIPPED]} skipped; "
+          f"{totals['add']} to add, {totals['change']} to change, {totals['remove']} to remove; "
+          f"{cached} plans from cache")
+    print(f"{elapsed:.1f}s elapsed for {busy:.1f}s of workspace runs")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Terraform across many workspaces")
+    parser.add_argument("command", choices=["plan", "apply"])
+    parser.add_argument("--fleet", help="Fleet file (JSON) listing workspaces")
+    parser.add_argument("--workspace", action="append", default=[],
+                        help="Workspace name or glob (repeatable); filters the fleet file if given")
+    parser.add_argument("--template", help="Template for workspaces not in a fleet file")
+    parser.add_argument("--state-bucket")
+    parser.add_argument("--state-table")
+    parser.add_argument("--variables", type=json.loads, default=None)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 4, help="Workspaces run at once")
+    parser.add_argument("--per-backend", type=int, default=PER_BACKEND,
+                        help="Concurrent runs per state backend (default: TF_ORCHESTRATOR_PER_BACKEND)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    
+    if args.template:
+        args.template = os.path.abspath(args.template)
+    defaults = {
+        key: value for key, value in (
+            ("template", args.template), ("state_bucket", args.state_bucket),
+            ("state_table", args.state_table), ("variables", args.variables)
+        ) if value is not None
+    }
+    if args.fleet:
+        specs = load_fleet(args.fleet, defaults)
+        if args.workspace:
+            specs = [s for s in specs if any(fnmatch.fnmatchcase(s["workspace"], p) for p in args.workspace)]
+            # Dependencies outside the selection are assumed to be in place
+            names = {s["workspace"] for s in specs}
+            for spec in specs:
+                spec["depends_on"] = [d for d in spec.get("depends_on", []) if d in names]
+    elif args.workspace:
+        try:
+            specs = [{"workspace": name, **defaults} for name in expand_workspaces(args.workspace)]
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        parser.error("give --fleet or --workspace")
+    if not specs:
+        parser.error("no workspaces selected")
+    
+    try:
+        validate(specs)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    start = time.monotonic()
+    results = orchestrate(specs, args.command, args.jobs, args.per_backend)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results, args.command, time.monotonic() - start)
+    sys.exit(1 if any(r["status"] != SUCCEEDED for r in results.values()) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Plan Model
+Compact, indexed view of a saved Terraform plan.
+
+Built once from `terraform show -json tfplan` and saved next to the plan
+file as a small SQLite database (tfplan.index.db). Each resource change
+keeps its address, type, module, provider, a single action (create,
+update, replace, delete, read, no-op) and the names of the attributes
+that change; attribute values are left out. A deposed object (left over
+from a create-before-destroy replace) shares its address with the
+current object and is told apart by its deposed key. Address, type, action and
+module are indexed, so questions like "what gets replaced?" are an
+indexed lookup that reads only the matching rows, not a re-parse of a
+multi-MB plan.
+
+Usage:
+    model = PlanModel(work_dir / "tfplan.index.db")
+    model.select(action="replace")
+    model.select(type="aws_iam_*", module="module.app")
+"""
+
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+FORMAT_VERSION = 2
+INDEX_SUFFIX = ".index.db"
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE changes (
+    position INTEGER PRIMARY KEY,
+    address TEXT NOT NULL,
+    deposed TEXT,
+    type TEXT,
+    name TEXT,
+    mode TEXT,
+    module TEXT NOT NULL,
+    provider TEXT,
+    action TEXT NOT NULL,
+    changed TEXT,
+    reason TEXT,
+    replace_paths TEXT
+);
+CREATE TABLE outputs (name TEXT PRIMARY KEY, action TEXT NOT NULL);
+"""
+# Created after the rows are in, which is faster than maintaining them
+INDEXES = """
+CREATE UNIQUE INDEX changes_address ON changes (address, deposed);
+CREATE INDEX changes_type ON changes (type);
+CREATE INDEX changes_action ON changes (action);
+CREATE INDEX changes_module ON changes (module);
+"""
+COLUMNS = ("address", "deposed", "type", "name", "mode", "module", "provider", "action", "changed", "reason", "replace_paths")
+# Stored as JSON text
+JSON_COLUMNS = ("changed", "replace_paths")
+FILTERS = ("address", "type", "action", "module")
+COUNTABLE = ("type", "action", "module", "provider", "mode")
+
+def normalize_action(actions: List[str]) -> str:
+    """Terraform's action list as one word; delete + create is "replace"."""
+    if "create" in actions and "delete" in actions:
+        return "replace"
+    return actions[0] if actions else "no-op"
+
+def changed_attributes(change: Dict[str, Any]) -> Optional[List[str]]:
+    """Top-level attributes that differ between before and after (None: all)."""
+    before, after = change.get("before"), change.get("after")
+    if not isinstance(before, dict) or not isinstance(after, dict):
+        return None
+    unknown = change.get("after_unknown") or {}
+    return sorted(
+        key for key in before.keys() | after.keys() | unknown.keys()
+        if before.get(key) != after.get(key) or unknown.get(key)
+    )
+
+def _rows(document: Dict[str, Any]) -> Iterable[tuple]:
+    for rc in document.get("resource_changes", []):
+        change = rc.get("change", {})
+        replace_paths = change.get("replace_paths")
+        yield (
+            rc["address"],
+            rc.get("deposed"),
+            rc.get("type"),
+            rc.get("name"),
+            rc.get("mode", "managed"),
+            rc.get("module_address") or "",
+            rc.get("provider_name"),
+            normalize_action(change.get("actions", [])),
+            json.dumps(changed_attributes(change)),
+            rc.get("action_reason"),
+            json.dumps(replace_paths) if replace_paths else None
+        )
+
+def _where(filters: Dict[str, Optional[str]]):
+    """WHERE clause for exact values or globs (SQLite GLOB: * ? [...])."""
+    clauses, values = [], []
+    for column, pattern in filters.items():
+        if column not in FILTERS:
+            raise ValueError(f"Cannot filter by {column}")
+        if pattern is None:
+            continue
+        clauses.append(f"{column} GLOB ?" if any(c in pattern for c in "*?[") else f"{column} = ?")
+        values.append(pattern)
+    return (f"WHERE {' AND '.join(clauses)} " if clauses else ""), values
+
+class PlanModel:
+    """Read-only queries over a saved plan index."""
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"No plan index: {self.path}")
+        self._connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        self._connection.row_factory = sqlite3.Row
+        meta = {row["key"]: row["value"] for row in self._connection.execute("SELECT key, value FROM meta")}
+        if meta.get("format_version") != str(FORMAT_VERSION):
+            raise ValueError(f"Unsupported plan index format: {meta.get('format_version')}")
+        self.terraform_version = meta.get("terraform_version")
+        self.errored = meta.get("errored") == "true"
+    
+    @classmethod
+    def build(cls, document: Dict[str, Any], path: Path) -> "PlanModel":
+        """
+        Index the document `terraform show -json <planfile>` prints and
+        save it at path, replacing any previous index atomically.
+        """
+        path = Path(path)
+        partial = path.with_name(f".{path.name}.{os.getpid()}")
+        partial.unlink(missing_ok=True)
+        connection = sqlite3.connect(partial)
+        try:
+            connection.executescript(SCHEMA)
+            connection.executemany(
+                f"INSERT INTO changes ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                _rows(document)
+            )
+            connection.executemany(
+                "INSERT INTO outputs (name, action) VALUES (?, ?)",
+                ((name, normalize_action(change.get("actions", [])))
+                 for name, change in document.get("output_changes", {}).items())
+            )
+            connection.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+                ("format_version", str(FORMAT_VERSION)),
+                ("terraform_version", document.get("terraform_version")),
+                ("errored", "true" if document.get("errored") else "false")
+            ])
+            connection.executescript(INDEXES)
+            connection.commit()
+        finally:
+            connection.close()
+        os.replace(partial, path)
+        return cls(path)
+    
+    def close(self):
+        self._connection.close()
+    
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Dict[str, Any]:
+        record = {column: row[column] for column in COLUMNS}
+        for column in JSON_COLUMNS:
+            if record[column] is not None:
+                record[column] = json.loads(record[column])
+        return record
+    
+    def get(self, address: str, deposed: str = None) -> Optional[Dict[str, Any]]:
+        """The change of the current object at address, or of one deposed object."""
+        row = self._connection.execute(
+            "SELECT * FROM changes WHERE address = ? AND deposed IS ?", (address, deposed)
+        ).fetchone()
+        return self._record(row) if row else None
+    
+    def select(self, address: str = None, type: str = None, action: str = None,
+               module: str = None) -> List[Dict[str, Any]]:
+        """
+        Resource changes matching every filter given, in plan order.
+        Filters are exact values or globs (module "" is the root module).
+        """
+        where, values = _where({"address": address, "type": type, "action": action, "module": module})
+        rows = self._connection.execute(f"SELECT * FROM changes {where}ORDER BY position", values)
+        return [self._record(row) for row in rows]
+    
+    def counts(self, field: str = "action", **filters: Optional[str]) -> Dict[str, int]:
+        """Number of resource changes per value of field, after filters."""
+        if field not in COUNTABLE:
+            raise ValueError(f"Cannot count by {field}")
+        where, values = _where(filters)
+        rows = self._connection.execute(f"SELECT {field}, COUNT(*) FROM changes {where}GROUP BY {field}", values)
+        return {value if value is not None else "": count for value, count in rows}
+    
+    def outputs(self) -> Dict[str, str]:
+        return {row["name"]: row["action"] for row in self._connection.execute("SELECT name, action FROM outputs")}
+
+def index_path(plan_file: Path) -> Path:
+    """Where the model of plan_file is kept."""
+    plan_file = Path(plan_file)
+    return plan_file.with_name(plan_file.name + INDEX_SUFFIX)
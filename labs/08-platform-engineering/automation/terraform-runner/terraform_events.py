@@ -0,0 +1,225 @@
+"""
+Terraform Events
+Streams Terraform's machine-readable UI (-json) line by line.
+
+TerraformProcess runs one Terraform command and yields a TerraformEvent
+per output line as it arrives, so callers can report progress while the
+command runs. Nothing but a bounded RunSummary is kept: change counts,
+the first diagnostics, outputs and the last few log lines. A plan with
+thousands of resources costs the same memory as a plan with ten.
+
+Usage:
+    process = TerraformProcess(["terraform", "plan", "-json"], cwd=work_dir)
+    for event in process:
+        if event.type == "planned_change":
+            print(event.address, event.data["change"]["action"])
+    process.check("plan")
+    print(process.summary.to_dict())
+"""
+
+import json
+import re
+import subprocess
+import threading
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+# Diagnostics kept in full; later ones are only counted
+MAX_DIAGNOSTICS = 50
+# Failed resource addresses kept in full
+MAX_ERRORED = 100
+# Log / stderr lines kept for error messages and the "output" field
+TAIL_LINES = 20
+# Diagnostic summaries Terraform uses for lock contention and for a saved
+# plan that no longer matches the state
+LOCK_ERROR_SUMMARY = "Error acquiring the state lock"
+STALE_PLAN_SUMMARY = "Saved plan is stale"
+LOCK_INFO_FIELD = re.compile(r"^\s*(ID|Path|Operation|Who|Version|Created):\s*(.*?)\s*$", re.MULTILINE)
+
+class StateLockError(Exception):
+    """The state was locked by another run; lock_info says by whom."""
+    
+    def __init__(self, message: str, lock_info: Dict[str, str]):
+        super().__init__(message)
+        self.lock_info = lock_info
+
+class StalePlanError(Exception):
+    """A saved plan was applied after the state it was made from changed."""
+
+class TerraformEvent(NamedTuple):
+    type: str
+    level: str
+    message: str
+    data: Dict[str, Any]
+    
+    @property
+    def address(self) -> Optional[str]:
+        """Resource address the event is about, if any."""
+        for key in ("change", "hook"):
+            resource = self.data.get(key, {}).get("resource")
+            if resource:
+                return resource.get("addr")
+        return self.data.get("diagnostic", {}).get("address")
+    
+    @classmethod
+    def parse(cls, line: str) -> "TerraformEvent":
+        """One output line; lines that are not JSON become "output" events."""
+        try:
+            data = json.loads(line)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return cls("output", "info", line.rstrip("\n"), {})
+        return cls(data.get("type", "log"), data.get("@level", "info"), data.get("@message", ""), data)
+
+class RunSummary:
+    """What a run leaves behind, with every collection bounded."""
+    
+    def __init__(self):
+        self.version = None
+        self.events = 0
+        self.planned = Counter()
+        self.change_summary = {}
+        self.applied = Counter()
+        self.errored: List[str] = []
+        self.diagnostic_counts = Counter()
+        self.diagnostics: List[Dict[str, Any]] = []
+        self.outputs = None
+        self.tail = deque(maxlen=TAIL_LINES)
+    
+    def add(self, event: TerraformEvent):
+        self.events += 1
+        data = event.data
+        if event.type == "version":
+            self.version = data.get("terraform")
+        elif event.type == "planned_change":
+            self.planned[data["change"].get("action", "unknown")] += 1
+        elif event.type == "change_summary":
+            self.change_summary = data.get("changes", {})
+        elif event.type == "apply_complete":
+            self.applied[data["hook"].get("action", "unknown")] += 1
+        elif event.type == "apply_errored":
+            if len(self.errored) < MAX_ERRORED:
+                self.errored.append(event.address)
+        elif event.type == "diagnostic":
+            diagnostic = data.get("diagnostic", {})
+            severity = diagnostic.get("severity", event.level)
+            self.diagnostic_counts[severity] += 1
+            if len(self.diagnostics) < MAX_DIAGNOSTICS:
+                self.diagnostics.append({
+                    "severity": severity,
+                    "summary": diagnostic.get("summary", event.message),
+                    "detail": diagnostic.get("detail", ""),
+                    "address": diagnostic.get("address")
+                })
+        elif event.type == "outputs":
+            self.outputs = data.get("outputs", {})
+        
+        if event.message and event.type in ("log", "output", "diagnostic", "change_summary"):
+            self.tail.append(event.message)
+    
+    def errors(self) -> List[str]:
+        return [
+            f"{d['summary']}: {d['detail']}" if d["detail"] else d["summary"]
+            for d in self.diagnostics if d["severity"] == "error"
+        ]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "terraform_version": self.version,
+            "events": self.events,
+            "planned": dict(self.planned),
+            "changes": self.change_summary,
+            "applied": dict(self.applied),
+            "errored": self.errored,
+            "diagnostic_counts": dict(self.diagnostic_counts),
+            "diagnostics": self.diagnostics
+        }
+
+class TerraformProcess:
+    """
+    A running Terraform command. Iterate it for events; the summary,
+    return code and stderr tail are available once iteration is done.
+    """
+    
+    def __init__(self, cmd: List[str], cwd=None, env: Dict[str, str] = None,
+                 on_event: Callable[[TerraformEvent], None] = None):
+        self.cmd = cmd
+        self.cwd = cwd
+        self.env = env
+        self.on_event = on_event
+        self.summary = RunSummary()
+        self.stderr = deque(maxlen=TAIL_LINES)
+        self.returncode = None
+    
+    def __iter__(self) -> Iterator[TerraformEvent]:
+        process = subprocess.Popen(
+            self.cmd,
+            cwd=self.cwd,
+            env=self.env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        # Drain stderr alongside stdout, so neither pipe can fill up and stall
+        # Terraform
+        stderr_reader = threading.Thread(target=self.stderr.extend, args=(process.stderr,), daemon=True)
+        stderr_reader.start()
+        try:
+            for line in process.stdout:
+                if not line.strip():
+                    continue
+                event = TerraformEvent.parse(line)
+                self.summary.add(event)
+                if self.on_event:
+                    self.on_event(event)
+                yield event
+        finally:
+            # Reached on normal exit, on an exception in a callback, and when
+            # the consumer stops iterating early
+            if process.poll() is None and not self._drained(process):
+                process.terminate()
+            process.stdout.close()
+            self.returncode = process.wait()
+            stderr_reader.join()
+            process.stderr.close()
+    
+    @staticmethod
+    def _drained(process) -> bool:
+        try:
+            process.wait(timeout=0.1)
+            return True
+        except subprocess.TimeoutExpired:
+            return False
+    
+    def run(self) -> "TerraformProcess":
+        """Consume every event (callbacks still fire) and return self."""
+        for _ in self:
+            pass
+        return self
+    
+    def lock_info(self) -> Optional[Dict[str, str]]:
+        """Lock holder details if the run failed on a locked state, else None."""
+        for diagnostic in self.summary.diagnostics:
+            if diagnostic["severity"] == "error" and diagnostic["summary"].startswith(LOCK_ERROR_SUMMARY):
+                return {key.lower(): value for key, value in LOCK_INFO_FIELD.findall(diagnostic["detail"])}
+        return None
+    
+    def check(self, action: str):
+        """
+        Raise if the command failed, with its error diagnostics or stderr:
+        StateLockError for lock contention, StalePlanError for a stale saved
+        plan, Exception otherwise.
+        """
+        if self.returncode == 0:
+            return
+        errors = self.summary.errors() or [line.rstrip("\n") for line in self.stderr] or list(self.summary.tail)
+        message = f"Terraform {action} failed: " + "\n".join(errors)
+        lock_info = self.lock_info()
+        if lock_info is not None:
+            raise StateLockError(message, lock_info)
+        if any(d["summary"].startswith(STALE_PLAN_SUMMARY) for d in self.summary.diagnostics):
+            raise StalePlanError(message)
+        raise Exception(message)
@@ -2,15 +2,211 @@
 """
 Terraform Runner
 Executes Terraform plans and applies for service provisioning.
+
+Providers are downloaded once into a shared plugin cache
+(TF_PLUGIN_CACHE_DIR) and workspaces link to them. The dependency lock
+file produced by the first init of a template is kept in the cache,
+keyed by the template's content hash, and copied into every later
+workspace of that template, so Terraform can use the cached providers
+without contacting the registry. init() is skipped when the template and
+backend configuration are unchanged since the last successful init.
 """
 
+import fcntl
+import hashlib
 import os
+import re
 import sys
 import json
+import random
+import shutil
 import subprocess
+import tempfile
+import threading
+import time
 import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Callable, List, Optional
+
+from plan_model import PlanModel, index_path
+from terraform_events import StalePlanError, TerraformEvent, TerraformProcess
+from tfvars import (VariableError, check, parse_assignments, parse_declarations, parse_json_declarations,
+                    render)
+
+WORKSPACES_DIR = Path(os.environ.get("TF_WORKSPACES_DIR", "/tmp/terraform-workspaces"))
+PLUGIN_CACHE_DIR = Path(os.environ.get("TF_PLUGIN_CACHE_DIR", "/tmp/terraform-plugin-cache"))
+# Dependency lock files by template hash
+LOCK_FILES_DIR = PLUGIN_CACHE_DIR / "lock-files"
+# Written into .terraform/ after a successful init
+INIT_RECORD = "runner-init.json"
+# Hard-link unchanged template files into workspaces instead of copying
+LINK_TEMPLATE_FILES = os.environ.get("TF_LINK_TEMPLATE_FILES", "true").lower() == "true"
+# Record of what setup_workspace() synced, kept in the workspace
+TEMPLATE_MANIFEST = ".template-manifest.json"
+# Never synced from a template
+SYNC_IGNORE_DIRS = {".terraform", ".git"}
+SYNC_IGNORE_SUFFIXES = (".tfstate", ".tfstate.backup", ".tfplan")
+# Files the runner or Terraform rewrite in the workspace; always copied,
+# so a rewrite can never reach the template through a hard link
+NEVER_LINK = {"backend.tf", ".terraform.lock.hcl", "terraform.tfvars", "terraform.tfvars.json"}
+# Written into .terraform/ after a successful plan: the key and summary of
+# the plan in tfplan
+PLAN_RECORD = "runner-plan.json"
+TFVARS_FILE = "terraform.tfvars.json"
+# Variable files a template may ship. Terraform loads terraform.tfvars
+# before TFVARS_FILE and *.auto.tfvars(.json) after it; later files win.
+TEMPLATE_TFVARS = ("terraform.tfvars", ".auto.tfvars", ".auto.tfvars.json")
+# A cached plan older than this is planned again even if nothing changed,
+# so out-of-band drift is still found
+PLAN_CACHE_TTL = int(os.environ.get("TF_PLAN_CACHE_TTL", "43200"))
+# Bytes of the state object read to find its serial and lineage
+STATE_HEADER_BYTES = 4096
+# Retries of a command that failed on a locked state, with exponential
+# backoff and full jitter between TF_LOCK_BACKOFF and TF_LOCK_BACKOFF_MAX
+LOCK_RETRIES = int(os.environ.get("TF_LOCK_RETRIES", "5"))
+LOCK_BACKOFF = float(os.environ.get("TF_LOCK_BACKOFF", "2"))
+LOCK_BACKOFF_MAX = float(os.environ.get("TF_LOCK_BACKOFF_MAX", "60"))
+# Concurrent inits in prewarm(); init mostly waits on I/O, not CPU
+INIT_PARALLELISM = int(os.environ.get("TF_INIT_PARALLELISM", "8"))
+# Disk budget for all workspaces together; beyond it the least recently
+# used are evicted. Unset or 0: nothing is evicted except by an explicit gc
+WORKSPACE_BUDGET = int(os.environ.get("TF_WORKSPACE_BUDGET", "0"))
+# Seconds between automatic collections in one process
+GC_INTERVAL = int(os.environ.get("TF_WORKSPACE_GC_INTERVAL", "300"))
+# Written into .terraform/: the workspace's disk usage
+USAGE_RECORD = "runner-usage.json"
+# One lock file per workspace: runners hold it shared, gc exclusive. Its
+# mtime is the workspace's last use.
+LEASES_DIR = WORKSPACES_DIR / ".leases"
+
+_s3 = None
+
+def s3_client():
+    """S3 client for state lookups, built on first use."""
+    global _s3
+    if _s3 is None:
+        _s3 = boto3.client("s3", region_name=os.environ.get("AWS_REGION", "us-west-2"))
+    return _s3
+
+@contextmanager
+def plugin_cache_lock():
+    """
+    Exclusive lock held while an init may download into the plugin cache.
+    Terraform does not guard concurrent writes to the cache itself.
+    """
+    PLUGIN_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(PLUGIN_CACHE_DIR / ".init.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """
+    Replace path with content unless it already holds exactly that.
+    The new file is renamed into place, so readers never see a partial
+    file and a hard-linked original is left untouched.
+    """
+    data = content.encode()
+    try:
+        if path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    partial = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+    partial.write_bytes(data)
+    os.replace(partial, path)
+    return True
+
+def parse_size(text: str) -> int:
+    """Bytes in "2G", "500M", "64K" or "1048576" (powers of 1024)."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?\s*", text, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Not a size: {text}")
+    return int(float(match.group(1)) * 1024 ** " KMGT".index(match.group(2).upper() or " "))
+
+def disk_usage(path: Path) -> int:
+    """
+    Bytes a workspace holds by itself. Files hard-linked from the template
+    and provider symlinks into the plugin cache are not counted: evicting
+    the workspace would not free them.
+    """
+    total, pending = 0, [path]
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                if not entry.is_symlink() and stat.st_nlink == 1:
+                    total += stat.st_blocks * 512
+    return total
+
+def _lease_file(workspace: str):
+    LEASES_DIR.mkdir(parents=True, exist_ok=True)
+    return open(LEASES_DIR / f"{workspace}.lock", "a")
+
+def _template_files(source_dir: Path):
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = sorted(d for d in dirs if d not in SYNC_IGNORE_DIRS)
+        for name in sorted(files):
+            if not name.endswith(SYNC_IGNORE_SUFFIXES) and name != TEMPLATE_MANIFEST:
+                yield Path(root) / name
+
+def _stat_key(path: Path):
+    """Identity of a workspace file, to notice edits made behind our back."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+def _install(source: Path, target: Path, link: bool, replace: bool):
+    # A source edited in place is still hard-linked to the target, which
+    # therefore already has its content. Linking it to a temporary name and
+    # renaming would be a no-op that leaves the temporary file behind.
+    if replace and os.path.samefile(source, target):
+        return
+    # Replacing goes through a temporary name, so the target never vanishes
+    destination = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}") if replace else target
+    if link:
+        try:
+            os.link(source, destination)
+        except OSError:
+            # Different filesystem, or links not supported
+            shutil.copy2(source, destination)
+    else:
+        shutil.copy2(source, destination)
+    if replace:
+        os.replace(destination, target)
+
+# (path, size, mtime_ns) -> sha256 of template files, shared by every
+# workspace synced in this process
+_template_digests: Dict[tuple, str] = {}
+
+# Variable declarations of a root module, by the stat of its .tf files.
+# Hard-linked workspaces of one template share inodes, so they share one
+# parse.
+_template_variables: Dict[tuple, Dict[str, Dict[str, Any]]] = {}
+
+def _file_digest(path: Path, stat: os.stat_result) -> str:
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    digest = _template_digests.get(key)
+    if digest is None:
+        digest = _template_digests[key] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return digest
 
 class TerraformRunner:
     def __init__(self, workspace: str, template_path: str, state_bucket: str, state_table: str):
@@ -18,14 +214,51 @@ class TerraformRunner:
         self.template_path = template_path
         self.state_bucket = state_bucket
         self.state_table = state_table
-        self.work_dir = Path(f"/tmp/terraform-workspaces/{workspace}")
+        self.work_dir = WORKSPACES_DIR / workspace
+        self.env = {**os.environ, "TF_PLUGIN_CACHE_DIR": str(PLUGIN_CACHE_DIR), "TF_IN_AUTOMATION": "1"}
+        self._lease = None
+    
+    def __enter__(self) -> "TerraformRunner":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.release()
+    
+    def acquire(self):
+        """
+        Take a shared lease on the workspace, held until release(), so gc
+        never evicts it while this runner works in it, and mark it as just
+        used. Waits if gc is evicting it right now.
+        """
+        if self._lease is None:
+            lease = _lease_file(self.workspace)
+            fcntl.flock(lease, fcntl.LOCK_SH)
+            os.utime(lease.fileno())
+            self._lease = lease
+    
+    def release(self):
+        if self._lease is not None:
+            # Closing the file drops the lock
+            self._lease.close()
+            self._lease = None
+    
+    def record_usage(self) -> Dict[str, Any]:
+        """Measure and record the workspace's disk usage."""
+        record = {"bytes": disk_usage(self.work_dir)}
+        (self.work_dir / ".terraform").mkdir(exist_ok=True)
+        write_if_changed(self.work_dir / ".terraform" / USAGE_RECORD, json.dumps(record))
+        return record
         
-    def setup_workspace(self):
-        """Create isolated workspace directory."""
+    def setup_workspace(self) -> Dict[str, Any]:
+        """
+        Create isolated workspace directory and sync the template into it.
+        Leases the workspace (see acquire()) and may evict cold ones.
+        """
+        self.acquire()
+        collect_if_due()
         self.work_dir.mkdir(parents=True, exist_ok=True)
         
-        # Copy template to workspace
-        subprocess.run(["cp", "-r", f"{self.template_path}/*", str(self.work_dir)], check=True)
+        sync = self.sync_template()
         
         # Create backend configuration
         backend_config = f"""
@@ -39,105 +272,595 @@ terraform {{
   }}
 }}
 """
-        (self.work_dir / "backend.tf").write_text(backend_config)
+        if write_if_changed(self.work_dir / "backend.tf", backend_config) or sync["copied"] or sync["removed"]:
+            self.record_usage()
+        return sync
+    
+    def sync_template(self) -> Dict[str, Any]:
+        """
+        Make the workspace's template files match template_path: copy (or
+        hard-link) new and changed files, remove files the template no
+        longer has, and leave everything else alone.
+        
+        The manifest records each file's source stat and hash and the stat
+        of the workspace copy, so an unchanged template costs one stat per
+        file; source files are only read when their stat changed.
+        """
+        source_dir = Path(self.template_path)
+        if not source_dir.is_dir():
+            raise FileNotFoundError(f"Template not found: {source_dir}")
+        manifest_path = self.work_dir / TEMPLATE_MANIFEST
+        try:
+            previous = json.loads(manifest_path.read_text())
+        except (OSError, ValueError):
+            previous = {}
+        
+        manifest, copied = {}, []
+        directories = {self.work_dir}
+        for source in _template_files(source_dir):
+            relative = source.relative_to(source_dir).as_posix()
+            target = self.work_dir / relative
+            stat = source.stat()
+            entry = previous.get(relative)
+            if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                digest = entry["sha256"]
+            else:
+                digest = _file_digest(source, stat)
+            
+            current = _stat_key(target)
+            # A hard link to the source is current by definition
+            if entry and entry["sha256"] == digest and current and (
+                    current == entry.get("target") or current[0] == stat.st_ino):
+                manifest[relative] = dict(entry, size=stat.st_size, mtime_ns=stat.st_mtime_ns, target=current)
+                continue
+            
+            if target.parent not in directories:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                directories.add(target.parent)
+            _install(source, target, link=LINK_TEMPLATE_FILES and target.name not in NEVER_LINK,
+                     replace=current is not None)
+            manifest[relative] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": digest,
+                "target": _stat_key(target)
+            }
+            copied.append(relative)
+        
+        removed = sorted(set(previous) - set(manifest))
+        for relative in removed:
+            target = self.work_dir / relative
+            target.unlink(missing_ok=True)
+            # Drop directories the template no longer has
+            for parent in target.parents:
+                if parent == self.work_dir:
+                    break
+                try:
+                    parent.rmdir()
+                except OSError:
+                    break
+        
+        if manifest != previous:
+            write_if_changed(manifest_path, json.dumps(manifest, indent=1, sort_keys=True))
+        return {"copied": copied, "removed": removed, "unchanged": len(manifest) - len(copied)}
+        
+    def template_hash(self) -> str:
+        """Content hash of the workspace's Terraform files, excluding the backend."""
+        digest = hashlib.sha256()
+        for path in sorted(self.work_dir.rglob("*")):
+            relative = path.relative_to(self.work_dir)
+            if relative.parts[0] == ".terraform" or relative.name == "backend.tf":
+                continue
+            if path.is_file() and path.name.endswith((".tf", ".tf.json")):
+                digest.update(str(relative).encode() + b"\0" + path.read_bytes() + b"\0")
+        return digest.hexdigest()
+    
+    def init_fingerprint(self) -> str:
+        """What init depends on: the template and the backend configuration."""
+        backend = self.work_dir / "backend.tf"
+        backend_config = backend.read_bytes() if backend.exists() else b""
+        return hashlib.sha256(self.template_hash().encode() + backend_config).hexdigest()
+    
+    def variable_declarations(self) -> Dict[str, Dict[str, Any]]:
+        """Variables the workspace's root module declares (parsed once per file version)."""
+        sources = sorted(
+            path for path in self.work_dir.iterdir()
+            if path.name.endswith((".tf", ".tf.json")) and path.name != "backend.tf" and path.is_file()
+        )
+        key = tuple((path.name, *_stat_key(path)) for path in sources)
+        declared = _template_variables.get(key)
+        if declared is None:
+            declared = {}
+            for path in sources:
+                if path.name.endswith(".tf.json"):
+                    declared.update(parse_json_declarations(json.loads(path.read_text())))
+                else:
+                    declared.update(parse_declarations(path.read_text()))
+            _template_variables[key] = declared
+        return declared
+    
+    def template_tfvars(self) -> List[Path]:
+        """The template's own variable files in the workspace (see TEMPLATE_TFVARS)."""
+        return sorted(
+            path for path in self.work_dir.iterdir()
+            if (path.name == TEMPLATE_TFVARS[0] or path.name.endswith(TEMPLATE_TFVARS[1:])) and path.is_file()
+        )
+    
+    def needs_init(self) -> bool:
+        record = self.work_dir / ".terraform" / INIT_RECORD
+        try:
+            return json.loads(record.read_text())["fingerprint"] != self.init_fingerprint()
+        except (OSError, ValueError, KeyError):
+            return True
+    
+    def init(self, force: bool = False) -> bool:
+        """
+        Initialize Terraform workspace, unless nothing init depends on has
+        changed since the last successful init. Returns whether init ran.
+        """
+        if not force and not self.needs_init():
+            return False
         
-    def init(self):
-        """Initialize Terraform workspace."""
+        shared_lock_file = LOCK_FILES_DIR / f"{self.template_hash()}.terraform.lock.hcl"
+        # Without a known lock file, init resolves and downloads providers:
+        # one such init at a time per plugin cache
+        warm = self._adopt_lock_file(shared_lock_file)
+        if not warm:
+            with plugin_cache_lock():
+                # Another workspace of this template may have warmed the
+                # cache while we waited
+                warm = self._adopt_lock_file(shared_lock_file)
+                if not warm:
+                    self._run_init()
+                    self._share_lock_file(shared_lock_file)
+        if warm:
+            self._run_init()
+            self._share_lock_file(shared_lock_file)
+        
+        (self.work_dir / ".terraform" / INIT_RECORD).write_text(
+            json.dumps({"fingerprint": self.init_fingerprint()})
+        )
+        self.record_usage()
+        return True
+    
+    def _run_init(self):
         subprocess.run(
-            ["terraform", "init"],
+            ["terraform", "init", "-input=false"],
             cwd=self.work_dir,
+            env=self.env,
             check=True
         )
         
-    def plan(self, variables: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate Terraform plan."""
-        # Write variables to tfvars file
-        tfvars_content = "\n".join([f'{k} = "{v}"' for k, v in variables.items()])
-        (self.work_dir / "terraform.tfvars").write_text(tfvars_content)
+    def _adopt_lock_file(self, shared_lock_file: Path) -> bool:
+        """Copy the template's known lock file into the workspace if it has none."""
+        workspace_lock_file = self.work_dir / ".terraform.lock.hcl"
+        if workspace_lock_file.exists():
+            return shared_lock_file.exists()
+        try:
+            shutil.copyfile(shared_lock_file, workspace_lock_file)
+        except FileNotFoundError:
+            return False
+        return True
+    
+    def _share_lock_file(self, shared_lock_file: Path):
+        workspace_lock_file = self.work_dir / ".terraform.lock.hcl"
+        if not workspace_lock_file.exists():
+            return
+        LOCK_FILES_DIR.mkdir(parents=True, exist_ok=True)
+        write_if_changed(shared_lock_file, workspace_lock_file.read_text())
         
-        # Run terraform plan
-        result = subprocess.run(
-            ["terraform", "plan", "-out=tfplan", "-json"],
+    def stream(self, command: str, *args: str, on_event: Callable[[TerraformEvent], None] = None) -> TerraformProcess:
+        """
+        Terraform command with -json output, not yet started: iterate it to
+        run the command and receive its events as they arrive.
+        """
+        return TerraformProcess(
+            ["terraform", command, "-json", "-input=false", *args],
             cwd=self.work_dir,
-            capture_output=True,
-            text=True
+            env=self.env,
+            on_event=on_event
         )
+    
+    def run(self, command: str, *args: str, on_event: Callable[[TerraformEvent], None] = None) -> TerraformProcess:
+        """
+        Run a Terraform command to completion, streaming events to on_event.
+        If it fails because another run holds the state lock, run it again
+        after a jittered backoff, up to TF_LOCK_RETRIES times.
+        """
+        for attempt in range(LOCK_RETRIES + 1):
+            process = self.stream(command, *args, on_event=on_event).run()
+            if process.returncode == 0 or attempt == LOCK_RETRIES or process.lock_info() is None:
+                return process
+            # Full jitter: concurrent waiters spread out instead of retrying
+            # in lockstep
+            time.sleep(random.uniform(0, min(LOCK_BACKOFF_MAX, LOCK_BACKOFF * 2 ** attempt)))
+        return process
+    
+    def state_version(self) -> Optional[Dict[str, Any]]:
+        """
+        Lineage and serial of the workspace's remote state, read from the
+        first bytes of the state object; {"lineage": None, "serial": 0} if
+        there is no state yet, None if it could not be read.
+        """
+        try:
+            response = s3_client().get_object(
+                Bucket=self.state_bucket,
+                Key=f"{self.workspace}/terraform.tfstate",
+                Range=f"bytes=0-{STATE_HEADER_BYTES - 1}"
+            )
+            header = response["Body"].read().decode("utf-8", "replace")
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return {"lineage": None, "serial": 0}
+            return None
+        except BotoCoreError:
+            return None
+        serial = re.search(r'"serial":\s*(\d+)', header)
+        lineage = re.search(r'"lineage":\s*"([^"]*)"', header)
+        if not serial or not lineage:
+            return None
+        return {"lineage": lineage.group(1), "serial": int(serial.group(1))}
+    
+    def plan_key(self, tfvars_content: str, state: Dict[str, Any]) -> str:
+        """
+        What a plan depends on: variables (TF_VAR_* and the template's
+        .tfvars files too), template, backend, providers and state.
+        """
+        lock_file = self.work_dir / ".terraform.lock.hcl"
+        environment = {name: value for name, value in self.env.items() if name.startswith("TF_VAR_")}
+        digest = hashlib.sha256()
+        for part in (
+            tfvars_content.encode(),
+            json.dumps(environment, sort_keys=True).encode(),
+            b"".join(path.name.encode() + b"\0" + path.read_bytes() + b"\0" for path in self.template_tfvars()),
+            self.init_fingerprint().encode(),
+            lock_file.read_bytes() if lock_file.exists() else b"",
+            json.dumps(state, sort_keys=True).encode()
+        ):
+            digest.update(hashlib.sha256(part).digest())
+        return digest.hexdigest()
+    
+    def cached_plan(self, key: str) -> Optional[Dict[str, Any]]:
+        """The stored plan result for key, if tfplan still holds that plan."""
+        plan_file = self.work_dir / "tfplan"
+        try:
+            record = json.loads((self.work_dir / ".terraform" / PLAN_RECORD).read_text())
+            if record["key"] != key or time.time() - record["created_at"] > PLAN_CACHE_TTL:
+                return None
+            if hashlib.sha256(plan_file.read_bytes()).hexdigest() != record["plan_sha256"]:
+                return None
+        except (OSError, ValueError, KeyError):
+            return None
+        if not index_path(plan_file).exists():
+            self.index_plan(plan_file)
+        return record["result"]
+    
+    def index_plan(self, plan_file: Path) -> PlanModel:
+        """
+        Parse `terraform show -json` of a saved plan into a PlanModel and
+        save it next to the plan file.
+        """
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(
+                ["terraform", "show", "-json", str(plan_file)],
+                cwd=self.work_dir,
+                env=self.env,
+                stdout=subprocess.PIPE,
+                stderr=stderr
+            )
+            try:
+                document = json.load(process.stdout)
+            except ValueError:
+                document = None
+            process.stdout.close()
+            if process.wait() != 0 or document is None:
+                stderr.seek(0)
+                raise Exception(f"Terraform show failed: {stderr.read().decode(errors='replace')}")
+        return PlanModel.build(document, index_path(plan_file))
+    
+    def plan(self, variables: Dict[str, Any], on_event: Callable[[TerraformEvent], None] = None,
+             use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Generate Terraform plan. If the variables, template, backend,
+        providers and remote state serial are the same as for the plan
+        already in tfplan (and it is younger than TF_PLAN_CACHE_TTL), that
+        plan is returned without running Terraform ("cached": True; no
+        events are sent).
+        
+        Variables are checked against the template's declarations first;
+        VariableError lists every problem before any Terraform runs.
+        Variables the template doesn't declare are passed on and listed in
+        "warnings". TF_VAR_<name> in the runner's environment and the
+        template's own .tfvars files count as set; where those files and
+        variables overlap, the winner is listed in "warnings" too.
+        """
+        # Written by earlier versions of the runner, not by the template
+        legacy = self.work_dir / "terraform.tfvars"
+        if legacy.exists():
+            try:
+                shipped = "terraform.tfvars" in json.loads((self.work_dir / TEMPLATE_MANIFEST).read_text())
+            except (OSError, ValueError):
+                shipped = False
+            if not shipped:
+                legacy.unlink()
+        
+        assigned = {name[len("TF_VAR_"):] for name in self.env if name.startswith("TF_VAR_")}
+        overlaps = []
+        for path in self.template_tfvars():
+            text = path.read_text()
+            names = set(json.loads(text) if path.name.endswith(".json") else parse_assignments(text))
+            assigned |= names
+            for name in sorted(names & variables.keys()):
+                winner = path.name if path.name != "terraform.tfvars" else TFVARS_FILE
+                overlaps.append(f"{name}: also set by the template's {path.name}; {winner} wins")
+        warnings = check(variables, self.variable_declarations(), assigned) + overlaps
+        # Typed JSON; left alone when unchanged so its mtime stays put
+        tfvars_content = render(variables)
+        write_if_changed(self.work_dir / TFVARS_FILE, tfvars_content)
+        
+        key = None
+        if use_cache:
+            state = self.state_version()
+            # Without a readable state version there is no safe cache key
+            if state is not None:
+                key = self.plan_key(tfvars_content, state)
+                cached = self.cached_plan(key)
+                if cached is not None:
+                    return {**cached, "cached": True}
         
-        if result.returncode != 0:
-            raise Exception(f"Terraform plan failed: {result.stderr}")
+        # Run terraform plan
+        record_path = self.work_dir / ".terraform" / PLAN_RECORD
+        record_path.unlink(missing_ok=True)
+        process = self.run("plan", "-out=tfplan", on_event=on_event)
+        process.check("plan")
             
-        return {
+        plan_file = self.work_dir / "tfplan"
+        # The index only serves queries; a plan that cannot be indexed is
+        # still a good plan
+        try:
+            self.index_plan(plan_file).close()
+            plan_index, index_error = str(index_path(plan_file)), None
+        except Exception as e:
+            index_path(plan_file).unlink(missing_ok=True)
+            plan_index, index_error = None, str(e)
+        result = {
             "status": "planned",
-            "plan_file": str(self.work_dir / "tfplan"),
-            "output": result.stdout
+            "plan_file": str(plan_file),
+            "plan_index": plan_index,
+            "summary": process.summary.to_dict(),
+            "output": "\n".join(process.summary.tail)
         }
+        if index_error:
+            result["plan_index_error"] = index_error
+        if warnings:
+            result["warnings"] = warnings
+        if key is not None:
+            write_if_changed(record_path, json.dumps({
+                "key": key,
+                "created_at": time.time(),
+                "plan_sha256": hashlib.sha256((self.work_dir / "tfplan").read_bytes()).hexdigest(),
+                "result": result
+            }))
+        self.record_usage()
+        return {**result, "cached": False}
         
-    def apply(self, plan_file: str = None) -> Dict[str, Any]:
+    def apply(self, plan_file: str = None, on_event: Callable[[TerraformEvent], None] = None) -> Dict[str, Any]:
         """Apply Terraform plan."""
         if plan_file:
-            cmd = ["terraform", "apply", plan_file]
+            args = ["apply", plan_file]
+            # A saved plan can be applied once; never hand it out again
+            (self.work_dir / ".terraform" / PLAN_RECORD).unlink(missing_ok=True)
+            index_path(plan_file).unlink(missing_ok=True)
         else:
-            cmd = ["terraform", "apply", "-auto-approve"]
-            
-        result = subprocess.run(
-            cmd,
-            cwd=self.work_dir,
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode != 0:
-            raise Exception(f"Terraform apply failed: {result.stderr}")
+            args = ["apply", "-auto-approve"]
             
-        # Get outputs
-        output_result = subprocess.run(
-            ["terraform", "output", "-json"],
-            cwd=self.work_dir,
-            capture_output=True,
-            text=True
-        )
+        process = self.run(*args, on_event=on_event)
+        process.check("apply")
         
-        outputs = json.loads(output_result.stdout) if output_result.returncode == 0 else {}
+        # apply -json reports the outputs itself; older versions do not
+        outputs = process.summary.outputs
+        if outputs is None:
+            output_result = subprocess.run(
+                ["terraform", "output", "-json"],
+                cwd=self.work_dir,
+                env=self.env,
+                capture_output=True,
+                text=True
+            )
+            outputs = json.loads(output_result.stdout) if output_result.returncode == 0 else {}
         
+        self.record_usage()
         return {
             "status": "applied",
             "outputs": outputs,
-            "output": result.stdout
+            "summary": process.summary.to_dict(),
+            "output": "\n".join(process.summary.tail)
         }
         
-    def destroy(self) -> Dict[str, Any]:
+    def plan_and_apply(self, variables: Dict[str, Any],
+                       on_event: Callable[[TerraformEvent], None] = None) -> Dict[str, Any]:
+        """
+        Plan, then apply that plan. If the state changed between the two
+        (another run got the lock first), plan once more instead of failing.
+        """
+        for attempt in range(2):
+            plan = self.plan(variables, on_event=on_event)
+            try:
+                applied = self.apply(plan["plan_file"], on_event=on_event)
+            except StalePlanError:
+                if attempt:
+                    raise
+                continue
+            return {**applied, "plan": plan["summary"], "plan_cached": plan["cached"]}
+    
+    def destroy(self, on_event: Callable[[TerraformEvent], None] = None) -> Dict[str, Any]:
         """Destroy Terraform resources."""
-        result = subprocess.run(
-            ["terraform", "destroy", "-auto-approve"],
-            cwd=self.work_dir,
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode != 0:
-            raise Exception(f"Terraform destroy failed: {result.stderr}")
+        process = self.run("destroy", "-auto-approve", on_event=on_event)
+        process.check("destroy")
             
         return {
             "status": "destroyed",
-            "output": result.stdout
+            "summary": process.summary.to_dict(),
+            "output": "\n".join(process.summary.tail)
         }
 
+def prewarm(runners: List[TerraformRunner], max_workers: int = None) -> Dict[str, str]:
+    """
+    Set up and initialize several workspaces in parallel. Inits that must
+    download providers take turns on the plugin cache; the rest (and every
+    workspace whose init can be skipped) run concurrently.
+    
+    Returns {workspace: "initialized" | "up to date" | error message}.
+    """
+    def warm(runner: TerraformRunner) -> str:
+        try:
+            runner.setup_workspace()
+            return "initialized" if runner.init() else "up to date"
+        finally:
+            runner.release()
+    
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers or INIT_PARALLELISM) as pool:
+        futures = {runner.workspace: pool.submit(warm, runner) for runner in runners}
+        for workspace, future in futures.items():
+            try:
+                results[workspace] = future.result()
+            except Exception as e:
+                results[workspace] = f"failed: {e}"
+    return results
+
+def workspace_usage() -> List[Dict[str, Any]]:
+    """Disk usage and last use of every workspace, least recently used first."""
+    usage = []
+    if not WORKSPACES_DIR.exists():
+        return usage
+    for entry in os.scandir(WORKSPACES_DIR):
+        if entry.name.startswith(".") or not entry.is_dir(follow_symlinks=False):
+            continue
+        try:
+            size = json.loads(Path(entry.path, ".terraform", USAGE_RECORD).read_text())["bytes"]
+        except (OSError, ValueError, KeyError):
+            # Not used since usage was tracked
+            size = disk_usage(Path(entry.path))
+        try:
+            last_used = (LEASES_DIR / f"{entry.name}.lock").stat().st_mtime
+        except FileNotFoundError:
+            last_used = entry.stat().st_mtime
+        usage.append({"workspace": entry.name, "bytes": size, "last_used": last_used})
+    return sorted(usage, key=lambda record: record["last_used"])
+
+def collect_garbage(budget: int = WORKSPACE_BUDGET, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Evict the least recently used workspaces until the rest fit in budget
+    bytes. Leased workspaces (in use by a runner in any process) are
+    skipped. Nothing is lost: templates, providers and state all live
+    elsewhere, and an evicted workspace is rebuilt on its next use.
+    """
+    usage = workspace_usage()
+    total = sum(record["bytes"] for record in usage)
+    evicted, in_use = [], []
+    for record in usage:
+        if total <= budget:
+            break
+        with _lease_file(record["workspace"]) as lease:
+            try:
+                fcntl.flock(lease, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                in_use.append(record["workspace"])
+                continue
+            if not dry_run:
+                shutil.rmtree(WORKSPACES_DIR / record["workspace"], ignore_errors=True)
+        total -= record["bytes"]
+        evicted.append(record)
+    return {
+        "budget": budget,
+        "bytes": total,
+        "workspaces": len(usage) - len(evicted),
+        "evicted": evicted,
+        "in_use": in_use
+    }
+
+_collection_lock = threading.Lock()
+_last_collection: Optional[float] = None
+
+def collect_if_due():
+    """collect_garbage() at most once per TF_WORKSPACE_GC_INTERVAL in this process."""
+    global _last_collection
+    if WORKSPACE_BUDGET <= 0 or not _collection_lock.acquire(blocking=False):
+        return
+    try:
+        if _last_collection is None or time.monotonic() - _last_collection >= GC_INTERVAL:
+            _last_collection = time.monotonic()
+            collect_garbage()
+    finally:
+        _collection_lock.release()
+
+def print_progress(event: TerraformEvent):
+    """Echo Terraform's progress messages to stderr while a command runs."""
+    if event.message and event.type != "version":
+        print(event.message, file=sys.stderr, flush=True)
+
 def main():
     """CLI entry point."""
     import argparse
     
     parser = argparse.ArgumentParser(description="Terraform Runner")
-    parser.add_argument("command", choices=["plan", "apply", "destroy"])
-    parser.add_argument("--workspace", required=True)
-    parser.add_argument("--template", required=True)
-    parser.add_argument("--state-bucket", required=True)
-    parser.add_argument("--state-table", required=True)
+    parser.add_argument("command", choices=["plan", "apply", "destroy", "prewarm", "query", "gc"])
+    parser.add_argument("--workspace", action="append", default=[],
+                        help="Workspace name (prewarm: repeat for several)")
+    parser.add_argument("--template")
+    parser.add_argument("--state-bucket")
+    parser.add_argument("--state-table")
     parser.add_argument("--variables", type=json.loads, default="{}")
+    parser.add_argument("--jobs", type=int, default=None, help="Parallel inits for prewarm (default: TF_INIT_PARALLELISM)")
+    query = parser.add_argument_group("query", "Filter the resource changes of the workspace's last plan (globs allowed)")
+    query.add_argument("--address")
+    query.add_argument("--type")
+    query.add_argument("--action", help="create, update, replace, delete, read or no-op")
+    query.add_argument("--module", help='Module address ("" for the root module)')
+    query.add_argument("--count", action="store_true", help="Print counts by action instead of the changes")
+    gc = parser.add_argument_group("gc", "Evict least recently used workspaces beyond a disk budget")
+    gc.add_argument("--budget", type=parse_size, default=None,
+                    help="Bytes to keep, e.g. 500M or 2G (default: TF_WORKSPACE_BUDGET)")
+    gc.add_argument("--dry-run", action="store_true", help="Only report what would be evicted")
     
     args = parser.parse_args()
     
+    if args.command == "gc":
+        if args.budget is None and WORKSPACE_BUDGET <= 0:
+            parser.error("gc requires --budget when TF_WORKSPACE_BUDGET is not set")
+        budget = WORKSPACE_BUDGET if args.budget is None else args.budget
+        print(json.dumps(collect_garbage(budget, args.dry_run), indent=2))
+        return
+    if not args.workspace:
+        parser.error(f"{args.command} requires --workspace")
+    if args.command == "query":
+        if len(args.workspace) > 1:
+            parser.error("query takes a single --workspace")
+        path = index_path(WORKSPACES_DIR / args.workspace[0] / "tfplan")
+        if not path.exists():
+            parser.error(f"no plan index for {args.workspace[0]}; run plan first")
+        model = PlanModel(path)
+        filters = {"address": args.address, "type": args.type, "action": args.action, "module": args.module}
+        print(json.dumps(model.counts(**filters) if args.count else model.select(**filters), indent=2))
+        return
+    missing = [f"--{name.replace('_', '-')}" for name in ("template", "state_bucket", "state_table")
+               if not getattr(args, name)]
+    if missing:
+        parser.error(f"{args.command} requires {', '.join(missing)}")
+    
+    if args.command == "prewarm":
+        runners = [
+            TerraformRunner(workspace, args.template, args.state_bucket, args.state_table)
+            for workspace in args.workspace
+        ]
+        print(json.dumps(prewarm(runners, args.jobs), indent=2))
+        return
+    if len(args.workspace) > 1:
+        parser.error(f"{args.command} takes a single --workspace")
+    
     runner = TerraformRunner(
-        workspace=args.workspace,
+        workspace=args.workspace[0],
         template_path=args.template,
         state_bucket=args.state_bucket,
         state_table=args.state_table
@@ -147,11 +870,16 @@ def main():
     runner.init()
     
     if args.command == "plan":
-        result = runner.plan(args.variables)
+        try:
+            result = runner.plan(args.variables, on_event=print_progress)
+        except VariableError as e:
+            parser.error("\n".join(e.problems))
+        for warning in result.get("warnings", []):
+            print(f"warning: {warning}", file=sys.stderr)
     elif args.command == "apply":
-        result = runner.apply()
+        result = runner.apply(on_event=print_progress)
     elif args.command == "destroy":
-        result = runner.destroy()
+        result = runner.destroy(on_event=print_progress)
         
     print(json.dumps(result, indent=2))
 
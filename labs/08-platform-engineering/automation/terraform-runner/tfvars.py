@@ -0,0 +1,330 @@
+"""
+Template Variables
+Typed terraform.tfvars.json rendering, checked against the template's
+variable declarations.
+
+Variables are written as JSON, so numbers, booleans, lists and maps reach
+Terraform with their types instead of as quoted strings. Before that they
+are checked against the `variable` blocks of the template's root module:
+missing required variables and values that Terraform could not convert
+to the declared type are reported at once, without starting `terraform
+plan`. Undeclared names are only warnings, as they are to Terraform:
+fleet defaults are shared by templates that don't all declare them.
+
+Only what the check needs is read from the .tf files: each variable's
+name, type constraint, whether it has a default and whether it is
+nullable. Type constraints this parser does not understand are treated
+as `any` and left to Terraform.
+
+Usage:
+    declared = parse_declarations(Path("main.tf").read_text())
+    warnings = check(variables, declared)   # raises VariableError
+    content = render(variables)
+    names = parse_assignments(Path("terraform.tfvars").read_text())
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# A parsed type constraint: ("string",), ("list", element),
+# ("object", {name: (type, optional)}), ("tuple", [types]), ...
+Type = Tuple[Any, ...]
+
+ANY: Type = ("any",)
+PRIMITIVES = ("string", "number", "bool", "any")
+COLLECTIONS = ("list", "set", "map")
+NUMBER = re.compile(r"^\s*-?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?\s*$")
+HEADER = re.compile(r'\s*variable\s+"([^"]+)"\s*$')
+ATTRIBUTE = re.compile(r"\s*([A-Za-z_][\w-]*)\s*=(?!=)\s*(.*?)\s*$", re.DOTALL)
+TOKEN = re.compile(r'\s*(?:([A-Za-z_][\w-]*)|("(?:[^"\\]|\\.)*")|(-?\d+(?:\.\d+)?)|(\S))')
+
+class VariableError(ValueError):
+    """Variables that the template would reject; problems lists each one."""
+    
+    def __init__(self, problems: List[str]):
+        super().__init__("Invalid variables: " + "; ".join(problems))
+        self.problems = problems
+
+def _mask(source: str) -> str:
+    """
+    source with comments blanked and brackets inside strings and heredocs
+    replaced, so brackets and newlines can be counted without a full HCL
+    parser. Positions are unchanged.
+    """
+    out = list(source)
+    i, length = 0, len(source)
+    while i < length:
+        c = source[i]
+        if c == "#" or source.startswith("//", i):
+            end = source.find("\n", i)
+            end = length if end == -1 else end
+            out[i:end] = " " * (end - i)
+            i = end
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            end = length if end == -1 else end + 2
+            out[i:end] = [ch if ch == "\n" else " " for ch in source[i:end]]
+            i = end
+        elif c == '"':
+            # Template interpolations may nest quotes: "${lookup(m, "k")}"
+            depth, i = 0, i + 1
+            while i < length and (source[i] != '"' or depth):
+                if source[i] == "\\":
+                    out[i] = " "
+                    i += 1
+                elif source.startswith("${", i):
+                    depth += 1
+                elif source[i] == "}" and depth:
+                    depth -= 1
+                if i < length and source[i] in "{}[]()":
+                    out[i] = " "
+                i += 1
+            i += 1
+        elif source.startswith("<<", i) and re.match(r"<<-?([A-Za-z_]\w*)\s*\n", source[i:]):
+            marker = re.match(r"<<-?([A-Za-z_]\w*)\s*\n", source[i:])
+            end = re.compile(rf"^\s*{marker.group(1)}\s*$", re.MULTILINE).search(source, i + marker.end())
+            end = length if end is None else end.end()
+            out[i:end] = [ch if ch == "\n" else " " for ch in source[i:end]]
+            i = end
+        else:
+            i += 1
+    return "".join(out)
+
+def _blocks(masked: str):
+    """(header, body start, body end) of each top-level block."""
+    depth, start, opened = 0, 0, 0
+    for i, c in enumerate(masked):
+        if c == "{":
+            if depth == 0:
+                opened = i
+            depth += 1
+        elif c == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                yield masked[start:opened], opened + 1, i
+                start = i + 1
+        elif c == "=" and depth == 0:
+            # Top-level attributes (e.g. in .tfvars-like files) are not blocks
+            start = i + 1
+
+def _attributes(masked: str, start: int, end: int):
+    """(name, expression start, expression end) of the block's own attributes."""
+    depth, segment = 0, start
+    for i in range(start, end + 1):
+        c = masked[i] if i < end else "\n"
+        if c in "([{":
+            depth += 1
+        elif c in ")]}":
+            depth -= 1
+        elif c == "\n" and depth == 0:
+            match = ATTRIBUTE.match(masked, segment, i)
+            if match:
+                yield match.group(1), match.start(2), match.end(2)
+            segment = i + 1
+
+class _TypeParser:
+    def __init__(self, expression: str):
+        self.tokens = [next(t for t in match.groups() if t is not None)
+                       for match in TOKEN.finditer(expression) if any(match.groups())]
+        self.position = 0
+    
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+    
+    def take(self, expected: str = None) -> str:
+        token = self.peek()
+        if token is None or (expected is not None and token != expected):
+            raise ValueError(f"expected {expected or 'a token'}, got {token}")
+        self.position += 1
+        return token
+    
+    def skip_expression(self):
+        """Skip an expression up to the next , or closing bracket at this level."""
+        depth = 0
+        while self.peek() is not None:
+            token = self.peek()
+            if token in "([{" and len(token) == 1:
+                depth += 1
+            elif token in ")]}" and len(token) == 1:
+                if depth == 0:
+                    return
+                depth -= 1
+            elif token == "," and depth == 0:
+                return
+            self.position += 1
+    
+    def parse(self) -> Type:
+        token = self.take()
+        if token.startswith('"'):
+            # Terraform 0.11 style: type = "string" / "list" / "map"
+            token = token.strip('"')
+        if token in PRIMITIVES:
+            return (token,)
+        if token in COLLECTIONS:
+            if self.peek() != "(":
+                return (token, ANY)
+            self.take("(")
+            element = self.parse()
+            self.take(")")
+            return (token, element)
+        if token == "object":
+            self.take("(")
+            self.take("{")
+            attributes = {}
+            while self.peek() != "}":
+                name = self.take().strip('"')
+                self.take("=" if self.peek() == "=" else ":")
+                optional = self.peek() == "optional"
+                if optional:
+                    self.take()
+                    self.take("(")
+                    attributes[name] = (self.parse(), True)
+                    if self.peek() == ",":
+                        # optional(type, default)
+                        self.take()
+                        self.skip_expression()
+                    self.take(")")
+                else:
+                    attributes[name] = (self.parse(), False)
+                if self.peek() == ",":
+                    self.take()
+            self.take("}")
+            self.take(")")
+            return ("object", attributes)
+        if token == "tuple":
+            self.take("(")
+            self.take("[")
+            elements = []
+            while self.peek() != "]":
+                elements.append(self.parse())
+                if self.peek() == ",":
+                    self.take()
+            self.take("]")
+            self.take(")")
+            return ("tuple", elements)
+        raise ValueError(f"unknown type {token}")
+
+def parse_type(expression: str) -> Type:
+    """Parse a type constraint; anything not understood is `any`."""
+    try:
+        parser = _TypeParser(expression)
+        parsed = parser.parse()
+        return parsed if parser.peek() is None else ANY
+    except ValueError:
+        return ANY
+
+def parse_declarations(source: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Variable declarations in HCL source: {name: {"type", "required",
+    "nullable"}}.
+    """
+    masked = _mask(source)
+    declared = {}
+    for header, start, end in _blocks(masked):
+        match = HEADER.match(header)
+        if not match:
+            continue
+        attributes = {name: masked[a:b] for name, a, b in _attributes(masked, start, end)}
+        declared[match.group(1)] = {
+            "type": parse_type(attributes["type"]) if "type" in attributes else ANY,
+            "required": "default" not in attributes,
+            "nullable": attributes.get("nullable", "true").strip() != "false"
+        }
+    return declared
+
+def parse_json_declarations(document: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Variable declarations in a .tf.json document."""
+    declared = {}
+    for name, body in (document.get("variable") or {}).items():
+        body = body[0] if isinstance(body, list) and body else body if isinstance(body, dict) else {}
+        declared[name] = {
+            "type": parse_type(body["type"]) if isinstance(body.get("type"), str) else ANY,
+            "required": "default" not in body,
+            "nullable": body.get("nullable", True) is not False
+        }
+    return declared
+
+def _check_value(value: Any, expected: Type, path: str, problems: List[str]):
+    """Append why Terraform could not convert value to expected, if it could not."""
+    kind = expected[0]
+    if value is None:
+        return
+    if kind == "any":
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            problems.append(f"{path}: {type(value).__name__} is not a JSON value")
+        return
+    if kind == "string":
+        if isinstance(value, (dict, list, tuple)):
+            problems.append(f"{path}: expected string, got {type(value).__name__}")
+        elif not isinstance(value, (str, int, float, bool)):
+            problems.append(f"{path}: {type(value).__name__} is not a JSON value")
+    elif kind == "number":
+        if isinstance(value, bool) or not (isinstance(value, (int, float)) or
+                                           isinstance(value, str) and NUMBER.match(value)):
+            problems.append(f"{path}: expected number, got {value!r}")
+    elif kind == "bool":
+        if not (isinstance(value, bool) or value in ("true", "false")):
+            problems.append(f"{path}: expected bool, got {value!r}")
+    elif kind in ("list", "set"):
+        if not isinstance(value, (list, tuple)):
+            problems.append(f"{path}: expected {kind}, got {type(value).__name__}")
+            return
+        for index, item in enumerate(value):
+            _check_value(item, expected[1], f"{path}[{index}]", problems)
+    elif kind == "map":
+        if not isinstance(value, dict):
+            problems.append(f"{path}: expected map, got {type(value).__name__}")
+            return
+        for key, item in value.items():
+            _check_value(item, expected[1], f"{path}[{key!r}]", problems)
+    elif kind == "object":
+        if not isinstance(value, dict):
+            problems.append(f"{path}: expected object, got {type(value).__name__}")
+            return
+        for name, (attribute, optional) in expected[1].items():
+            if name in value:
+                _check_value(value[name], attribute, f"{path}.{name}", problems)
+            elif not optional:
+                problems.append(f"{path}: attribute {name} is required")
+    elif kind == "tuple":
+        if not isinstance(value, (list, tuple)) or len(value) != len(expected[1]):
+            problems.append(f"{path}: expected tuple of {len(expected[1])} elements, got {value!r}")
+            return
+        for index, (item, element) in enumerate(zip(value, expected[1])):
+            _check_value(item, element, f"{path}[{index}]", problems)
+
+def parse_assignments(source: str) -> List[str]:
+    """Names of the variables a .tfvars file sets."""
+    masked = _mask(source)
+    return [name for name, _, _ in _attributes(masked, 0, len(masked))]
+
+def check(variables: Dict[str, Any], declared: Dict[str, Dict[str, Any]],
+          assigned: Iterable[str] = ()) -> List[str]:
+    """
+    Raise VariableError listing every problem with variables; return
+    warnings (undeclared names) otherwise. assigned names variables set
+    outside variables, e.g. by TF_VAR_<name> or the template's own
+    .tfvars files, which count as set.
+    """
+    assigned = set(assigned)
+    problems = []
+    warnings = [f"{name}: not declared by the template"
+                for name in sorted(variables.keys() - declared.keys())]
+    for name, declaration in sorted(declared.items()):
+        if name not in variables:
+            if declaration["required"] and name not in assigned:
+                problems.append(f"{name}: required variable is not set")
+        elif variables[name] is None and not declaration["nullable"]:
+            problems.append(f"{name}: must not be null")
+        else:
+            _check_value(variables[name], declaration["type"], name, problems)
+    if problems:
+        raise VariableError(problems)
+    return warnings
+
+def render(variables: Dict[str, Any]) -> str:
+    """terraform.tfvars.json content; stable, so equal variables give equal bytes."""
+    return json.dumps(variables, indent=2, sort_keys=True) + "\n"
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: provisioning requests with and without the platform config cache.
+
+Sends a burst of POST /api/v1/provision requests from --threads threads
+through the provisioning handler. SSM is an in-process stub that sleeps
+--latency-ms per call; the job queue is a temporary SQLite file.
+- uncached:  ParameterCache with ttl=0, i.e. one GetParameter + decode per
+             request (the previous behaviour)
+- cached:    the default ParameterCache (TTL, stale-while-revalidate,
+             single-flight)
+
+Usage:
+    python benchmarks/bench_config_cache.py --requests 2000 --threads 16 --latency-ms 20
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+LAB_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(LAB_DIR / "platform-api" / "provisioning"))
+sys.path.insert(0, str(LAB_DIR / "platform-api" / "shared"))
+
+import job_queue  # noqa: E402
+import lambda_function  # noqa: E402
+from config_cache import ParameterCache  # noqa: E402
+
+
+class StubSSM:
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+    
+    def get_parameter(self, Name, WithDecryption=False):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        value = json.dumps({"state_bucket": "bench", "state_table": "bench", "regions": ["us-west-2"] * 50})
+        return {"Parameter": {"Name": Name, "Value": value, "Version": 1}}
+
+
+class Context:
+    aws_request_id = "benchmark-request-id"
+
+
+def burst(requests, threads):
+    latencies = []
+    lock = threading.Lock()
+    event = {
+        "httpMethod": "POST",
+        "path": "/api/v1/provision",
+        "body": json.dumps({"template": "web-app", "workspace": "bench"}),
+    }
+    
+    def client(count):
+        local = []
+        for _ in range(count):
+            start = time.perf_counter()
+            response = lambda_function.lambda_handler(event, Context())
+            local.append(time.perf_counter() - start)
+            assert response["statusCode"] == 202, response
+        with lock:
+            latencies.extend(local)
+    
+    workers = [threading.Thread(target=client, args=(requests // threads,)) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Platform config cache benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    
+    print(f"{args.requests} provision requests from {args.threads} threads, "
+          f"simulated SSM latency {args.latency_ms}ms")
+    print(f"{'config':<10} {'seconds':>8} {'p50 ms':>8} {'p99 ms':>8} {'SSM calls':>10}")
+    
+    for name, options in (("uncached", {"ttl": 0, "max_stale": 0}), ("cached", {})):
+        ssm = StubSSM(args.latency_ms / 1000)
+        lambda_function.platform_config = ParameterCache(ssm, **options)
+        with tempfile.TemporaryDirectory() as tmp:
+            lambda_function._queue = job_queue.open_queue(f"sqlite:///{tmp}/jobs.db")
+            elapsed, latencies = burst(args.requests, args.threads)
+        latencies.sort()
+        print(f"{name:<10} {elapsed:>8.2f} {statistics.median(latencies) * 1000:>8.2f} "
+              f"{latencies[int(0.99 * len(latencies))] * 1000:>8.2f} {ssm.calls:>10}")
+
+
+if __name__ == "__main__":
+    main()
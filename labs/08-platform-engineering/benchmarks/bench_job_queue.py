@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: provisioning enqueue latency while applies are running.
+
+Starts a WorkerPool whose jobs are simulated applies (sleep + lease
+heartbeats), keeps every worker busy, and measures:
+- enqueue:  POST /api/v1/provision through the provisioning handler
+            (SSM stubbed in-process), i.e. one INSERT into the job queue
+- status:   GET /api/v1/provision/{id} against the indexed job store
+
+with 0 workers (idle queue) and with --workers concurrent applies.
+
+Usage:
+    python benchmarks/bench_job_queue.py --workers 32 --requests 1000
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+LAB_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(LAB_DIR / "platform-api" / "provisioning"))
+sys.path.insert(0, str(LAB_DIR / "platform-api" / "shared"))
+
+import job_queue  # noqa: E402
+import lambda_function  # noqa: E402
+import worker  # noqa: E402
+
+
+class StubSSM:
+    def get_parameter(self, Name, WithDecryption=False):
+        return {"Parameter": {"Name": Name, "Value": '{"state_bucket": "bench", "state_table": "bench"}'}}
+
+
+class Context:
+    aws_request_id = "benchmark-request-id"
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] * 1000
+
+
+def measure(requests, workspaces):
+    enqueue, status, ids = [], [], []
+    for index in range(requests):
+        event = {
+            "httpMethod": "POST",
+            "path": "/api/v1/provision",
+            "body": json.dumps({"template": "web-app", "workspace": f"bench-{index % workspaces}"}),
+        }
+        start = time.perf_counter()
+        response = lambda_function.lambda_handler(event, Context())
+        enqueue.append(time.perf_counter() - start)
+        ids.append(json.loads(response["body"])["provision_id"])
+
+        event = {"httpMethod": "GET", "path": f"/api/v1/provision/{ids[index // 2]}"}
+        start = time.perf_counter()
+        lambda_function.lambda_handler(event, Context())
+        status.append(time.perf_counter() - start)
+    return enqueue, status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provisioning job queue benchmark")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--apply-seconds", type=float, default=0.5)
+    args = parser.parse_args()
+
+    lambda_function.platform_config.client = StubSSM()
+
+    def simulated_apply(job):
+        time.sleep(args.apply_seconds)
+        return {"outputs": {"workspace": job["workspace"]}}
+
+    print(f"{args.requests} enqueues + status lookups, simulated apply {args.apply_seconds}s")
+    print(f"{'running applies':<16} {'enqueue p50':>12} {'enqueue p99':>12} {'status p50':>11} {'status p99':>11}")
+
+    for workers in (0, args.workers):
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = job_queue.open_queue(f"sqlite:///{tmp}/jobs.db")
+            lambda_function._queue = queue
+            pool = worker.WorkerPool(queue, workers=workers, run=simulated_apply, poll_interval=0.01)
+            pool.start()
+            # Several workspaces per worker, so the one-job-per-workspace
+            # rule never leaves a worker idle
+            enqueue, status = measure(args.requests, max(workers, 1) * 4)
+            pool.stop()
+            print(f"{workers:<16} {percentile(enqueue, 0.5):>10.2f}ms {percentile(enqueue, 0.99):>10.2f}ms "
+                  f"{percentile(status, 0.5):>9.2f}ms {percentile(status, 0.99):>9.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
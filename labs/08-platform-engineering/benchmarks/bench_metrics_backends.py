@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: metrics publisher throughput per backend.
+
+Publishes N API reports (requests + latency) with publish_api_metric
+through:
+- api:          one PutMetricData call per report (the default backend)
+- api+buffer:   the same client behind a MetricsBuffer
+- emf:          EMF JSON lines written to a file (no network)
+
+The api backend is a real boto3 CloudWatch client whose HTTP send is
+replaced by a canned response after --latency-ms of simulated network
+time, so serialization and request signing are included.
+
+Usage:
+    python benchmarks/bench_metrics_backends.py --reports 2000 --latency-ms 5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+LAB_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(LAB_DIR / "monitoring" / "metrics"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-west-2")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+os.environ["METRICS_BACKEND"] = "api"
+
+from botocore.awsrequest import AWSResponse  # noqa: E402
+
+import publish_metrics  # noqa: E402
+
+
+class _RawBody:
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+def make_stub_client(latency):
+    client = publish_metrics.create_backend("api")
+    calls = {"count": 0}
+
+    def fake_send(request, **kwargs):
+        time.sleep(latency)
+        calls["count"] += 1
+        return AWSResponse(request.url, 200, {}, _RawBody(b"{}"))
+
+    client.meta.events.register("before-send.cloudwatch", fake_send)
+    return client, calls
+
+
+def report_all(reports, buffer=None):
+    for i in range(reports):
+        publish_metrics.publish_api_metric(1, latency=50.0 + i % 200, buffer=buffer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Metrics backend throughput benchmark")
+    parser.add_argument("--reports", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{args.reports} reports x 2 datapoints, simulated PutMetricData latency {args.latency_ms}ms")
+    print(f"{'backend':<12} {'seconds':>9} {'datapoints/s':>13} {'API calls':>10}")
+
+    results = []
+
+    client, calls = make_stub_client(args.latency_ms / 1000)
+    publish_metrics.cloudwatch = client
+    start = time.perf_counter()
+    report_all(args.reports)
+    results.append(("api", time.perf_counter() - start, calls["count"]))
+
+    client, calls = make_stub_client(args.latency_ms / 1000)
+    start = time.perf_counter()
+    with publish_metrics.MetricsBuffer(client=client) as buffer:
+        report_all(args.reports, buffer)
+    results.append(("api+buffer", time.perf_counter() - start, calls["count"]))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        publish_metrics.cloudwatch = publish_metrics.EmfBackend(os.path.join(tmp, "metrics.emf"))
+        start = time.perf_counter()
+        report_all(args.reports)
+        results.append(("emf", time.perf_counter() - start, 0))
+
+    for name, elapsed, api_calls in results:
+        print(f"{name:<12} {elapsed:>9.3f} {args.reports * 2 / elapsed:>13.0f} {api_calls:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: rolling an apply out to a fleet of runner workspaces.
+
+A stand-in `terraform` (a small Python script written to a temp dir)
+sleeps instead of calling AWS: most workspaces take --short seconds per
+plan/apply, every tenth takes --long. The fleet is applied with the
+orchestrator (automation/terraform-runner/orchestrator.py):
+- sequential:  --jobs 1, one workspace after another (what running the
+               runner once per workspace amounts to)
+- parallel:    --jobs N, no run history yet (fleet order)
+- history:     --jobs N again, now scheduled longest estimated run first
+
+Usage:
+    python benchmarks/bench_orchestrator.py --workspaces 60 --jobs 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+LAB_DIR = Path(__file__).resolve().parent.parent
+
+FAKE_TERRAFORM = """#!/usr/bin/env python3
+import json, os, sys, time
+command = sys.argv[1]
+if command == "init":
+    os.makedirs(".terraform", exist_ok=True)
+    sys.exit(0)
+if command == "show":
+    print(json.dumps({"format_version": "1.2", "resource_changes": []}))
+    sys.exit(0)
+time.sleep(float(os.environ["BENCH_LONG" if "long" in os.path.basename(os.getcwd()) else "BENCH_SHORT"]))
+if command == "plan":
+    open("tfplan", "w").write("plan")
+    print(json.dumps({"type": "change_summary", "@message": "Plan: 1 to add",
+                      "changes": {"add": 1, "change": 0, "remove": 0, "import": 0, "operation": "plan"}}))
+elif command == "apply":
+    print(json.dumps({"type": "outputs", "@message": "Outputs: 0", "outputs": {}}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet orchestrator benchmark")
+    parser.add_argument("--workspaces", type=int, default=60)
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--short", type=float, default=0.1)
+    parser.add_argument("--long", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "bin").mkdir()
+        (root / "bin" / "terraform").write_text(FAKE_TERRAFORM)
+        os.chmod(root / "bin" / "terraform", 0o755)
+        os.environ.update({
+            "PATH": f"{root / 'bin'}{os.pathsep}{os.environ['PATH']}",
+            "TF_WORKSPACES_DIR": str(root / "workspaces"),
+            "TF_PLUGIN_CACHE_DIR": str(root / "plugin-cache"),
+            "BENCH_SHORT": str(args.short),
+            "BENCH_LONG": str(args.long),
+        })
+        # Read the environment above at import time
+        sys.path.insert(0, str(LAB_DIR / "automation" / "terraform-runner"))
+        import orchestrator
+
+        # Long workspaces last in the fleet: the worst case for fleet order
+        specs = [
+            {
+                "workspace": f"ws-{index:03d}" + ("-long" if index % 10 == 9 else ""),
+                "template": str(LAB_DIR / "service-catalog" / "web-app"),
+                "state_bucket": "bench",
+                "state_table": "bench",
+                "variables": {
+                    "app_name": f"app-{index:03d}", "environment": "dev", "vpc_id": "vpc-bench",
+                    "public_subnets": ["subnet-a", "subnet-b"], "private_subnets": ["subnet-c", "subnet-d"],
+                },
+            }
+            for index in range(args.workspaces)
+        ]
+        serial = sum(args.long if "long" in s["workspace"] else args.short for s in specs) * 2
+        print(f"apply to {args.workspaces} workspaces ({serial:.0f}s of simulated plan+apply), {args.jobs} jobs")
+        print(f"{'schedule':<12} {'seconds':>8}")
+
+        for name, jobs in (("sequential", 1), ("parallel", args.jobs), ("history", args.jobs)):
+            if name != "history":
+                orchestrator.HISTORY_FILE.unlink(missing_ok=True)
+            start = time.perf_counter()
+            results = orchestrator.orchestrate([dict(s) for s in specs], "apply", jobs)
+            elapsed = time.perf_counter() - start
+            failed = [n for n, r in results.items() if r["status"] != orchestrator.SUCCEEDED]
+            assert not failed, json.dumps(results[failed[0]])
+            print(f"{name:<12} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
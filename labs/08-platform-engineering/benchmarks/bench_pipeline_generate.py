@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: regenerating CI/CD workflows for a monorepo of --services
+services (automation/ci-cd-generator/generate_pipeline.py):
+- loop:         one generate_pipeline.py run per service (the shell loop
+                this replaces)
+- bulk:         one run with --manifest, first generation
+- bulk-repeat:  the same manifest again; nothing changed, nothing written
+
+Reports wall time and files written, and checks that the loop and bulk
+files are identical.
+
+Usage:
+    python benchmarks/bench_pipeline_generate.py --services 300
+"""
+
+import argparse
+import filecmp
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+LAB_DIR = Path(__file__).resolve().parent.parent
+GENERATOR = LAB_DIR / "automation" / "ci-cd-generator" / "generate_pipeline.py"
+TEMPLATES = ("standard-web-app", "serverless-api")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline generator bulk-mode benchmark")
+    parser.add_argument("--services", type=int, default=300)
+    args = parser.parse_args()
+
+    services = [
+        {"service": f"svc-{index:04d}", "repository": "github.com/org/monorepo", "template": TEMPLATES[index % 2]}
+        for index in range(args.services)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        manifest = root / "services.json"
+        manifest.write_text(json.dumps(services))
+
+        print(f"workflows for {args.services} services")
+        print(f"{'strategy':<12} {'seconds':>8} {'written':>8}")
+        start = time.perf_counter()
+        for spec in services:
+            subprocess.run([
+                sys.executable, str(GENERATOR), "--service", spec["service"], "--repository", spec["repository"],
+                "--template", spec["template"],
+                "--output", str(root / "loop" / ".github" / "workflows" / f"deploy-{spec['service']}.yml")
+            ], check=True, capture_output=True)
+        print(f"{'loop':<12} {time.perf_counter() - start:>8.2f} {args.services:>8}")
+
+        for name in ("bulk", "bulk-repeat"):
+            start = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, str(GENERATOR), "--manifest", str(manifest), "--output-dir", str(root / "bulk")],
+                check=True, capture_output=True, text=True
+            )
+            elapsed = time.perf_counter() - start
+            print(f"{name:<12} {elapsed:>8.2f} {json.loads(result.stdout)['written']:>8}")
+
+        workflows = Path(".github") / "workflows"
+        names = [f"deploy-{spec['service']}.yml" for spec in services]
+        _, mismatch, errors = filecmp.cmpfiles(root / "loop" / workflows, root / "bulk" / workflows, names, shallow=False)
+        assert not mismatch and not errors, (mismatch, errors)
+
+
+if __name__ == "__main__":
+    main()
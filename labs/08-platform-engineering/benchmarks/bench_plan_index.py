@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: answering questions about a large plan.
+
+Generates a `terraform show -json` document with --resources resource
+changes (realistic attribute payloads, 5% replacements) and answers
+"which resources get replaced?" and "which IAM changes are in module X?":
+- reparse:  json.loads of the show output and a scan per question (what
+            every consumer of the raw plan output had to do)
+- index:    PlanModel over the saved tfplan.index.db and select()
+
+The one-off cost of building the index is reported as well.
+
+Usage:
+    python benchmarks/bench_plan_index.py --resources 20000
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+LAB_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(LAB_DIR / "automation" / "terraform-runner"))
+
+from plan_model import PlanModel  # noqa: E402
+
+TYPES = ("aws_s3_bucket", "aws_iam_role", "aws_lambda_function", "aws_security_group", "aws_dynamodb_table")
+
+
+def make_plan(resources):
+    changes = []
+    for index in range(resources):
+        module = f"module.service_{index % 50}"
+        resource_type = TYPES[index % len(TYPES)]
+        before = {"name": f"res-{index}", "tags": {"team": "platform", "index": str(index)},
+                  "policy": json.dumps({"Statement": [{"Effect": "Allow", "Action": "s3:*"}] * 5})}
+        after = dict(before, tags={"team": "platform", "index": str(index), "rollout": "2"})
+        actions = ["delete", "create"] if index % 20 == 0 else ["update"]
+        changes.append({
+            "address": f"{module}.{resource_type}.r{index}",
+            "module_address": module,
+            "mode": "managed",
+            "type": resource_type,
+            "name": f"r{index}",
+            "provider_name": "registry.terraform.io/hashicorp/aws",
+            "change": {"actions": actions, "before": before, "after": after, "after_unknown": {}},
+        })
+    return {"format_version": "1.2", "terraform_version": "1.6.0", "resource_changes": changes}
+
+
+def reparse(raw):
+    plan = json.loads(raw)
+    replaced = [rc["address"] for rc in plan["resource_changes"] if set(rc["change"]["actions"]) == {"delete", "create"}]
+    iam = [rc["address"] for rc in plan["resource_changes"]
+           if rc["type"] == "aws_iam_role" and rc.get("module_address") == "module.service_7"]
+    return len(replaced), len(iam)
+
+
+def indexed(path):
+    model = PlanModel(path)
+    answer = len(model.select(action="replace")), len(model.select(type="aws_iam_role", module="module.service_7"))
+    model.close()
+    return answer
+
+
+def best_of(runs, function, *args):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        answer = function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, answer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan index benchmark")
+    parser.add_argument("--resources", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    raw = json.dumps(make_plan(args.resources))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "tfplan.index.db"
+        start = time.perf_counter()
+        PlanModel.build(json.loads(raw), path).close()
+        build = time.perf_counter() - start
+
+        print(f"{args.resources} resource changes: show -json {len(raw) / 1e6:.1f} MB, "
+              f"index {path.stat().st_size / 1e6:.1f} MB, built once in {build * 1000:.0f}ms")
+        print(f"{'strategy':<8} {'ms per question pair':>21}")
+        reparse_time, expected = best_of(args.runs, reparse, raw)
+        index_time, answer = best_of(args.runs, indexed, path)
+        assert answer == expected, (answer, expected)
+        print(f"{'reparse':<8} {reparse_time * 1000:>21.1f}")
+        print(f"{'index':<8} {index_time * 1000:>21.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-service metrics aggregation, vectorized vs pure Python.
+
+Builds N synthetic datapoints spread across S services and the four
+service metrics (CPU, memory, requests, errors), then computes the
+per-service figures and the fleet rollup that
+GET /api/v1/services/metrics returns:
+- numpy:   service_metrics with numpy (bincount + one sort)
+- python:  the same module with numpy disabled (per-datapoint loop)
+
+Both paths are checked to produce the same figures.
+
+Usage:
+    python benchmarks/bench_service_metrics.py --datapoints 1000000 --services 500
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+LAB_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(LAB_DIR / "platform-api" / "monitoring"))
+
+import service_metrics  # noqa: E402
+
+
+def make_points(datapoints, services, seed=42):
+    rng = random.Random(seed)
+    points = service_metrics.Datapoints()
+    per_series = datapoints // (services * len(service_metrics.METRICS))
+    generators = {
+        service_metrics.CPU: lambda: rng.uniform(5, 95),
+        service_metrics.MEMORY: lambda: rng.uniform(20, 90),
+        service_metrics.REQUESTS: lambda: float(rng.randint(0, 2000)),
+        service_metrics.ERRORS: lambda: float(rng.randint(0, 20)),
+    }
+    for index in range(services):
+        for metric_id, generate in generators.items():
+            points.extend(f"service-{index:03d}", metric_id, [generate() for _ in range(per_series)])
+    return points
+
+
+def run(points, window_seconds):
+    start = time.perf_counter()
+    figures = service_metrics.aggregate(points, window_seconds)
+    fleet = service_metrics.rollup(points, window_seconds)
+    return time.perf_counter() - start, figures, fleet
+
+
+def same(left, right):
+    for key, value in left.items():
+        other = right[key]
+        if value is None or other is None:
+            if value is not other:
+                return False
+        elif not math.isclose(value, other, rel_tol=1e-9):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Service metrics aggregation benchmark")
+    parser.add_argument("--datapoints", type=int, default=1_000_000)
+    parser.add_argument("--services", type=int, default=500)
+    args = parser.parse_args()
+
+    points = make_points(args.datapoints, args.services)
+    window_seconds = 3600
+
+    print(f"{len(points)} datapoints across {args.services} services")
+    print(f"{'aggregation':<12} {'ms':>10} {'datapoints/s':>14}")
+
+    numpy = service_metrics.load_numpy()
+    results = []
+    if numpy is not None:
+        results.append(("numpy",) + run(points, window_seconds))
+    else:
+        print("numpy not installed; only the pure-Python path is measured")
+
+    service_metrics.np = None
+    results.append(("python",) + run(points, window_seconds))
+    service_metrics.np = numpy
+
+    for name, elapsed, _, _ in results:
+        print(f"{name:<12} {elapsed * 1000:>10.1f} {len(points) / elapsed:>14.0f}")
+
+    if len(results) == 2:
+        (_, _, figures, fleet), (_, _, expected, expected_fleet) = results
+        matches = same(fleet, expected_fleet) and all(same(figures[s], expected[s]) for s in expected)
+        print(f"results match: {matches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: buffered vs streamed processing of `terraform plan -json`.
+
+A stand-in `terraform` (a small Python script written to a temp dir)
+prints a version line, --resources planned_change events and a
+change_summary, as a large plan does. Each strategy runs it and counts the
+planned changes:
+- buffered:  subprocess.run(capture_output=True), then parse every line
+             (what TerraformRunner did before)
+- streamed:  TerraformProcess from terraform_events.py, events parsed
+             as they arrive, bounded RunSummary
+
+Reports time to the first planned change, total time, and the peak
+Python heap (tracemalloc) in the runner process.
+
+Usage:
+    python benchmarks/bench_terraform_stream.py --resources 50000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+LAB_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(LAB_DIR / "automation" / "terraform-runner"))
+
+from terraform_events import TerraformEvent, TerraformProcess  # noqa: E402
+
+FAKE_TERRAFORM = """#!/usr/bin/env python3
+import json, sys
+count = int(sys.argv[2])
+def emit(kind, message, **fields):
+    print(json.dumps({"@level": "info", "@message": message, "@module": "terraform.ui", "type": kind, **fields}))
+emit("version", "Terraform 1.6.0", terraform="1.6.0", ui="1.2")
+for index in range(count):
+    address = f"module.service[{index}].aws_s3_bucket.data"
+    resource = {"addr": address, "module": f"module.service[{index}]", "resource": "aws_s3_bucket.data",
+                "implied_provider": "aws", "resource_type": "aws_s3_bucket", "resource_name": "data",
+                "resource_key": None}
+    emit("planned_change", f"{address}: Plan to create", change={"resource": resource, "action": "create"})
+emit("change_summary", f"Plan: {count} to add, 0 to change, 0 to destroy.",
+     changes={"add": count, "change": 0, "import": 0, "remove": 0, "operation": "plan"})
+"""
+
+
+def buffered(cmd):
+    start = time.perf_counter()
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    first, planned = None, 0
+    for line in result.stdout.splitlines():
+        event = TerraformEvent.parse(line)
+        if event.type == "planned_change":
+            planned += 1
+            if first is None:
+                first = time.perf_counter() - start
+    return first, planned
+
+
+def streamed(cmd):
+    start = time.perf_counter()
+    first = None
+    process = TerraformProcess(cmd)
+    for event in process:
+        if event.type == "planned_change" and first is None:
+            first = time.perf_counter() - start
+    return first, process.summary.planned["create"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Terraform output streaming benchmark")
+    parser.add_argument("--resources", type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        terraform = Path(tmp) / "terraform"
+        terraform.write_text(FAKE_TERRAFORM)
+        os.chmod(terraform, 0o755)
+        cmd = [sys.executable, str(terraform), "plan", str(args.resources)]
+        size = len(subprocess.run(cmd, capture_output=True).stdout)
+
+        print(f"plan -json with {args.resources} planned changes ({size / 1e6:.1f} MB of output)")
+        print(f"{'strategy':<10} {'first event s':>14} {'total s':>8} {'peak heap MB':>13}")
+        for name, strategy in (("buffered", buffered), ("streamed", streamed)):
+            tracemalloc.start()
+            start = time.perf_counter()
+            first, planned = strategy(cmd)
+            total = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            assert planned == args.resources, planned
+            print(f"{name:<10} {first:>14.3f} {total:>8.2f} {peak / 1e6:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
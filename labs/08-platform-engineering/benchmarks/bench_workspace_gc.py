@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: runner workspaces on a long-lived host, with and without a
+disk budget.
+
+A stand-in `terraform` (a small Python script written to a temp dir)
+writes a --plan-mb plan file per plan, and each init leaves --init-mb in
+.terraform (modules and provider metadata). --runs jobs are spread over
+--workspaces workspaces with a skewed popularity (a few hot workspaces
+take most runs, as with real services). Each job sets up, inits and
+plans one workspace:
+- unbounded:  workspaces are never removed (TerraformRunner's default)
+- budget:     TF_WORKSPACE_BUDGET=--budget-mb, least recently used
+              workspaces evicted
+
+Reports the disk used by workspaces at the end and how many runs found
+their workspace warm (no init needed).
+
+Usage:
+    python benchmarks/bench_workspace_gc.py --workspaces 200 --runs 1000
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+LAB_DIR = Path(__file__).resolve().parent.parent
+
+FAKE_TERRAFORM = """#!/usr/bin/env python3
+import os, sys
+command = sys.argv[1]
+if command == "init":
+    os.makedirs(".terraform/modules", exist_ok=True)
+    with open(".terraform/modules/blob", "wb") as f:
+        f.write(os.urandom(int(float(os.environ["BENCH_INIT_MB"]) * 2 ** 20)))
+elif command == "plan":
+    with open("tfplan", "wb") as f:
+        f.write(os.urandom(int(float(os.environ["BENCH_PLAN_MB"]) * 2 ** 20)))
+elif command == "show":
+    print('{"format_version": "1.2", "resource_changes": []}')
+"""
+
+RUN = """
+import json, sys, time
+import terraform_runner as tr
+from botocore.exceptions import ClientError
+
+class NoState:
+    def get_object(self, **kwargs):
+        raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+
+tr._s3 = NoState()
+names = json.loads(sys.argv[1])
+warm = 0
+start = time.perf_counter()
+for name in names:
+    with tr.TerraformRunner(name, sys.argv[2], "bench", "bench") as runner:
+        runner.setup_workspace()
+        warm += not runner.init()
+        runner.plan({"api_name": name, "environment": "dev"})
+print(json.dumps({"warm": warm, "seconds": time.perf_counter() - start,
+                  "bytes": sum(u["bytes"] for u in tr.workspace_usage())}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Workspace garbage collection benchmark")
+    parser.add_argument("--workspaces", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--plan-mb", type=float, default=2.0)
+    parser.add_argument("--init-mb", type=float, default=1.0)
+    parser.add_argument("--budget-mb", type=int, default=100)
+    args = parser.parse_args()
+
+    # Popularity falls off with rank: a few hot workspaces, a long cold tail
+    rng = random.Random(7)
+    weights = [1 / (rank + 1) for rank in range(args.workspaces)]
+    names = rng.choices([f"svc-{index:03d}" for index in range(args.workspaces)], weights, k=args.runs)
+
+    print(f"{args.runs} plans over {args.workspaces} workspaces "
+          f"({args.plan_mb:g} MB plan + {args.init_mb:g} MB init each)")
+    print(f"{'strategy':<10} {'disk MB':>8} {'warm runs':>10} {'seconds':>8}")
+    for name, budget in (("unbounded", 0), ("budget", args.budget_mb * 2 ** 20)):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "bin").mkdir()
+            (root / "bin" / "terraform").write_text(FAKE_TERRAFORM)
+            os.chmod(root / "bin" / "terraform", 0o755)
+            env = {
+                **os.environ,
+                "PATH": f"{root / 'bin'}{os.pathsep}{os.environ['PATH']}",
+                "PYTHONPATH": str(LAB_DIR / "automation" / "terraform-runner"),
+                "TF_WORKSPACES_DIR": str(root / "workspaces"),
+                "TF_PLUGIN_CACHE_DIR": str(root / "plugin-cache"),
+                "TF_WORKSPACE_BUDGET": str(budget),
+                "TF_WORKSPACE_GC_INTERVAL": "0",
+                "BENCH_PLAN_MB": str(args.plan_mb),
+                "BENCH_INIT_MB": str(args.init_mb),
+            }
+            template = LAB_DIR / "service-catalog" / "api-service"
+            result = subprocess.run(
+                [sys.executable, "-c", RUN, json.dumps(names), str(template)],
+                env=env, capture_output=True, text=True, check=True
+            )
+            stats = json.loads(result.stdout)
+            print(f"{name:<10} {stats['bytes'] / 2 ** 20:>8.0f} {stats['warm']:>10} {stats['seconds']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark: preparing many runner workspaces from the service catalog.
+
+Builds --workspaces workspaces from the service-catalog templates (round
+robin), then prepares them all again, as every provisioning job does:
+- copytree:  a full copy of the template on every run (what the old
+             `cp -r template/*` in setup_workspace was meant to do)
+- sync:      TerraformRunner.setup_workspace(): manifest-driven sync that
+             hard-links new/changed files and skips unchanged ones
+- sync-copy: the same with TF_LINK_TEMPLATE_FILES=false
+
+Reports wall time for the first and the repeat run, and the bytes of new
+file data each strategy puts on disk. First runs are dominated by creating
+files and directories, which varies a lot between runs on one host; the
+sync strategies also write a lease, manifest, backend.tf and usage record
+per workspace, so their first run is no faster than copytree.
+
+Usage:
+    python benchmarks/bench_workspace_sync.py --workspaces 300 --files 40
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+LAB_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(LAB_DIR / "automation" / "terraform-runner"))
+
+import terraform_runner  # noqa: E402
+
+
+def make_templates(root, files):
+    """Catalog templates padded with generated modules to a realistic size."""
+    templates = []
+    for catalog in sorted((LAB_DIR / "service-catalog").iterdir()):
+        if not catalog.is_dir():
+            continue
+        template = root / catalog.name
+        shutil.copytree(catalog, template)
+        for index in range(files):
+            module = template / "modules" / f"module{index:02d}"
+            module.mkdir(parents=True)
+            (module / "main.tf").write_text((catalog / "main.tf").read_text())
+        templates.append(template)
+    return templates
+
+
+def disk_bytes(root):
+    """Bytes of distinct inodes under root (hard links count once)."""
+    seen, total = set(), 0
+    for path in root.rglob("*"):
+        stat = path.lstat()
+        if path.is_file() and stat.st_ino not in seen:
+            seen.add(stat.st_ino)
+            total += stat.st_size
+    return total
+
+
+def run(strategy, templates, workspaces, root):
+    terraform_runner.WORKSPACES_DIR = root / "workspaces"
+    terraform_runner.LINK_TEMPLATE_FILES = strategy == "sync"
+    runners = [
+        terraform_runner.TerraformRunner(f"ws-{index}", str(templates[index % len(templates)]), "bench", "bench")
+        for index in range(workspaces)
+    ]
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        for runner in runners:
+            if strategy == "copytree":
+                runner.work_dir.mkdir(parents=True, exist_ok=True)
+                shutil.copytree(runner.template_path, runner.work_dir, dirs_exist_ok=True)
+            else:
+                runner.setup_workspace()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Workspace sync benchmark")
+    parser.add_argument("--workspaces", type=int, default=300)
+    parser.add_argument("--files", type=int, default=40, help="Generated module files per template")
+    args = parser.parse_args()
+
+    print(f"{args.workspaces} workspaces from 3 catalog templates, {args.files + 2} files each")
+    print(f"{'strategy':<10} {'first s':>8} {'repeat s':>9} {'new data MB':>12}")
+    for strategy in ("copytree", "sync-copy", "sync"):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            templates = make_templates(root / "templates", args.files)
+            template_bytes = disk_bytes(root / "templates")
+            first, repeat = run(strategy, templates, args.workspaces, root)
+            written = disk_bytes(root) - template_bytes
+            print(f"{strategy:<10} {first:>8.2f} {repeat:>9.2f} {written / 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
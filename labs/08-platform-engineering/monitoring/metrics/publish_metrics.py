@@ -1,14 +1,148 @@
 #!/usr/bin/env python3
 """
 Publish platform metrics to CloudWatch.
+
+Single datapoints can be published directly with publish_metric(). For
+high-volume reporting (e.g. per-request latencies) use a MetricsBuffer,
+which aggregates datapoints in memory and publishes them in batches:
+
+    with MetricsBuffer() as buffer:
+        for latency in latencies:
+            publish_api_metric(1, latency=latency, buffer=buffer)
+
+The backend is chosen with the METRICS_BACKEND environment variable:
+- api (default): PutMetricData calls through boto3
+- emf: CloudWatch Embedded Metric Format JSON lines written to
+  METRICS_EMF_OUTPUT (a file path, or "-" for stdout). Inside Lambda,
+  stdout goes to CloudWatch Logs, which extracts the metrics, so
+  publishing costs no network round trip.
 """
 
-import boto3
+import atexit
 import json
-from datetime import datetime
-from typing import Dict, Any
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+DEFAULT_NAMESPACE = "Platform"
+
+# PutMetricData limits: 1000 MetricDatum entries and 1 MB per request,
+# 150 distinct values per Values/Counts datum
+MAX_DATUMS_PER_REQUEST = 1000
+MAX_REQUEST_BYTES = 1_000_000
+MAX_VALUES_PER_DATUM = 150
+
+# EMF allows at most 100 values per metric in one log record
+MAX_EMF_VALUES = 100
+
+# What PutMetricData accepts for a datum; anything else is rejected with
+# a 400 that no retry gets past
+UNITS = frozenset((
+    "Seconds", "Microseconds", "Milliseconds", "Bytes", "Kilobytes", "Megabytes",
+    "Gigabytes", "Terabytes", "Bits", "Kilobits", "Megabits", "Gigabits", "Terabits",
+    "Percent", "Count", "Bytes/Second", "Kilobytes/Second", "Megabytes/Second",
+    "Gigabytes/Second", "Terabytes/Second", "Bits/Second", "Kilobits/Second",
+    "Megabits/Second", "Gigabits/Second", "Terabits/Second", "Count/Second", "None"
+))
+MIN_VALUE_MAGNITUDE = 8.515920e-109
+MAX_VALUE_MAGNITUDE = 1.174271e+108
+MAX_DIMENSIONS = 30
+MAX_TIMESTAMP_AGE = timedelta(days=14)
+MAX_TIMESTAMP_AHEAD = timedelta(hours=2)
+
+# Errors a later attempt may not hit; other client errors (4xx) are final
+RETRYABLE_ERROR_CODES = frozenset((
+    "Throttling", "ThrottlingException", "RequestLimitExceeded", "TooManyRequestsException",
+    "RequestTimeout", "RequestTimeoutException", "ServiceUnavailable", "InternalFailure",
+    "InternalServiceError"
+))
+
+# stream() waits this long after a failed flush, doubling up to the max,
+# and drops what is buffered after MAX_FLUSH_FAILURES failures in a row
+FLUSH_BACKOFF = 1.0
+MAX_FLUSH_BACKOFF = 60.0
+MAX_FLUSH_FAILURES = 8
 
-cloudwatch = boto3.client('cloudwatch')
+class EmfBackend:
+    """
+    Writes metrics as CloudWatch Embedded Metric Format (EMF) JSON lines.
+    
+    Exposes the same put_metric_data(Namespace=..., MetricData=[...]) call
+    as the boto3 client, so it can stand in for it anywhere. Each datum
+    becomes one log record. Values/Counts are expanded into value arrays.
+    EMF has no StatisticSet, so a MetricsBuffer in front of this backend
+    aggregates with Values/Counts.
+    """
+    
+    default_aggregation = "values"
+    
+    def __init__(self, output: str = "-"):
+        self.output = output
+        self._stream = sys.stdout if output == "-" else open(output, "a", buffering=1)
+        self._lock = threading.Lock()
+    
+    def put_metric_data(self, Namespace: str, MetricData: List[Dict[str, Any]]):
+        lines = []
+        for datum in MetricData:
+            for record in self._records(Namespace, datum):
+                lines.append(json.dumps(record, separators=(",", ":")))
+        
+        with self._lock:
+            self._stream.write("\n".join(lines) + "\n")
+            self._stream.flush()
+        return {}
+    
+    def _records(self, namespace: str, datum: Dict[str, Any]):
+        if "StatisticValues" in datum:
+            raise ValueError("EMF cannot express StatisticValues; use aggregation='values'")
+        
+        if "Values" in datum:
+            counts = datum.get("Counts") or [1.0] * len(datum["Values"])
+            values = [v for v, c in zip(datum["Values"], counts) for _ in range(int(c))]
+        else:
+            values = [datum["Value"]]
+        
+        dimensions = {d["Name"]: d["Value"] for d in datum.get("Dimensions", [])}
+        metadata = {
+            "Timestamp": _epoch_millis(datum.get("Timestamp")),
+            "CloudWatchMetrics": [{
+                "Namespace": namespace,
+                "Dimensions": [list(dimensions)],
+                "Metrics": [{"Name": datum["MetricName"], "Unit": datum.get("Unit", "None")}]
+            }]
+        }
+        
+        for i in range(0, len(values), MAX_EMF_VALUES):
+            chunk = values[i:i + MAX_EMF_VALUES]
+            record = {"_aws": metadata}
+            record.update(dimensions)
+            record[datum["MetricName"]] = chunk[0] if len(chunk) == 1 else chunk
+            yield record
+
+def _epoch_millis(timestamp: Optional[datetime]) -> int:
+    if timestamp is None:
+        return int(time.time() * 1000)
+    if timestamp.tzinfo is None:
+        # Naive timestamps in this module are UTC (datetime.utcnow())
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return int(timestamp.timestamp() * 1000)
+
+def create_backend(name: str = None):
+    """Create the metrics backend named by METRICS_BACKEND (api or emf)."""
+    name = (name or os.environ.get("METRICS_BACKEND", "api")).lower()
+    if name == "emf":
+        return EmfBackend(os.environ.get("METRICS_EMF_OUTPUT", "-"))
+    if name == "api":
+        import boto3
+        return boto3.client('cloudwatch')
+    raise ValueError(f"Unknown metrics backend: {name}")
+
+cloudwatch = create_backend()
 
 def publish_metric(namespace: str, metric_name: str, value: float, unit: str = "Count", dimensions: Dict[str, str] = None):
     """Publish a single metric to CloudWatch."""
@@ -27,64 +161,555 @@ def publish_metric(namespace: str, metric_name: str, value: float, unit: str = "
         MetricData=[metric_data]
     )
 
-def publish_provisioning_metric(success: bool, duration: float = None):
+def validate_datapoint(metric_name: str, value: float, unit: str = "Count",
+                       dimensions: Dict[str, str] = None, timestamp: datetime = None) -> float:
+    """
+    Return value as a float, or raise ValueError if PutMetricData would
+    reject the datapoint (unknown unit, NaN/Inf or out-of-range value,
+    bad metric name or dimensions, timestamp over two weeks old or more
+    than two hours ahead).
+    """
+    if not isinstance(metric_name, str) or not 1 <= len(metric_name) <= 255:
+        raise ValueError(f"Invalid metric name: {metric_name!r}")
+    if unit not in UNITS:
+        raise ValueError(f"{metric_name}: unknown unit {unit!r}")
+    value = float(value)
+    if not math.isfinite(value) or value and not MIN_VALUE_MAGNITUDE <= abs(value) <= MAX_VALUE_MAGNITUDE:
+        raise ValueError(f"{metric_name}: value {value!r} out of range")
+    if dimensions:
+        if len(dimensions) > MAX_DIMENSIONS:
+            raise ValueError(f"{metric_name}: more than {MAX_DIMENSIONS} dimensions")
+        for name, dimension in dimensions.items():
+            if not (isinstance(name, str) and 1 <= len(name) <= 255 and
+                    isinstance(dimension, str) and 1 <= len(dimension) <= 1024):
+                raise ValueError(f"{metric_name}: invalid dimension {name!r}={dimension!r}")
+    if timestamp is not None:
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        now = datetime.now(timezone.utc)
+        if not now - MAX_TIMESTAMP_AGE <= timestamp <= now + MAX_TIMESTAMP_AHEAD:
+            raise ValueError(f"{metric_name}: timestamp {timestamp.isoformat()} out of range")
+    return value
+
+def is_retryable(error: Exception) -> bool:
+    """
+    True for publish errors a later attempt may not hit: throttling,
+    server errors and connection failures. False for rejected data.
+    """
+    response = getattr(error, "response", None)
+    if isinstance(response, dict):
+        # botocore ClientError
+        code = response.get("Error", {}).get("Code", "")
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        return code in RETRYABLE_ERROR_CODES or status >= 500
+    # botocore's ParamValidationError is a BotoCoreError, not a ValueError
+    return not isinstance(error, (ValueError, TypeError)) and type(error).__name__ != "ParamValidationError"
+
+class MetricsBuffer:
+    """
+    Aggregates metric datapoints in memory and publishes them in batches.
+    
+    Datapoints are grouped by namespace, metric name, unit, dimension set and
+    minute. Each group is sent as one MetricDatum, either as a StatisticSet
+    (SampleCount/Sum/Minimum/Maximum) or, with aggregation="values", as
+    Values/Counts arrays, which keep the distribution for percentiles.
+    The default aggregation is "statistics", or "values" for the EMF backend.
+    
+    The buffer flushes when it holds max_datums groups, when flush_interval
+    seconds have passed since the last flush (checked on add), on close(),
+    and at interpreter exit. Flushes are split to stay within the
+    PutMetricData request limits. add() rejects datapoints PutMetricData
+    would reject. If a request is throttled or fails on the service side,
+    everything not yet sent goes back into the buffer for the next flush;
+    a batch the service rejects is dropped and counted in `dropped`.
+    """
+    
+    def __init__(self, namespace: str = DEFAULT_NAMESPACE, aggregation: str = None,
+                 max_datums: int = MAX_DATUMS_PER_REQUEST, flush_interval: float = 60.0,
+                 client=None):
+        self.client = client or cloudwatch
+        aggregation = aggregation or getattr(self.client, "default_aggregation", "statistics")
+        if aggregation not in ("statistics", "values"):
+            raise ValueError(f"Unknown aggregation: {aggregation}")
+        
+        self.namespace = namespace
+        self.aggregation = aggregation
+        self.max_datums = max_datums
+        self.flush_interval = flush_interval
+        self.api_calls = 0
+        self.dropped = 0
+        
+        self._groups: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        atexit.register(self.close)
+    
+    def add(self, metric_name: str, value: float, unit: str = "Count",
+            dimensions: Dict[str, str] = None, namespace: str = None, timestamp: datetime = None):
+        """Add one datapoint to the buffer. Raises ValueError for invalid datapoints."""
+        value = validate_datapoint(metric_name, value, unit, dimensions, timestamp)
+        timestamp = timestamp or datetime.now(timezone.utc)
+        minute = timestamp.replace(second=0, microsecond=0)
+        key = (
+            namespace or self.namespace,
+            metric_name,
+            unit,
+            tuple(sorted(dimensions.items())) if dimensions else (),
+            minute
+        )
+        
+        with self._lock:
+            group = self._groups.get(key)
+            if self.aggregation == "values":
+                if group is None:
+                    group = self._groups[key] = Counter()
+                group[value] += 1
+            elif group is None:
+                self._groups[key] = [1, value, value, value]
+            else:
+                group[0] += 1
+                group[1] += value
+                if value < group[2]:
+                    group[2] = value
+                if value > group[3]:
+                    group[3] = value
+            
+            full = len(self._groups) >= self.max_datums
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        
+        if full or due:
+            self.flush()
+    
+    def flush(self) -> int:
+        """
+        Publish all buffered datapoints. Returns the number of API calls made.
+        
+        If a call fails with a retryable error (see is_retryable), the
+        datapoints it and the remaining calls would have sent are merged
+        back into the buffer and the error is raised. A batch rejected for
+        its data is dropped instead, since resending it would fail the same
+        way; the rest are still sent, then the first such error is raised.
+        """
+        with self._lock:
+            groups, self._groups = self._groups, {}
+            self._last_flush = time.monotonic()
+        
+        if not groups:
+            return 0
+        
+        by_namespace: Dict[str, List[Dict[str, Any]]] = {}
+        for key, group in groups.items():
+            by_namespace.setdefault(key[0], []).extend(self._to_datums(key, group))
+        
+        calls = 0
+        rejected = None
+        sent: Counter = Counter()
+        try:
+            for namespace, datums in by_namespace.items():
+                for batch in _split_batches(datums):
+                    try:
+                        self.client.put_metric_data(Namespace=namespace, MetricData=batch)
+                        calls += 1
+                    except Exception as e:
+                        if is_retryable(e):
+                            raise
+                        self.dropped += len(batch)
+                        rejected = rejected or e
+                    sent[namespace] += len(batch)
+        except Exception:
+            with self._lock:
+                for namespace, datums in by_namespace.items():
+                    for datum in datums[sent[namespace]:]:
+                        self._restore(namespace, datum)
+            raise
+        finally:
+            self.api_calls += calls
+        if rejected is not None:
+            raise rejected
+        return calls
+    
+    def close(self):
+        """Flush remaining datapoints; safe to call more than once."""
+        self.flush()
+    
+    def discard(self) -> int:
+        """Drop everything buffered, counting it in `dropped`. Returns the datums dropped."""
+        with self._lock:
+            groups, self._groups = self._groups, {}
+        count = sum(len(self._to_datums(key, group)) for key, group in groups.items())
+        self.dropped += count
+        return count
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def _restore(self, namespace: str, datum: Dict[str, Any]):
+        """Merge an unsent datum back into its group. Caller holds the lock."""
+        key = (
+            namespace,
+            datum["MetricName"],
+            datum["Unit"],
+            tuple((d["Name"], d["Value"]) for d in datum.get("Dimensions", ())),
+            datum["Timestamp"]
+        )
+        group = self._groups.get(key)
+        if "StatisticValues" in datum:
+            stats = datum["StatisticValues"]
+            if group is None:
+                self._groups[key] = [int(stats["SampleCount"]), stats["Sum"], stats["Minimum"], stats["Maximum"]]
+            else:
+                group[0] += int(stats["SampleCount"])
+                group[1] += stats["Sum"]
+                group[2] = min(group[2], stats["Minimum"])
+                group[3] = max(group[3], stats["Maximum"])
+        else:
+            if group is None:
+                group = self._groups[key] = Counter()
+            for value, count in zip(datum["Values"], datum["Counts"]):
+                group[value] += int(count)
+    
+    def _to_datums(self, key, group) -> List[Dict[str, Any]]:
+        _, metric_name, unit, dimensions, minute = key
+        base = {"MetricName": metric_name, "Unit": unit, "Timestamp": minute}
+        if dimensions:
+            base["Dimensions"] = [{"Name": k, "Value": v} for k, v in dimensions]
+        
+        if self.aggregation == "statistics":
+            sample_count, total, minimum, maximum = group
+            return [dict(base, StatisticValues={
+                "SampleCount": float(sample_count),
+                "Sum": total,
+                "Minimum": minimum,
+                "Maximum": maximum
+            })]
+        
+        items = sorted(group.items())
+        return [
+            dict(base,
+                 Values=[v for v, _ in items[i:i + MAX_VALUES_PER_DATUM]],
+                 Counts=[float(c) for _, c in items[i:i + MAX_VALUES_PER_DATUM]])
+            for i in range(0, len(items), MAX_VALUES_PER_DATUM)
+        ]
+
+def _split_batches(datums: List[Dict[str, Any]]):
+    """Yield lists of datums that fit within one PutMetricData request."""
+    batch: List[Dict[str, Any]] = []
+    batch_bytes = 0
+    for datum in datums:
+        # JSON size is a close, slightly pessimistic estimate of the wire size
+        size = len(json.dumps(datum, default=str))
+        if batch and (len(batch) >= MAX_DATUMS_PER_REQUEST or batch_bytes + size > MAX_REQUEST_BYTES):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(datum)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+def _publish(namespace: str, metrics: List[Tuple[str, float, str]], buffer: Optional[MetricsBuffer] = None):
+    """Send (name, value, unit) metrics in one call, or add them to a buffer."""
+    if buffer is not None:
+        for metric_name, value, unit in metrics:
+            buffer.add(metric_name, value, unit, namespace=namespace)
+        return
+    
+    timestamp = datetime.utcnow()
+    cloudwatch.put_metric_data(
+        Namespace=namespace,
+        MetricData=[
+            {"MetricName": metric_name, "Value": value, "Unit": unit, "Timestamp": timestamp}
+            for metric_name, value, unit in metrics
+        ]
+    )
+
+def publish_provisioning_metric(success: bool, duration: float = None, buffer: MetricsBuffer = None):
     """Publish provisioning metrics."""
     namespace = "Platform"
     
     if success:
-        publish_metric(namespace, "Provisioning.Success", 1.0)
+        metrics = [("Provisioning.Success", 1.0, "Count")]
     else:
-        publish_metric(namespace, "Provisioning.Failure", 1.0)
+        metrics = [("Provisioning.Failure", 1.0, "Count")]
     
     if duration:
-        publish_metric(namespace, "Provisioning.Duration", duration, "Seconds")
+        metrics.append(("Provisioning.Duration", duration, "Seconds"))
+    
+    _publish(namespace, metrics, buffer)
 
-def publish_api_metric(requests: int, errors: int = 0, latency: float = None):
+def publish_api_metric(requests: int, errors: int = 0, latency: float = None, buffer: MetricsBuffer = None):
     """Publish API metrics."""
     namespace = "Platform"
     
-    publish_metric(namespace, "API.Requests", float(requests))
+    metrics = [("API.Requests", float(requests), "Count")]
     
     if errors > 0:
-        publish_metric(namespace, "API.Errors", float(errors))
+        metrics.append(("API.Errors", float(errors), "Count"))
     
     if latency:
-        publish_metric(namespace, "API.Latency", latency, "Milliseconds")
+        metrics.append(("API.Latency", latency, "Milliseconds"))
+    
+    _publish(namespace, metrics, buffer)
 
-def publish_resource_metric(count: int, cost: float = None):
+def publish_resource_metric(count: int, cost: float = None, buffer: MetricsBuffer = None):
     """Publish resource metrics."""
     namespace = "Platform"
     
-    publish_metric(namespace, "Resources.Count", float(count))
+    metrics = [("Resources.Count", float(count), "Count")]
     
     if cost:
-        publish_metric(namespace, "Resources.Cost", cost, "None")
-
-if __name__ == "__main__":
-    import sys
+        metrics.append(("Resources.Cost", cost, "None"))
     
-    if len(sys.argv) < 2:
-        print("Usage: python publish_metrics.py <metric_type> [args...]")
-        sys.exit(1)
+    _publish(namespace, metrics, buffer)
+
+def publish_from_args(args: List[str], buffer: MetricsBuffer = None):
+    """
+    Publish one report given as CLI-style arguments, e.g.
+    ["api", "1000", "5", "250"]. Raises ValueError on bad input.
+    """
+    if not args:
+        raise ValueError("Empty metric record")
     
-    metric_type = sys.argv[1]
+    metric_type = args[0]
     
     if metric_type == "provisioning":
-        success = sys.argv[2].lower() == "true"
-        duration = float(sys.argv[3]) if len(sys.argv) > 3 else None
-        publish_provisioning_metric(success, duration)
+        success = args[1].lower() == "true"
+        duration = float(args[2]) if len(args) > 2 else None
+        publish_provisioning_metric(success, duration, buffer=buffer)
     elif metric_type == "api":
-        requests = int(sys.argv[2])
-        errors = int(sys.argv[3]) if len(sys.argv) > 3 else 0
-        latency = float(sys.argv[4]) if len(sys.argv) > 4 else None
-        publish_api_metric(requests, errors, latency)
+        requests = int(args[1])
+        errors = int(args[2]) if len(args) > 2 else 0
+        latency = float(args[3]) if len(args) > 3 else None
+        publish_api_metric(requests, errors, latency, buffer=buffer)
     elif metric_type == "resource":
-        count = int(sys.argv[2])
-        cost = float(sys.argv[3]) if len(sys.argv) > 3 else None
-        publish_resource_metric(count, cost)
+        count = int(args[1])
+        cost = float(args[2]) if len(args) > 2 else None
+        publish_resource_metric(count, cost, buffer=buffer)
     else:
-        print(f"Unknown metric type: {metric_type}")
+        raise ValueError(f"Unknown metric type: {metric_type}")
+
+def publish_record(line: str, buffer: MetricsBuffer):
+    """
+    Parse one stream record and add it to the buffer.
+    
+    A record is either a JSON object:
+        {"metric": "API.Latency", "value": 42, "unit": "Milliseconds",
+         "dimensions": {"service": "my-app"}, "namespace": "Platform",
+         "timestamp": "2024-01-01T00:00:00Z"}
+    or the same arguments the one-shot CLI takes:
+        api 1000 5 250
+    """
+    line = line.strip()
+    if line.startswith("{"):
+        record = json.loads(line)
+        timestamp = record.get("timestamp")
+        if isinstance(timestamp, (int, float)):
+            timestamp = datetime.fromtimestamp(timestamp, timezone.utc)
+        elif timestamp:
+            timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        buffer.add(
+            record["metric"],
+            float(record["value"]),
+            record.get("unit", "Count"),
+            dimensions=record.get("dimensions"),
+            namespace=record.get("namespace"),
+            timestamp=timestamp
+        )
+    else:
+        publish_from_args(line.split(), buffer=buffer)
+
+def follow(path: str, poll_interval: float = 0.5, from_start: bool = False):
+    """
+    Yield complete lines appended to a file, like `tail -F`.
+    
+    Reopens the file when it is rotated (new inode) and rewinds when it is
+    truncated. Partial lines are held until their newline arrives.
+    """
+    handle = open(path)
+    if not from_start:
+        handle.seek(0, os.SEEK_END)
+    inode = os.fstat(handle.fileno()).st_ino
+    partial = ""
+    
+    try:
+        while True:
+            chunk = handle.readline()
+            if chunk:
+                partial += chunk
+                if partial.endswith("\n"):
+                    yield partial
+                    partial = ""
+                continue
+            
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None
+            
+            if stat is not None and stat.st_ino != inode:
+                handle.close()
+                handle = open(path)
+                inode = os.fstat(handle.fileno()).st_ino
+                partial = ""
+                continue
+            if stat is not None and stat.st_size < handle.tell():
+                handle.seek(0)
+                partial = ""
+                continue
+            
+            time.sleep(poll_interval)
+    finally:
+        handle.close()
+
+class _RecordMetrics(list):
+    """
+    Stands in for a MetricsBuffer to collect one record's add() calls.
+    Datapoints are validated here, so a bad record is rejected whole.
+    """
+    
+    def add(self, metric_name: str, value: float, unit: str = "Count",
+            dimensions: Dict[str, str] = None, namespace: str = None, timestamp: datetime = None):
+        value = validate_datapoint(metric_name, value, unit, dimensions, timestamp)
+        self.append(((metric_name, value, unit), {"dimensions": dimensions, "namespace": namespace,
+                                                  "timestamp": timestamp}))
+
+def stream(lines, buffer: MetricsBuffer) -> Dict[str, int]:
+    """
+    Publish newline-delimited records from an iterable of lines.
+    
+    Lines are parsed one at a time, so memory stays bounded by the buffer
+    (at most max_datums aggregated groups). When the buffer is full, add()
+    flushes inline. Reading then pauses until the batch is sent, which
+    pushes back on the producer through the pipe. If that flush fails
+    (e.g. throttling), the datapoints stay buffered and reading pauses for
+    a backoff that doubles with each consecutive failure. After
+    MAX_FLUSH_FAILURES failures in a row, what is buffered is dropped so
+    memory stays bounded. A background thread flushes every
+    flush_interval seconds so quiet streams still publish.
+    
+    Returns counts of records read and rejected, failed flushes and
+    datums dropped (rejected by the service, or given up on).
+    """
+    stats = {"records": 0, "rejected": 0, "flush_failures": 0, "dropped": 0}
+    stop = threading.Event()
+    failures = 0
+    
+    def flush_failed(e: Exception) -> float:
+        """Count a failed flush; returns how long to back off before the next."""
+        nonlocal failures
+        stats["flush_failures"] += 1
+        if not is_retryable(e):
+            # flush() already dropped the rejected batch
+            print(f"Flush rejected, batch dropped: {e}", file=sys.stderr)
+            return 0.0
+        failures += 1
+        if failures >= MAX_FLUSH_FAILURES:
+            failures = 0
+            print(f"Flush failed {MAX_FLUSH_FAILURES} times in a row, "
+                  f"dropped {buffer.discard()} datums: {e}", file=sys.stderr)
+            return 0.0
+        delay = min(FLUSH_BACKOFF * 2 ** (failures - 1), MAX_FLUSH_BACKOFF)
+        print(f"Flush failed: {e}; retrying in {delay:g}s", file=sys.stderr)
+        return delay
+    
+    def flush_periodically():
+        nonlocal failures
+        while not stop.wait(buffer.flush_interval):
+            try:
+                buffer.flush()
+                failures = 0
+            except Exception as e:
+                # The interval is the backoff here
+                flush_failed(e)
+    
+    flusher = threading.Thread(target=flush_periodically, daemon=True)
+    flusher.start()
+    
+    try:
+        for line in lines:
+            if not line.strip():
+                continue
+            stats["records"] += 1
+            # Parse the whole record first, so a failed flush can't cut it short
+            metrics = _RecordMetrics()
+            try:
+                publish_record(line, metrics)
+            except (ValueError, KeyError, IndexError, TypeError) as e:
+                stats["rejected"] += 1
+                print(f"Rejected record {stats['records']}: {e}", file=sys.stderr)
+                continue
+            
+            for args, kwargs in metrics:
+                calls = buffer.api_calls
+                try:
+                    buffer.add(*args, **kwargs)
+                except Exception as e:
+                    # The datapoint was added; the failed flush kept or dropped the rest
+                    time.sleep(flush_failed(e))
+                else:
+                    if buffer.api_calls > calls:
+                        failures = 0
+    finally:
+        stop.set()
+        flusher.join()
+        try:
+            buffer.close()
+        except Exception as e:
+            stats["flush_failures"] += 1
+            dropped = buffer.discard()
+            print(f"Final flush failed, dropped {dropped} datums: {e}", file=sys.stderr)
+        stats["dropped"] = buffer.dropped
+    
+    return stats
+
+def main(argv: List[str] = None):
+    """CLI entry point."""
+    argv = sys.argv[1:] if argv is None else argv
+    
+    if not argv:
+        print("Usage: python publish_metrics.py <metric_type> [args...]")
+        print("       python publish_metrics.py stream [--file PATH [--from-start]] [--flush-interval SECONDS]")
         sys.exit(1)
     
-    print("Metric published successfully")
+    if argv[0] != "stream":
+        try:
+            publish_from_args(argv)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        print("Metric published successfully")
+        return
+    
+    import argparse
+    import signal
+    
+    parser = argparse.ArgumentParser(
+        prog="publish_metrics.py stream",
+        description="Publish newline-delimited metric records from stdin or a tailed file"
+    )
+    parser.add_argument("--file", help="File to tail (default: read stdin until EOF)")
+    parser.add_argument("--from-start", action="store_true", help="Read the tailed file from the beginning")
+    parser.add_argument("--flush-interval", type=float, default=10.0)
+    parser.add_argument("--max-datums", type=int, default=MAX_DATUMS_PER_REQUEST)
+    args = parser.parse_args(argv[1:])
+    
+    # Flush what is buffered on SIGTERM as well as on Ctrl-C / EOF
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
+    buffer = MetricsBuffer(max_datums=args.max_datums, flush_interval=args.flush_interval)
+    lines = follow(args.file, from_start=args.from_start) if args.file else sys.stdin
+    
+    try:
+        stats = stream(lines, buffer)
+    except KeyboardInterrupt:
+        stats = None
+    
+    if stats is not None:
+        print(f"Read {stats['records']} records ({stats['rejected']} rejected), "
+              f"{buffer.api_calls} publish calls ({stats['flush_failures']} failed), "
+              f"{stats['dropped']} datums dropped", file=sys.stderr)
 
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,203 @@ Monitoring API Lambda Function
 Handles monitoring and metrics requests.
 """
 
+import bisect
+import hashlib
 import json
-import boto3
-from datetime import datetime, timedelta
-from typing import Dict, Any
+import os
+import re
+import tempfile
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
 
-cloudwatch = boto3.client('cloudwatch')
+import json_codec
+import service_metrics
+from aws_clients import lazy_client
+from router import Router
+
+# Built on first use and reused across warm invocations
+cloudwatch = lazy_client('cloudwatch')
+
+# Handlers are called as handler(query_params=..., **path_params)
+router = Router()
+
+NAMESPACE = 'Platform'
+
+# timeframe -> (window, period in seconds)
+TIMEFRAMES = {
+    '1h': (timedelta(hours=1), 300),       # 5 minutes
+    '24h': (timedelta(hours=24), 3600),    # 1 hour
+    '7d': (timedelta(days=7), 86400),      # 1 day
+    '30d': (timedelta(days=30), 86400),
+}
+
+# GetMetricData accepts at most 500 queries per call
+MAX_QUERIES_PER_REQUEST = 500
+
+# Query ids must start with a lowercase letter; m0, m1, ... are the metrics
+EXPRESSION_ID = re.compile(r'^[a-z][a-zA-Z0-9_]*$')
+
+CACHE_TTL_SECONDS = int(os.environ.get('METRICS_CACHE_TTL', '60'))
+CACHE_MAX_ENTRIES = int(os.environ.get('METRICS_CACHE_MAX_ENTRIES', '256'))
+
+class TTLCache:
+    """Small LRU cache whose entries expire after a fixed TTL."""
+    
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+# Shared across warm invocations; dashboards refreshing inside one period
+# are served from memory
+metrics_cache = TTLCache(CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES)
+
+# Periods are treated as closed (final) this many seconds after they end,
+# leaving time for late datapoints to arrive in CloudWatch
+SERIES_SETTLE_SECONDS = int(os.environ.get('METRICS_SETTLE_SECONDS', '300'))
+SERIES_MAX_ENTRIES = int(os.environ.get('METRICS_SERIES_MAX_ENTRIES', '1024'))
+# Optional directory (e.g. under /tmp) where closed periods are spilled, so
+# they survive the in-memory LRU
+SERIES_SPILL_DIR = os.environ.get('METRICS_SERIES_DIR')
+# Closed periods older than the longest timeframe are dropped
+SERIES_RETENTION_SECONDS = int(max(window for window, _ in TIMEFRAMES.values()).total_seconds())
+
+class Segment:
+    """
+    Closed-period datapoints of one series, as sorted compact arrays.
+    
+    Covers [start, end): every closed period in that range has been
+    fetched, so requests inside it only need the periods from `end` on.
+    """
+    
+    def __init__(self, start: int, end: int, timestamps=(), values=()):
+        self.start = start
+        self.end = end
+        self.timestamps = array('q', timestamps)
+        self.values = array('d', values)
+    
+    def covers(self, start: int) -> bool:
+        return self.start <= start <= self.end
+    
+    def extend(self, timestamps: List[int], values: List[float], end: int):
+        """Append fetched points that fall in [self.end, end) and advance end."""
+        first = bisect.bisect_left(timestamps, self.end)
+        last = bisect.bisect_left(timestamps, end)
+        self.timestamps.extend(timestamps[first:last])
+        self.values.extend(values[first:last])
+        self.end = max(self.end, end)
+    
+    def trim(self, start: int):
+        """Drop points before start."""
+        if start <= self.start:
+            return
+        cut = bisect.bisect_left(self.timestamps, start)
+        del self.timestamps[:cut]
+        del self.values[:cut]
+        self.start = start
+    
+    def since(self, start: int) -> Tuple[List[int], List[float]]:
+        cut = bisect.bisect_left(self.timestamps, start)
+        return self.timestamps[cut:].tolist(), self.values[cut:].tolist()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'start': self.start,
+            'end': self.end,
+            'timestamps': self.timestamps.tolist(),
+            'values': self.values.tolist()
+        }
+
+class SeriesStore:
+    """Segments per series definition: bounded LRU in memory, optional disk spill."""
+    
+    def __init__(self, max_entries: int, spill_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.spill_dir = spill_dir
+        self._segments: "OrderedDict[str, Segment]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Segment]:
+        with self._lock:
+            segment = self._segments.get(key)
+            if segment is not None:
+                self._segments.move_to_end(key)
+                return segment
+        segment = self._load(key)
+        if segment is not None:
+            self._remember(key, segment)
+        return segment
+    
+    def put(self, key: str, segment: Segment):
+        self._remember(key, segment)
+        self._spill(key, segment)
+    
+    def _remember(self, key: str, segment: Segment):
+        with self._lock:
+            self._segments[key] = segment
+            self._segments.move_to_end(key)
+            while len(self._segments) > self.max_entries:
+                self._segments.popitem(last=False)
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, hashlib.sha256(key.encode()).hexdigest() + '.json')
+    
+    def _load(self, key: str) -> Optional[Segment]:
+        if not self.spill_dir:
+            return None
+        try:
+            with open(self._path(key)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return Segment(data['start'], data['end'], data['timestamps'], data['values'])
+    
+    def _spill(self, key: str, segment: Segment):
+        if not self.spill_dir:
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.spill_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(segment.to_dict(), f, separators=(',', ':'))
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            # The spill is only an optimization; memory still holds the segment
+            pass
+
+series_store = SeriesStore(SERIES_MAX_ENTRIES, SERIES_SPILL_DIR)
+
+# Raw datapoint resolution for service figures, coarsened so no series
+# has more than SERVICE_MAX_POINTS datapoints over the timeframe
+SERVICE_PERIOD = int(os.environ.get('SERVICE_METRICS_PERIOD', '60'))
+SERVICE_MAX_POINTS = int(os.environ.get('SERVICE_METRICS_MAX_POINTS', '1440'))
+SERVICE_PERCENTILE = float(os.environ.get('SERVICE_METRICS_PERCENTILE', '95'))
 
 def lambda_handler(event, context):
     """Handle monitoring API requests."""
@@ -17,85 +208,357 @@ def lambda_handler(event, context):
         path = event.get('path', '/')
         query_params = event.get('queryStringParameters') or {}
         
-        if http_method == 'GET' and path == '/api/v1/metrics':
-            return handle_get_metrics(query_params)
-        elif http_method == 'GET' and path.startswith('/api/v1/services/'):
-            service_name = path.split('/')[-2] if path.endswith('/metrics') else path.split('/')[-1]
-            return handle_get_service_metrics(service_name, query_params)
-        else:
-            return {
-                'statusCode': 404,
-                'body': json.dumps({'error': 'Not found'})
-            }
+        match = router.match(http_method, path)
+        if match is None:
+            return error_response(404, 'Not found')
+        if match.handler is None:
+            response = error_response(405, 'Method not allowed')
+            response['headers'] = {'Allow': ', '.join(match.allowed)}
+            return response
+        
+        response = match.handler(query_params=query_params, **match.params)
+        return json_codec.finish_response(response, event)
             
     except Exception as e:
         return {
             'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
+            'body': json_codec.dumps({'error': str(e)})
         }
 
+@router.route('GET', '/api/v1/metrics')
 def handle_get_metrics(query_params: Dict[str, Any]) -> Dict[str, Any]:
-    """Get platform metrics."""
-    metric_name = query_params.get('metric', 'Platform.Provisioning.Success')
+    """
+    Get platform metrics.
+    
+    Query parameters:
+    - metric / metrics: one metric name, or a comma-separated list
+    - expressions: semicolon-separated id=expression pairs over the metric
+      ids m0, m1, ... (e.g. "error_rate=m1/m0*100")
+    - stat: statistic for every metric (default Sum)
+    - service: filter by the Service dimension
+    - timeframe: 1h, 24h, 7d or 30d
+    """
+    names = [
+        name.strip()
+        for name in (query_params.get('metrics') or query_params.get('metric') or 'Platform.Provisioning.Success').split(',')
+        if name.strip()
+    ]
+    try:
+        expressions = parse_expressions(query_params.get('expressions', ''))
+    except ValueError as e:
+        return error_response(400, str(e))
+    stat = query_params.get('stat', 'Sum')
+    service = query_params.get('service')
     timeframe = query_params.get('timeframe', '24h')
     
-    # Calculate time range
-    end_time = datetime.utcnow()
-    if timeframe == '1h':
-        start_time = end_time - timedelta(hours=1)
-        period = 300  # 5 minutes
-    elif timeframe == '24h':
-        start_time = end_time - timedelta(hours=24)
-        period = 3600  # 1 hour
-    elif timeframe == '7d':
-        start_time = end_time - timedelta(days=7)
-        period = 86400  # 1 day
-    else:
-        start_time = end_time - timedelta(days=30)
-        period = 86400
-    
-    # Get metric statistics
-    response = cloudwatch.get_metric_statistics(
-        Namespace='Platform',
-        MetricName=metric_name,
-        StartTime=start_time,
-        EndTime=end_time,
-        Period=period,
-        Statistics=['Sum', 'Average']
-    )
+    if len(names) + len(expressions) > MAX_QUERIES_PER_REQUEST:
+        return error_response(400, f'At most {MAX_QUERIES_PER_REQUEST} metrics and expressions per request')
     
-    metrics = []
-    for datapoint in response['Datapoints']:
-        metrics.append({
-            'value': datapoint['Sum'] if 'Sum' in datapoint else datapoint['Average'],
-            'timestamp': datapoint['Timestamp'].isoformat()
-        })
+    # Calculate time range, aligned to the period so datapoints land on
+    # period boundaries
+    window, period = TIMEFRAMES.get(timeframe, TIMEFRAMES['30d'])
+    now = int(datetime.now(timezone.utc).timestamp())
+    start = (now - int(window.total_seconds())) // period * period
+    
+    # Requests within the same period (and TTL) share one cache entry
+    period_boundary = now // period * period
+    cache_key = (tuple(names), tuple(expressions), stat, service, timeframe, period_boundary)
+    
+    series = metrics_cache.get(cache_key)
+    cache_status = 'HIT'
+    if series is None:
+        cache_status = 'MISS'
+        queries = build_metric_queries(names, expressions, stat, period, service)
+        series = fetch_series(queries, start, now, period)
+        metrics_cache.set(cache_key, series)
+    
+    body = {
+        'timeframe': timeframe,
+        'period': period,
+        'series': series
+    }
+    if len(names) == 1 and not expressions:
+        # Single-metric shape kept for existing callers
+        body['metric'] = names[0]
+        body['metrics'] = [
+            {'value': value, 'timestamp': datetime.fromtimestamp(timestamp, timezone.utc).isoformat()}
+            for timestamp, value in zip(series[0]['timestamps'], series[0]['values'])
+        ] if series else []
     
     return {
         'statusCode': 200,
-        'body': json.dumps({
-            'metric': metric_name,
-            'timeframe': timeframe,
-            'metrics': sorted(metrics, key=lambda x: x['timestamp'])
+        'headers': {
+            'Content-Type': 'application/json',
+            'X-Cache': cache_status
+        },
+        'body': json_codec.dumps(body)
+    }
+
+def parse_expressions(raw: str) -> List[Tuple[str, str]]:
+    """
+    Parse "id=expression;id2=expression2" into (id, expression) pairs.
+    
+    Raises ValueError for a malformed pair or an id CloudWatch would reject.
+    """
+    expressions = []
+    for part in raw.split(';'):
+        if not part.strip():
+            continue
+        expression_id, _, expression = part.partition('=')
+        expression_id, expression = expression_id.strip(), expression.strip()
+        if not EXPRESSION_ID.match(expression_id) or not expression:
+            raise ValueError(f'Invalid expression: {part.strip()!r}')
+        expressions.append((expression_id, expression))
+    return expressions
+
+def build_metric_queries(names: List[str], expressions: List[Tuple[str, str]], stat: str,
+                         period: int, service: str = None) -> List[Dict[str, Any]]:
+    """Build GetMetricData queries: m0, m1, ... for metrics, then math expressions."""
+    dimensions = [{'Name': 'Service', 'Value': service}] if service else []
+    queries = []
+    
+    for index, name in enumerate(names):
+        queries.append({
+            'Id': f'm{index}',
+            'Label': name,
+            'MetricStat': {
+                'Metric': {
+                    'Namespace': NAMESPACE,
+                    'MetricName': name,
+                    'Dimensions': dimensions
+                },
+                'Period': period,
+                'Stat': stat
+            },
+            'ReturnData': True
+        })
+    
+    for expression_id, expression in expressions:
+        queries.append({
+            'Id': expression_id,
+            'Label': expression_id,
+            'Expression': expression,
+            'Period': period,
+            'ReturnData': True
+        })
+    
+    return queries
+
+def series_key(query: Dict[str, Any], queries: List[Dict[str, Any]]) -> str:
+    """
+    Identify a series by what it measures rather than by its query id.
+    
+    Expressions refer to other queries by id, so their key includes every
+    metric definition in the request.
+    """
+    if 'MetricStat' in query:
+        definition = query['MetricStat']
+    else:
+        definition = {
+            'Expression': query['Expression'],
+            'Period': query['Period'],
+            'Inputs': [(q['Id'], q['MetricStat']) for q in queries if 'MetricStat' in q]
+        }
+    return json.dumps(definition, sort_keys=True)
+
+def fetch_series(queries: List[Dict[str, Any]], start: int, now: int, period: int) -> List[Dict[str, Any]]:
+    """
+    Return [start, now) for every query, fetching only what is not stored.
+    
+    Closed periods are kept in series_store; when every series already
+    covers `start`, GetMetricData is only asked for the periods after the
+    oldest stored end (normally just the open tail).
+    """
+    closed_until = max(start, (now - SERIES_SETTLE_SECONDS) // period * period)
+    keys = {query['Id']: series_key(query, queries) for query in queries}
+    segments = {query_id: series_store.get(key) for query_id, key in keys.items()}
+    
+    if all(segment is not None and segment.covers(start) for segment in segments.values()):
+        fetch_from = min(segment.end for segment in segments.values())
+    else:
+        fetch_from = start
+        segments = {query_id: Segment(start, start) for query_id in keys}
+    
+    fetched = fetch_metric_data(queries, fetch_from, now) if fetch_from < now else {}
+    
+    series = []
+    for query in queries:
+        query_id = query['Id']
+        segment = segments[query_id]
+        timestamps, values = fetched.get(query_id, ([], []))
+        
+        if segment.end < closed_until:
+            segment.extend(timestamps, values, closed_until)
+            segment.trim((now - SERIES_RETENTION_SECONDS) // period * period)
+            series_store.put(keys[query_id], segment)
+        
+        # Stored closed periods plus the still-open tail, already sorted
+        stored_timestamps, stored_values = segment.since(start)
+        tail = bisect.bisect_left(timestamps, segment.end)
+        series.append({
+            'id': query_id,
+            'label': query['Label'],
+            'timestamps': stored_timestamps + timestamps[tail:],
+            'values': stored_values + values[tail:]
         })
+    
+    return series
+
+def fetch_metric_data(queries: List[Dict[str, Any]], start: int, end: int) -> Dict[str, Tuple[List[int], List[float]]]:
+    """
+    Fetch every query in one GetMetricData call, following NextToken.
+    
+    Results are requested in ascending time order, so each series comes
+    back sorted and pages only need to be appended. Returns
+    {id: (epoch-second timestamps, values)}.
+    """
+    series = {query['Id']: ([], []) for query in queries}
+    request = {
+        'MetricDataQueries': queries,
+        'StartTime': datetime.fromtimestamp(start, timezone.utc),
+        'EndTime': datetime.fromtimestamp(end, timezone.utc),
+        'ScanBy': 'TimestampAscending'
+    }
+    
+    while True:
+        response = cloudwatch.get_metric_data(**request)
+        for result in response.get('MetricDataResults', []):
+            timestamps, values = series[result['Id']]
+            timestamps.extend(int(timestamp.timestamp()) for timestamp in result.get('Timestamps', []))
+            values.extend(result.get('Values', []))
+        
+        next_token = response.get('NextToken')
+        if not next_token:
+            break
+        request['NextToken'] = next_token
+    
+    return series
+
+def error_response(status_code: int, message: str) -> Dict[str, Any]:
+    """Build an error response."""
+    return {
+        'statusCode': status_code,
+        'body': json_codec.dumps({'error': message})
     }
 
+@router.route('GET', '/api/v1/services/{service_name}')
+@router.route('GET', '/api/v1/services/{service_name}/metrics')
 def handle_get_service_metrics(service_name: str, query_params: Dict[str, Any]) -> Dict[str, Any]:
     """Get metrics for a specific service."""
-    # In a real implementation, this would query service-specific metrics
-    # For this example, return mock data
+    timeframe = query_params.get('timeframe', '1h')
+    figures, _, cache_status = load_service_metrics([service_name], timeframe)
+    
+    if service_name not in figures:
+        return error_response(404, f'No metrics for service {service_name}')
     
     return {
         'statusCode': 200,
-        'body': json.dumps({
+        'headers': {
+            'Content-Type': 'application/json',
+            'X-Cache': cache_status
+        },
+        'body': json_codec.dumps({
             'service': service_name,
-            'metrics': {
-                'cpu_utilization': 45.2,
-                'memory_utilization': 62.1,
-                'request_count': 1250,
-                'error_rate': 0.02
-            },
-            'timestamp': datetime.utcnow().isoformat()
+            'timeframe': timeframe,
+            'metrics': figures[service_name],
+            'timestamp': datetime.now(timezone.utc).isoformat()
+        })
+    }
+
+@router.route('GET', '/api/v1/services/metrics')
+def handle_get_services_metrics(query_params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get metrics for many services at once, plus a fleet-wide rollup.
+    
+    Query parameters:
+    - services: comma-separated service names (default: every service)
+    - timeframe: 1h, 24h, 7d or 30d
+    """
+    services = [name.strip() for name in query_params.get('services', '').split(',') if name.strip()]
+    timeframe = query_params.get('timeframe', '1h')
+    figures, fleet, cache_status = load_service_metrics(services, timeframe)
+    
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'application/json',
+            'X-Cache': cache_status
+        },
+        'body': json_codec.dumps({
+            'timeframe': timeframe,
+            'services': figures,
+            'fleet': fleet,
+            'timestamp': datetime.now(timezone.utc).isoformat()
         })
     }
 
+def load_service_metrics(services: List[str], timeframe: str) -> Tuple[Dict[str, Any], Dict[str, Any], str]:
+    """Return (per-service figures, fleet rollup, X-Cache status) for a timeframe."""
+    window, _ = TIMEFRAMES.get(timeframe, TIMEFRAMES['30d'])
+    window_seconds = int(window.total_seconds())
+    period = max(SERVICE_PERIOD, -(-window_seconds // SERVICE_MAX_POINTS))
+    # CloudWatch periods above 60 seconds must be multiples of 60
+    period = -(-period // 60) * 60
+    now = int(datetime.now(timezone.utc).timestamp())
+    
+    cache_key = ('services', tuple(sorted(services)), timeframe, now // period * period)
+    cached = metrics_cache.get(cache_key)
+    if cached is not None:
+        return cached + ('HIT',)
+    
+    points = fetch_service_datapoints(services, now - window_seconds, now, period)
+    result = (
+        service_metrics.aggregate(points, window_seconds, SERVICE_PERCENTILE),
+        service_metrics.rollup(points, window_seconds, SERVICE_PERCENTILE)
+    )
+    metrics_cache.set(cache_key, result)
+    return result + ('MISS',)
+
+def fetch_service_datapoints(services: List[str], start: int, end: int, period: int) -> service_metrics.Datapoints:
+    """
+    Collect raw per-service datapoints into columnar form.
+    
+    One SEARCH expression per metric returns a series for every service
+    (or only the requested ones), labelled with the service name, so the
+    query count stays constant however many services there are.
+    """
+    service_filter = ''
+    if services:
+        quoted = ' OR '.join('"{}"'.format(name.replace('"', '\\"')) for name in services)
+        service_filter = f' Service=({quoted})'
+    
+    queries = [
+        {
+            'Id': f'q{metric_id}',
+            'Expression': (
+                f"SEARCH('{{{NAMESPACE},Service}} MetricName=\"{metric_name}\"{service_filter}', "
+                f"'{stat}', {period})"
+            ),
+            'Label': "${PROP('Dim.Service')}",
+            'ReturnData': True
+        }
+        for metric_id, (metric_name, stat) in enumerate(service_metrics.METRICS)
+    ]
+    request = {
+        'MetricDataQueries': queries,
+        'StartTime': datetime.fromtimestamp(start, timezone.utc),
+        'EndTime': datetime.fromtimestamp(end, timezone.utc)
+    }
+    
+    # SEARCH matches terms, not whole values; keep exact matches only
+    wanted = set(services)
+    points = service_metrics.Datapoints()
+    while True:
+        response = cloudwatch.get_metric_data(**request)
+        for result in response.get('MetricDataResults', []):
+            service = result.get('Label', '')
+            if wanted and service not in wanted:
+                continue
+            points.extend(service, int(result['Id'][1:]), result.get('Values', []))
+        
+        next_token = response.get('NextToken')
+        if not next_token:
+            break
+        request['NextToken'] = next_token
+    
+    return points
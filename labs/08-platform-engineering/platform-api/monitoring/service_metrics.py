@@ -0,0 +1,162 @@
+"""
+Service Metrics
+Per-service CPU, memory, request and error figures computed from raw
+datapoints.
+
+Datapoints are collected column-wise (service id, metric id, value) and
+every figure for every service is computed from whole-array operations:
+grouped sums and counts with bincount, percentiles from one stable sort
+of the group column and a partition per (service, metric) run. One
+request can therefore cover hundreds of services without a Python-level
+loop per datapoint.
+
+numpy is optional. Without it the same figures are computed by a plain
+Python loop, which is correct but much slower on large inputs.
+"""
+
+import math
+from array import array
+from typing import Dict, Any, List, Optional
+
+# numpy adds ~90 ms to a cold start, so it is imported on first aggregation
+_NOT_LOADED = object()
+np = _NOT_LOADED
+
+# CloudWatch metric name and statistic for each metric id
+METRICS = (
+    ('CPUUtilization', 'Average'),
+    ('MemoryUtilization', 'Average'),
+    ('RequestCount', 'Sum'),
+    ('ErrorCount', 'Sum'),
+)
+CPU, MEMORY, REQUESTS, ERRORS = range(len(METRICS))
+
+class Datapoints:
+    """Columnar buffer of raw datapoints across many services."""
+    
+    def __init__(self):
+        self.services: List[str] = []
+        self._service_ids: Dict[str, int] = {}
+        self.service_ids = array('q')
+        self.metric_ids = array('b')
+        self.values = array('d')
+    
+    def __len__(self):
+        return len(self.values)
+    
+    def service_id(self, service: str) -> int:
+        service_id = self._service_ids.get(service)
+        if service_id is None:
+            service_id = self._service_ids[service] = len(self.services)
+            self.services.append(service)
+        return service_id
+    
+    def extend(self, service: str, metric_id: int, values: List[float]):
+        """Append every value of one service/metric series."""
+        count = len(values)
+        self.service_ids.extend([self.service_id(service)] * count)
+        self.metric_ids.extend([metric_id] * count)
+        self.values.extend(values)
+
+def aggregate(points: Datapoints, window_seconds: float, percentile: float = 95.0) -> Dict[str, Dict[str, Any]]:
+    """Return {service: figures} for every service in points."""
+    columns = _aggregate(points.service_ids, len(points.services), points, percentile)
+    return {
+        service: _figures(columns, group, window_seconds, percentile)
+        for group, service in enumerate(points.services)
+    }
+
+def rollup(points: Datapoints, window_seconds: float, percentile: float = 95.0) -> Dict[str, Any]:
+    """Return the same figures computed across all services together."""
+    columns = _aggregate(array('q', [0]) * len(points), 1, points, percentile)
+    figures = _figures(columns, 0, window_seconds, percentile)
+    figures['services'] = len(points.services)
+    return figures
+
+def load_numpy():
+    """Import numpy on first use; returns None when it is not installed."""
+    global np
+    if np is _NOT_LOADED:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np = numpy
+    return np
+
+def _aggregate(groups, group_count: int, points: Datapoints, percentile: float):
+    if load_numpy() is not None:
+        return _aggregate_numpy(groups, group_count, points.metric_ids, points.values, percentile)
+    return _aggregate_python(groups, group_count, points.metric_ids, points.values, percentile)
+
+def _aggregate_numpy(groups, group_count: int, metric_ids, values, percentile: float):
+    """
+    Per (group, metric) sum, count and nearest-rank percentile.
+    
+    Returns three lists indexed by group * len(METRICS) + metric.
+    """
+    size = group_count * len(METRICS)
+    values = np.frombuffer(values, dtype=np.float64)
+    keys = np.frombuffer(groups, dtype=np.int64) * len(METRICS) + np.frombuffer(metric_ids, dtype=np.int8)
+    
+    counts = np.bincount(keys, minlength=size)
+    sums = np.bincount(keys, weights=values, minlength=size)
+    
+    # A stable integer sort groups each key's values into one contiguous
+    # run; the percentile is then a partial sort (partition) of each run
+    order = np.argsort(keys, kind='stable')
+    grouped_values = values[order]
+    starts = np.cumsum(counts) - counts
+    ranks = np.maximum(np.ceil(percentile / 100 * counts).astype(np.int64) - 1, 0)
+    percentiles = np.full(size, np.nan)
+    for key in np.flatnonzero(counts):
+        run = grouped_values[starts[key]:starts[key] + counts[key]]
+        percentiles[key] = np.partition(run, ranks[key])[ranks[key]]
+    
+    return sums.tolist(), counts.tolist(), percentiles.tolist()
+
+def _aggregate_python(groups, group_count: int, metric_ids, values, percentile: float):
+    """Pure-Python equivalent of _aggregate_numpy."""
+    size = group_count * len(METRICS)
+    buckets = [[] for _ in range(size)]
+    for group, metric_id, value in zip(groups, metric_ids, values):
+        buckets[group * len(METRICS) + metric_id].append(value)
+    
+    sums, counts, percentiles = [], [], []
+    for bucket in buckets:
+        sums.append(sum(bucket))
+        counts.append(len(bucket))
+        if bucket:
+            bucket.sort()
+            percentiles.append(bucket[max(math.ceil(percentile / 100 * len(bucket)) - 1, 0)])
+        else:
+            percentiles.append(math.nan)
+    
+    return sums, counts, percentiles
+
+def _figures(columns, group: int, window_seconds: float, percentile: float) -> Dict[str, Any]:
+    sums, counts, percentiles = columns
+    base = group * len(METRICS)
+    
+    def mean(metric_id) -> Optional[float]:
+        count = counts[base + metric_id]
+        return sums[base + metric_id] / count if count else None
+    
+    def pct(metric_id) -> Optional[float]:
+        value = percentiles[base + metric_id]
+        return None if math.isnan(value) else value
+    
+    requests = sums[base + REQUESTS]
+    errors = sums[base + ERRORS]
+    label = f'p{percentile:g}'
+    
+    return {
+        'cpu_utilization': mean(CPU),
+        f'cpu_utilization_{label}': pct(CPU),
+        'memory_utilization': mean(MEMORY),
+        f'memory_utilization_{label}': pct(MEMORY),
+        'request_count': requests,
+        'requests_per_second': requests / window_seconds if window_seconds else None,
+        'error_count': errors,
+        'error_rate': errors / requests if requests else 0.0
+    }
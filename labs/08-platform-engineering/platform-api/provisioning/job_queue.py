@@ -0,0 +1,270 @@
+"""
+Provisioning Job Queue
+Durable queue and job-state store for provisioning requests.
+
+One table holds every job; a job is "queued" until a worker claims it,
+then "running", then "completed" or "failed". Indexes on
+(status, created_at) and (workspace, created_at) keep claims and status
+lookups independent of how many jobs have accumulated.
+
+The default backend is SQLite in WAL mode, so readers never block on
+writers, and every write is a single short transaction: enqueue is one
+INSERT, and workers hold no transaction while Terraform runs. Enqueue
+latency therefore stays flat however many applies are in flight.
+
+Identical queued jobs (same workspace, template, parameters and
+settings) that follow each other are coalesced when the first of them is
+claimed, never past a different job for the workspace: they run as one
+Terraform apply and all finish with its result. A burst of repeated
+self-service requests therefore costs one apply, not one per request.
+
+To use another backend (SQS + DynamoDB, Postgres, ...), implement
+JobQueue and register a URL scheme in open_queue().
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional
+
+QUEUED, RUNNING, COMPLETED, FAILED = 'queued', 'running', 'completed', 'failed'
+
+DEFAULT_QUEUE_URL = 'sqlite:////tmp/platform-provisioning/jobs.db'
+# A running job whose worker has not renewed its lease for this long is
+# assumed dead and goes back to the queue
+LEASE_SECONDS = int(os.environ.get('PROVISION_LEASE_SECONDS', '300'))
+MAX_ATTEMPTS = int(os.environ.get('PROVISION_MAX_ATTEMPTS', '3'))
+
+class JobQueue(ABC):
+    """Interface for provisioning job backends."""
+    
+    @abstractmethod
+    def enqueue(self, workspace: str, template: str, parameters: Dict[str, Any],
+                settings: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Store a new queued job and return it."""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """
+        Mark the oldest runnable queued job as running for worker and return
+        it, or None. Never hands out a job for a workspace that already has
+        one running. Identical jobs queued right behind it (before any
+        different job for the workspace) are claimed along with it and
+        listed in its "coalesced" field; complete/fail finish them too.
+        """
+        raise NotImplementedError
+    
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        """Extend the lease of a running job; False if the worker lost it."""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def complete(self, job_id: str, worker: str, result: Dict[str, Any]):
+        raise NotImplementedError
+    
+    @abstractmethod
+    def fail(self, job_id: str, worker: str, error: str):
+        raise NotImplementedError
+    
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+    
+    @abstractmethod
+    def list(self, workspace: str = None, status: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs first, optionally filtered."""
+        raise NotImplementedError
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    workspace TEXT NOT NULL,
+    template TEXT NOT NULL,
+    parameters TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    coalesced_into TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_workspace_created ON jobs (workspace, created_at);
+"""
+
+class SqliteJobQueue(JobQueue):
+    """JobQueue in a local SQLite database (one connection per thread)."""
+    
+    def __init__(self, path: str, lease_seconds: int = LEASE_SECONDS, max_attempts: int = MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        columns = {row['name'] for row in connection.execute('PRAGMA table_info(jobs)')}
+        if 'coalesced_into' not in columns:
+            # Databases created before jobs were coalesced
+            connection.execute('ALTER TABLE jobs ADD COLUMN coalesced_into TEXT')
+    
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # isolation_level=None: statements autocommit unless wrapped in
+            # an explicit BEGIN, so no transaction is ever left open
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+    
+    def enqueue(self, workspace, template, parameters, settings=None):
+        job = {
+            'id': f'prov-{workspace}-{uuid.uuid4().hex[:8]}',
+            'workspace': workspace,
+            'template': template,
+            # Sorted keys, so identical requests compare equal in claim()
+            'parameters': json.dumps(parameters or {}, sort_keys=True),
+            'settings': json.dumps(settings or {}, sort_keys=True),
+            'status': QUEUED,
+            'created_at': time.time()
+        }
+        self._connection().execute(
+            'INSERT INTO jobs (id, workspace, template, parameters, settings, status, created_at) '
+            'VALUES (:id, :workspace, :template, :parameters, :settings, :status, :created_at)',
+            job
+        )
+        return self._decode(job)
+    
+    def claim(self, worker):
+        connection = self._connection()
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            self._expire_leases(connection, now)
+            row = connection.execute(
+                'SELECT * FROM jobs WHERE status = ? AND workspace NOT IN '
+                '(SELECT workspace FROM jobs WHERE status = ?) '
+                'ORDER BY created_at LIMIT 1',
+                (QUEUED, RUNNING)
+            ).fetchone()
+            if row is None:
+                connection.execute('COMMIT')
+                return None
+            connection.execute(
+                'UPDATE jobs SET status = ?, worker = ?, lease_until = ?, started_at = ?, '
+                'attempts = attempts + 1 WHERE id = ?',
+                (RUNNING, worker, now + self.lease_seconds, now, row['id'])
+            )
+            # Only the identical jobs right behind it: running one queued
+            # after a different job would reorder the workspace's applies
+            coalesced = []
+            for queued in connection.execute(
+                'SELECT id, template, parameters, settings FROM jobs '
+                'WHERE workspace = ? AND status = ? ORDER BY created_at',
+                (row['workspace'], QUEUED)
+            ):
+                if (queued['template'], queued['parameters'], queued['settings']) != \
+                        (row['template'], row['parameters'], row['settings']):
+                    break
+                coalesced.append(queued['id'])
+            if coalesced:
+                connection.execute(
+                    f"UPDATE jobs SET status = ?, worker = ?, lease_until = ?, started_at = ?, "
+                    f"attempts = attempts + 1, coalesced_into = ? WHERE id IN ({', '.join('?' * len(coalesced))})",
+                    (RUNNING, worker, now + self.lease_seconds, now, row['id'], *coalesced)
+                )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        
+        job = self._decode(dict(row))
+        job.update(status=RUNNING, worker=worker, started_at=now, attempts=row['attempts'] + 1, coalesced=coalesced)
+        return job
+    
+    def _expire_leases(self, connection, now):
+        """Requeue (or fail, after max_attempts) running jobs whose worker went away."""
+        connection.execute(
+            'UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, '
+            'error = ?, worker = NULL, lease_until = NULL, coalesced_into = NULL, '
+            'finished_at = CASE WHEN attempts >= ? THEN ? ELSE NULL END '
+            'WHERE status = ? AND lease_until < ?',
+            (self.max_attempts, FAILED, QUEUED, 'Worker lease expired',
+             self.max_attempts, now, RUNNING, now)
+        )
+    
+    def heartbeat(self, job_id, worker):
+        cursor = self._connection().execute(
+            'UPDATE jobs SET lease_until = ? WHERE (id = ? OR coalesced_into = ?) AND worker = ? AND status = ?',
+            (time.time() + self.lease_seconds, job_id, job_id, worker, RUNNING)
+        )
+        return cursor.rowcount >= 1
+    
+    def complete(self, job_id, worker, result):
+        self._finish(job_id, worker, COMPLETED, result=json.dumps(result))
+    
+    def fail(self, job_id, worker, error):
+        self._finish(job_id, worker, FAILED, error=error)
+    
+    def _finish(self, job_id, worker, status, result=None, error=None):
+        self._connection().execute(
+            'UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL '
+            'WHERE (id = ? OR coalesced_into = ?) AND worker = ? AND status = ?',
+            (status, result, error, time.time(), job_id, job_id, worker, RUNNING)
+        )
+    
+    def get(self, job_id):
+        row = self._connection().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._decode(dict(row)) if row else None
+    
+    def list(self, workspace=None, status=None, limit=50):
+        clauses, values = [], []
+        if workspace:
+            clauses.append('workspace = ?')
+            values.append(workspace)
+        if status:
+            clauses.append('status = ?')
+            values.append(status)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ''
+        rows = self._connection().execute(
+            f'SELECT * FROM jobs {where}ORDER BY created_at DESC LIMIT ?',
+            values + [limit]
+        ).fetchall()
+        return [self._decode(dict(row)) for row in rows]
+    
+    @staticmethod
+    def _decode(job: Dict[str, Any]) -> Dict[str, Any]:
+        for field in ('parameters', 'settings', 'result'):
+            if isinstance(job.get(field), str):
+                job[field] = json.loads(job[field])
+        return job
+
+def open_queue(url: str = None) -> JobQueue:
+    """
+    Open the queue named by url (default: PROVISION_QUEUE_URL).
+    
+    Supported: sqlite:///relative/path.db, sqlite:////absolute/path.db, or
+    a bare file path.
+    """
+    url = url or os.environ.get('PROVISION_QUEUE_URL', DEFAULT_QUEUE_URL)
+    if url.startswith('sqlite:///'):
+        return SqliteJobQueue(url[len('sqlite:///'):])
+    if '://' not in url:
+        return SqliteJobQueue(url)
+    raise ValueError(f'Unsupported queue URL: {url}')
@@ -3,13 +3,29 @@ Provisioning API Lambda Function
 Handles infrastructure provisioning requests.
 """
 
-import json
-import boto3
 import os
 from typing import Dict, Any
 
-ssm = boto3.client('ssm')
-lambda_client = boto3.client('lambda')
+import job_queue
+import json_codec
+from aws_clients import lazy_client
+from config_cache import ParameterCache
+from router import Router
+
+# Built on first use and reused across warm invocations
+ssm = lazy_client('ssm')
+_queue = None
+
+CONFIG_PARAM = os.environ.get('PLATFORM_CONFIG_PARAM', '/platform/devops-studio/dev/config')
+# Platform config, cached across warm invocations (TTL + stale-while-revalidate)
+platform_config = ParameterCache(
+    ssm,
+    decode=json_codec.loads,
+    prefetch_path=os.environ.get('PLATFORM_CONFIG_PREFETCH_PATH')
+)
+
+# Handlers are called as handler(event, context, **path_params)
+router = Router()
 
 def lambda_handler(event, context):
     """Handle provisioning API requests."""
@@ -17,26 +33,39 @@ def lambda_handler(event, context):
         http_method = event.get('httpMethod', 'POST')
         path = event.get('path', '/')
         
-        if http_method == 'POST' and path == '/api/v1/provision':
-            return handle_provision(event)
-        elif http_method == 'GET' and path.startswith('/api/v1/provision/'):
-            provision_id = path.split('/')[-1]
-            return handle_get_provision_status(provision_id)
-        else:
+        match = router.match(http_method, path)
+        if match is None:
             return {
                 'statusCode': 404,
-                'body': json.dumps({'error': 'Not found'})
+                'body': json_codec.dumps({'error': 'Not found'})
             }
-            
+        if match.handler is None:
+            return {
+                'statusCode': 405,
+                'headers': {'Allow': ', '.join(match.allowed)},
+                'body': json_codec.dumps({'error': 'Method not allowed'})
+            }
+        
+        response = match.handler(event, context, **match.params)
+        return json_codec.finish_response(response, event)
+    
     except Exception as e:
         return {
             'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
+            'body': json_codec.dumps({'error': str(e)})
         }
 
-def handle_provision(event: Dict[str, Any]) -> Dict[str, Any]:
-    """Handle provision request."""
-    body = json.loads(event.get('body', '{}'))
+def get_queue() -> job_queue.JobQueue:
+    """Open the job queue (PROVISION_QUEUE_URL) on first use and keep it for warm invocations."""
+    global _queue
+    if _queue is None:
+        _queue = job_queue.open_queue()
+    return _queue
+
+@router.route('POST', '/api/v1/provision')
+def handle_provision(event: Dict[str, Any], context) -> Dict[str, Any]:
+    """Handle provision request: enqueue a job for the worker pool."""
+    body = json_codec.loads(event.get('body') or '{}')
     
     template = body.get('template')
     workspace = body.get('workspace')
@@ -45,48 +74,90 @@ def handle_provision(event: Dict[str, Any]) -> Dict[str, Any]:
     if not template or not workspace:
         return {
             'statusCode': 400,
-            'body': json.dumps({'error': 'Missing required fields: template, workspace'})
+            'body': json_codec.dumps({'error': 'Missing required fields: template, workspace'})
         }
     
-    # Get platform configuration
-    config_param = os.environ.get('PLATFORM_CONFIG_PARAM', '/platform/devops-studio/dev/config')
-    config_response = ssm.get_parameter(Name=config_param)
-    config = json.loads(config_response['Parameter']['Value'])
-    
-    # Invoke Terraform runner (would be another Lambda or Step Function)
-    # For now, return a provision ID
-    provision_id = f"prov-{workspace}-{context.aws_request_id[:8]}"
+    # Get platform configuration (from memory on warm invocations)
+    config = platform_config.get(CONFIG_PARAM)
     
-    # Store provision request in DynamoDB or SQS for async processing
-    # For this example, we'll return immediately
+    # The worker pool (worker.py) runs the job; the request only records it
+    job = get_queue().enqueue(workspace, template, parameters, settings={
+        'state_bucket': config.get('state_bucket'),
+        'state_table': config.get('state_table')
+    })
     
     return {
         'statusCode': 202,
         'headers': {
             'Content-Type': 'application/json',
-            'Location': f'/api/v1/provision/{provision_id}'
+            'Location': f"/api/v1/provision/{job['id']}"
         },
-        'body': json.dumps({
-            'provision_id': provision_id,
-            'status': 'in_progress',
+        'body': json_codec.dumps({
+            'provision_id': job['id'],
+            'status': job['status'],
             'workspace': workspace,
             'estimated_time': '5 minutes'
         })
     }
 
-def handle_get_provision_status(provision_id: str) -> Dict[str, Any]:
-    """Get provisioning status."""
-    # In a real implementation, this would query DynamoDB or check Terraform state
-    # For this example, return a mock status
+@router.route('GET', '/api/v1/provision/{provision_id}')
+def handle_get_provision_status(event: Dict[str, Any], context, provision_id: str) -> Dict[str, Any]:
+    """Get provisioning status from the job store."""
+    job = get_queue().get(provision_id)
+    if job is None:
+        return {
+            'statusCode': 404,
+            'body': json_codec.dumps({'error': f'Unknown provision_id: {provision_id}'})
+        }
     
     return {
         'statusCode': 200,
-        'body': json.dumps({
-            'provision_id': provision_id,
-            'status': 'completed',
-            'resources': {
-                'alb_dns_name': 'example-alb.us-west-2.elb.amazonaws.com'
-            }
-        })
+        'headers': {'Content-Type': 'application/json'},
+        'body': json_codec.dumps(job_view(job))
     }
 
+@router.route('GET', '/api/v1/provision')
+def handle_list_provisions(event: Dict[str, Any], context) -> Dict[str, Any]:
+    """List recent provisioning jobs, filtered by ?workspace= and/or ?status=."""
+    query_params = event.get('queryStringParameters') or {}
+    try:
+        limit = int(query_params.get('limit', '50'))
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        return {
+            'statusCode': 400,
+            'body': json_codec.dumps({'error': 'limit must be a positive integer'})
+        }
+    jobs = get_queue().list(
+        workspace=query_params.get('workspace'),
+        status=query_params.get('status'),
+        limit=min(limit, 500)
+    )
+    
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json_codec.dumps({'jobs': [job_view(job) for job in jobs]})
+    }
+
+def job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """API representation of a job."""
+    view = {
+        'provision_id': job['id'],
+        'status': job['status'],
+        'workspace': job['workspace'],
+        'template': job['template'],
+        'attempts': job['attempts'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at']
+    }
+    if job.get('result'):
+        view['resources'] = job['result'].get('outputs', {})
+    if job.get('error'):
+        view['error'] = job['error']
+    if job.get('coalesced_into'):
+        # Ran as part of an identical request's apply
+        view['coalesced_into'] = job['coalesced_into']
+    return view
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Provisioning Worker
+Drains the provisioning job queue into TerraformRunner.
+
+Runs a pool of worker threads. Each claims the oldest runnable job (never
+two for the same workspace at once), prepares the workspace, plans and
+applies the template, and records the outputs or the error. A heartbeat
+thread renews the lease of every running job, so jobs of a crashed worker
+are requeued once their lease expires.
+
+Usage:
+    python worker.py --workers 4
+    PROVISION_QUEUE_URL=sqlite:////var/lib/platform/jobs.db python worker.py
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Callable
+
+import job_queue
+
+LAB_DIR = Path(__file__).resolve().parents[2]
+RUNNER_DIR = os.environ.get('TERRAFORM_RUNNER_DIR', str(LAB_DIR / 'automation' / 'terraform-runner'))
+TEMPLATES_DIR = os.environ.get('TEMPLATES_DIR', str(LAB_DIR / 'service-catalog'))
+POLL_INTERVAL = float(os.environ.get('PROVISION_POLL_INTERVAL', '1.0'))
+# Backoff after a queue error (e.g. "database is locked"), doubling per
+# consecutive failure
+ERROR_BACKOFF = 0.5
+MAX_ERROR_BACKOFF = 30.0
+
+def state_setting(settings: Dict[str, Any], key: str, env_var: str) -> str:
+    """A job's state backend setting, falling back to the worker's environment."""
+    value = settings.get(key) or os.environ.get(env_var)
+    if not value:
+        raise RuntimeError(
+            f"No {key} configured: set {key} in the platform config or {env_var} on the worker"
+        )
+    return value
+
+def run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Plan and apply one job with TerraformRunner; returns the outputs."""
+    if RUNNER_DIR not in sys.path:
+        sys.path.insert(0, RUNNER_DIR)
+    from terraform_runner import TerraformRunner
+    
+    settings = job['settings']
+    # Leaving the block releases the workspace lease, so gc may evict it later
+    with TerraformRunner(
+        workspace=job['workspace'],
+        template_path=os.path.join(TEMPLATES_DIR, job['template']),
+        state_bucket=state_setting(settings, 'state_bucket', 'TF_STATE_BUCKET'),
+        state_table=state_setting(settings, 'state_table', 'TF_STATE_TABLE')
+    ) as runner:
+        runner.setup_workspace()
+        runner.init()
+        # Waits out other runs' state locks, and re-plans if one changed the
+        # state in the meantime
+        applied = runner.plan_and_apply(job['parameters'])
+    return {'outputs': applied['outputs']}
+
+class WorkerPool:
+    """Threads that claim jobs from a JobQueue and run them."""
+    
+    def __init__(self, queue: job_queue.JobQueue, workers: int = 4,
+                 run: Callable[[Dict[str, Any]], Dict[str, Any]] = run_job,
+                 poll_interval: float = POLL_INTERVAL):
+        self.queue = queue
+        self.workers = workers
+        self.run = run
+        self.poll_interval = poll_interval
+        self.name = f'{socket.gethostname()}-{os.getpid()}'
+        self._stop = threading.Event()
+        self._stop_heartbeat = threading.Event()
+        self._running = {}
+        self._running_lock = threading.Lock()
+        self._threads = []
+        self._heartbeat_thread = None
+    
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(f'{self.name}-{index}',), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat, daemon=True)
+        self._heartbeat_thread.start()
+    
+    def stop(self, wait: bool = True):
+        """Stop claiming jobs; with wait, let running jobs finish first."""
+        self._stop.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+            # Keep leases alive until the last running job has finished
+            self._stop_heartbeat.set()
+            self._heartbeat_thread.join()
+    
+    def _work(self, worker: str):
+        errors = 0
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(worker)
+            except Exception as e:
+                errors += 1
+                self._backoff(f'{worker}: claiming a job failed', e, errors)
+                continue
+            errors = 0
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            
+            with self._running_lock:
+                self._running[job['id']] = worker
+            try:
+                try:
+                    result = self.run(job)
+                except Exception as e:
+                    self.queue.fail(job['id'], worker, str(e))
+                else:
+                    self.queue.complete(job['id'], worker, result)
+            except Exception as e:
+                # The job stays running; once its lease lapses it is requeued
+                self._log(f"{worker}: recording the result of job {job['id']} failed: {e}")
+            finally:
+                with self._running_lock:
+                    del self._running[job['id']]
+    
+    def _backoff(self, message: str, error: Exception, errors: int):
+        delay = min(ERROR_BACKOFF * 2 ** (errors - 1), MAX_ERROR_BACKOFF)
+        self._log(f'{message}: {error}; retrying in {delay:.1f}s')
+        self._stop.wait(delay)
+    
+    @staticmethod
+    def _log(message: str):
+        print(message, file=sys.stderr, flush=True)
+    
+    def _heartbeat(self):
+        interval = max(getattr(self.queue, 'lease_seconds', job_queue.LEASE_SECONDS) / 3, 1)
+        while not self._stop_heartbeat.wait(interval):
+            with self._running_lock:
+                running = list(self._running.items())
+            for job_id, worker in running:
+                try:
+                    self.queue.heartbeat(job_id, worker)
+                except Exception as e:
+                    # Retried on the next beat, well before the lease runs out
+                    self._log(f'{worker}: renewing the lease of job {job_id} failed: {e}')
+
+def main():
+    parser = argparse.ArgumentParser(description="Provisioning worker pool")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get('PROVISION_WORKERS', '4')))
+    parser.add_argument("--queue", default=None, help="Queue URL (default: PROVISION_QUEUE_URL)")
+    args = parser.parse_args()
+    
+    pool = WorkerPool(job_queue.open_queue(args.queue), workers=args.workers)
+    pool.start()
+    print(f"{args.workers} workers draining the provisioning queue")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("Stopping; waiting for running jobs to finish")
+        pool.stop()
+
+if __name__ == "__main__":
+    main()
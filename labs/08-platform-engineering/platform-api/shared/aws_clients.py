@@ -0,0 +1,85 @@
+"""
+Lazy AWS Client Registry
+Builds boto3 clients and resources on first use and caches them for the
+life of the container.
+
+Importing boto3 and constructing clients is a large share of Lambda init
+time. Creating them at import time means every cold start pays for every
+client, even ones the invocation never touches. With this registry a
+handler declares its clients at module level as before:
+
+    s3 = lazy_client('s3')
+    dynamodb = lazy_resource('dynamodb')
+
+and boto3 is only imported, and the client only built, when a method is
+first called. Warm invocations reuse the cached instance.
+"""
+
+import threading
+
+_cache = {}
+_lock = threading.Lock()
+
+def get_client(service_name, **kwargs):
+    """Return the cached boto3 client for a service, creating it on first use."""
+    return _get('client', service_name, kwargs)
+
+def get_resource(service_name, **kwargs):
+    """Return the cached boto3 resource for a service, creating it on first use."""
+    return _get('resource', service_name, kwargs)
+
+def set_client(service_name, client, **kwargs):
+    """Register a prebuilt client (e.g. a stub for local testing)."""
+    with _lock:
+        _cache[_key('client', service_name, kwargs)] = client
+
+def set_resource(service_name, resource, **kwargs):
+    """Register a prebuilt resource (e.g. a stub for local testing)."""
+    with _lock:
+        _cache[_key('resource', service_name, kwargs)] = resource
+
+def clear():
+    """Drop all cached clients and resources."""
+    with _lock:
+        _cache.clear()
+
+def _key(kind, service_name, kwargs):
+    return (kind, service_name, tuple(sorted(kwargs.items())))
+
+def _get(kind, service_name, kwargs):
+    key = _key(kind, service_name, kwargs)
+    instance = _cache.get(key)
+    if instance is not None:
+        return instance
+
+    with _lock:
+        # Another thread may have built it while we waited for the lock
+        instance = _cache.get(key)
+        if instance is None:
+            import boto3
+            factory = boto3.client if kind == 'client' else boto3.resource
+            instance = factory(service_name, **kwargs)
+            _cache[key] = instance
+    return instance
+
+class _LazyProxy:
+    """Module-level stand-in that resolves to the real client on attribute access."""
+
+    def __init__(self, kind, service_name, kwargs):
+        self._kind = kind
+        self._service_name = service_name
+        self._kwargs = kwargs
+
+    def __getattr__(self, name):
+        return getattr(_get(self._kind, self._service_name, self._kwargs), name)
+
+    def __repr__(self):
+        return f"<lazy {self._kind} '{self._service_name}'>"
+
+def lazy_client(service_name, **kwargs):
+    """Return a proxy for a boto3 client that is built on first attribute access."""
+    return _LazyProxy('client', service_name, kwargs)
+
+def lazy_resource(service_name, **kwargs):
+    """Return a proxy for a boto3 resource that is built on first attribute access."""
+    return _LazyProxy('resource', service_name, kwargs)
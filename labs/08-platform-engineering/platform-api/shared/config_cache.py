@@ -0,0 +1,165 @@
+"""
+Config Cache
+SSM Parameter Store lookups cached for the life of the container.
+
+- TTL: a value is served from memory for `ttl` seconds after it was
+  fetched.
+- Stale-while-revalidate: between `ttl` and `max_stale` the cached value
+  is still returned immediately while one background thread re-reads the
+  parameter. Only a value older than `max_stale` (or a first lookup)
+  makes the caller wait on SSM.
+- Version-aware: a refresh that returns the same parameter Version only
+  extends the entry; the value is decoded again only when the version
+  changes. invalidate(name, version) drops an entry older than a version
+  announced elsewhere (e.g. an EventBridge Parameter Store change event).
+- Prefetch: with `prefetch_path`, the first miss under that path loads
+  every parameter below it with one paginated get_parameters_by_path
+  call, so multi-environment configs cost one round trip, not one each.
+- Single-flight: concurrent misses for one parameter share one SSM call,
+  keeping bursts under the SSM API rate limit.
+
+Usage:
+    ssm = lazy_client('ssm')
+    platform_config = ParameterCache(ssm)
+    
+    config = platform_config.get('/platform/devops-studio/dev/config')
+
+In Lambda, a background refresh started during one invocation finishes
+during the next one (the environment is frozen in between); the stale
+value is served meanwhile.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+CONFIG_TTL_SECONDS = float(os.environ.get('PLATFORM_CONFIG_TTL', '300'))
+CONFIG_MAX_STALE_SECONDS = float(os.environ.get('PLATFORM_CONFIG_MAX_STALE', '3600'))
+# After a failed background refresh, wait this long before trying again
+REFRESH_RETRY_SECONDS = 30
+
+class _Entry:
+    __slots__ = ('value', 'version', 'fetched_at', 'refreshing', 'retry_at')
+    
+    def __init__(self, value, version, fetched_at):
+        self.value = value
+        self.version = version
+        self.fetched_at = fetched_at
+        self.refreshing = False
+        self.retry_at = 0.0
+
+class ParameterCache:
+    """Caches decoded SSM parameters by name."""
+    
+    def __init__(self, client, ttl: float = CONFIG_TTL_SECONDS, max_stale: float = CONFIG_MAX_STALE_SECONDS,
+                 decode: Callable[[str], Any] = json.loads, prefetch_path: Optional[str] = None):
+        self.client = client
+        self.ttl = ttl
+        self.max_stale = max(max_stale, ttl)
+        self.decode = decode
+        self.prefetch_path = prefetch_path.rstrip('/') + '/' if prefetch_path else None
+        self.calls = 0
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._name_locks: Dict[str, threading.Lock] = {}
+    
+    def get(self, name: str) -> Any:
+        """Return the decoded value of a parameter."""
+        entry = self._entries.get(name)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < self.ttl:
+                return entry.value
+            if age < self.max_stale:
+                self._refresh_in_background(name, entry)
+                return entry.value
+        return self._load(name)
+    
+    def invalidate(self, name: str = None, version: int = None):
+        """
+        Drop cached parameters. With version, only drop `name` if the cached
+        copy is older than that version.
+        """
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+                return
+            entry = self._entries.get(name)
+            if entry is not None and (version is None or entry.version is None or entry.version < version):
+                del self._entries[name]
+    
+    def prefetch(self, path: str) -> int:
+        """Load every parameter under path; returns how many were cached."""
+        request = {'Path': path.rstrip('/') or '/', 'Recursive': True, 'WithDecryption': True}
+        count = 0
+        while True:
+            self.calls += 1
+            response = self.client.get_parameters_by_path(**request)
+            for parameter in response.get('Parameters', []):
+                self._store(parameter)
+                count += 1
+            next_token = response.get('NextToken')
+            if not next_token:
+                return count
+            request['NextToken'] = next_token
+    
+    def _load(self, name: str) -> Any:
+        with self._name_lock(name):
+            # Another caller may have loaded it while we waited
+            entry = self._entries.get(name)
+            if entry is not None and time.monotonic() - entry.fetched_at < self.ttl:
+                return entry.value
+            
+            if self.prefetch_path and name.startswith(self.prefetch_path):
+                self.prefetch(self.prefetch_path)
+                entry = self._entries.get(name)
+                if entry is not None:
+                    return entry.value
+            
+            self.calls += 1
+            response = self.client.get_parameter(Name=name, WithDecryption=True)
+            return self._store(response['Parameter'], name).value
+    
+    def _store(self, parameter: Dict[str, Any], name: str = None) -> _Entry:
+        # Cache under the name that was asked for (it can carry a :version
+        # or :label selector that the returned Name does not)
+        name = name or parameter['Name']
+        version = parameter.get('Version')
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and version is not None and entry.version == version:
+                entry.fetched_at = now
+                return entry
+        # Decode outside the lock; only new versions get here
+        entry = _Entry(self.decode(parameter['Value']), version, now)
+        with self._lock:
+            self._entries[name] = entry
+        return entry
+    
+    def _refresh_in_background(self, name: str, entry: _Entry):
+        with self._lock:
+            if entry.refreshing or time.monotonic() < entry.retry_at:
+                return
+            entry.refreshing = True
+        threading.Thread(target=self._refresh, args=(name, entry), daemon=True).start()
+    
+    def _refresh(self, name: str, entry: _Entry):
+        try:
+            self.calls += 1
+            response = self.client.get_parameter(Name=name, WithDecryption=True)
+            self._store(response['Parameter'], name)
+        except Exception:
+            # Keep serving the stale value (e.g. while throttled)
+            entry.retry_at = time.monotonic() + REFRESH_RETRY_SECONDS
+        finally:
+            entry.refreshing = False
+    
+    def _name_lock(self, name: str) -> threading.Lock:
+        with self._lock:
+            lock = self._name_locks.get(name)
+            if lock is None:
+                lock = self._name_locks[name] = threading.Lock()
+            return lock
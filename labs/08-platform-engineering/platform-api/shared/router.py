@@ -0,0 +1,161 @@
+"""
+Router
+Route table for the API handlers, compiled once at import.
+
+Routes are registered with path templates whose parameters can be typed:
+
+    router = Router()
+    
+    @router.route('GET', '/api/v1/services/{service_name}/metrics')
+    def handle_get_service_metrics(service_name, query_params):
+        ...
+    
+    @router.route('GET', '/api/v1/jobs/{job_id:int}')
+    def handle_get_job(job_id, query_params):
+        ...
+
+Templates are split into a trie of path segments as they are registered,
+so matching walks the request path once, one dictionary lookup per
+segment, instead of testing every route in turn. Static segments win over
+parameters, so `/services/metrics` and `/services/{service_name}` can
+coexist.
+
+Parameter types:
+- `{name}` / `{name:str}`: one non-empty segment
+- `{name:int}`: one segment of digits, passed as an int
+- `{name:float}`: one segment parsed as a float
+- `{name:path}`: the rest of the path, one or more segments (last only)
+"""
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+class RouteMatch(NamedTuple):
+    """
+    Result of a lookup. `handler` is None when the path exists but not for
+    the requested method; `allowed` then lists the methods that do.
+    """
+    handler: Optional[Callable]
+    params: Dict[str, Any]
+    allowed: List[str]
+
+def _to_str(segment):
+    if not segment:
+        raise ValueError('empty segment')
+    return segment
+
+def _to_int(segment):
+    if not segment.isdigit():
+        raise ValueError(f'not an integer: {segment!r}')
+    return int(segment)
+
+CONVERTERS = {
+    'str': _to_str,
+    'int': _to_int,
+    'float': float,
+}
+
+class _Node:
+    __slots__ = ('static', 'params', 'rest', 'methods')
+    
+    def __init__(self):
+        self.static = {}
+        # (name, converter, child) in registration order
+        self.params = []
+        # (name, child) for a trailing {name:path}
+        self.rest = None
+        self.methods = {}
+
+class Router:
+    """Trie of route templates dispatching on method and path."""
+    
+    def __init__(self):
+        self._root = _Node()
+    
+    def add(self, method: str, template: str, handler: Callable):
+        """Register handler for method and template."""
+        node = self._root
+        segments = _split(template)
+        for index, segment in enumerate(segments):
+            if segment.startswith('{') and segment.endswith('}'):
+                name, _, kind = segment[1:-1].partition(':')
+                kind = kind or 'str'
+                if kind == 'path':
+                    if index != len(segments) - 1:
+                        raise ValueError(f'{{{name}:path}} must be the last segment of {template}')
+                    if node.rest is None:
+                        node.rest = (name, _Node())
+                    node = node.rest[1]
+                    continue
+                if kind not in CONVERTERS:
+                    raise ValueError(f'Unknown parameter type {kind!r} in {template}')
+                converter = CONVERTERS[kind]
+                for param_name, param_converter, child in node.params:
+                    if param_name == name and param_converter is converter:
+                        node = child
+                        break
+                else:
+                    child = _Node()
+                    node.params.append((name, converter, child))
+                    node = child
+            else:
+                node = node.static.setdefault(segment, _Node())
+        
+        method = method.upper()
+        if method in node.methods:
+            raise ValueError(f'Duplicate route: {method} {template}')
+        node.methods[method] = handler
+    
+    def route(self, method: str, template: str):
+        """Decorator form of add()."""
+        def decorator(handler):
+            self.add(method, template, handler)
+            return handler
+        return decorator
+    
+    def match(self, method: str, path: str) -> Optional[RouteMatch]:
+        """Return the route for method and path, or None if no route has the path."""
+        method = method.upper()
+        segments = _split(path)
+        params = {}
+        node = self._walk(self._root, segments, 0, params, method)
+        if node is not None:
+            return RouteMatch(node.methods[method], params, [])
+        
+        # Second pass only on a miss: is there the path under another method?
+        node = self._walk(self._root, segments, 0, params, None)
+        if node is None:
+            return None
+        return RouteMatch(None, params, sorted(node.methods))
+    
+    def _walk(self, node, segments, index, params, method):
+        if index == len(segments):
+            return node if (method in node.methods if method else node.methods) else None
+        
+        segment = segments[index]
+        child = node.static.get(segment)
+        if child is not None:
+            found = self._walk(child, segments, index + 1, params, method)
+            if found is not None:
+                return found
+        
+        for name, converter, child in node.params:
+            try:
+                value = converter(segment)
+            except ValueError:
+                continue
+            found = self._walk(child, segments, index + 1, params, method)
+            if found is not None:
+                params[name] = value
+                return found
+        
+        if node.rest is not None:
+            name, child = node.rest
+            if method in child.methods if method else child.methods:
+                params[name] = '/'.join(segments[index:])
+                return child
+        
+        return None
+
+def _split(path):
+    path = path.strip('/')
+    return path.split('/') if path else []